@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "core.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -46,7 +47,6 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -84,6 +84,11 @@ WSGI_APPLICATION = "config.wsgi.application"
 #    }
 # }
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request). DB_POOL=True uses psycopg's connection pool instead; Django
+# doesn't allow pooling together with persistent connections.
+DB_POOL = os.getenv("DB_POOL") == "True"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -91,8 +96,40 @@ DATABASES = {
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
-        "POST": 5432,
+        "PORT": os.getenv("DB_PORT", "5432"),
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        "OPTIONS": {},
+    }
+}
+
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        # seconds a request waits for a free connection before failing
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
     }
+
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2, share the primary's
+# credentials. GraphQL queries read from them (see core/routers.py); tests
+# mirror them onto the primary.
+for number, host in enumerate(
+    filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+DATABASE_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias != "default"],
+    "MAX_LAG": float(os.getenv("DB_REPLICA_MAX_LAG", "5")),
+    "STICKY_SECONDS": int(os.getenv("DB_PRIMARY_STICKY_SECONDS", "10")),
 }
 
 
@@ -120,6 +157,16 @@ AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
 ]
 
+# Token claims and user snapshots are cached for AUTH_CACHE_TTL seconds, so
+# authenticated requests don't load the user (see core/authentication.py).
+GRAPHQL_JWT = {
+    "JWT_DECODE_HANDLER": "core.authentication.decode_token",
+    "JWT_GET_USER_BY_NATURAL_KEY_HANDLER": (
+        "core.authentication.get_user_by_natural_key"
+    ),
+}
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -144,13 +191,104 @@ CORS_ALLOWED_ORIGINS = [
     "http://192.168.1.103:5173",
 ]
 
+# The frontend sends cookies so the read-your-writes cookie reaches the API.
+CORS_ALLOW_CREDENTIALS = True
+
 GRAPHENE = {
     "SCHEMA": "core.schema.schema",
     "MIDDLEWARE": [
         "graphql_jwt.middleware.JSONWebTokenMiddleware",
+        "core.instrumentation.TracingMiddleware",
     ],
 }
 
+# Request metrics served at /metrics, and resolver traces for requests that
+# send an "X-GraphQL-Trace: 1" header (see core/instrumentation.py).
+GRAPHQL_TRACING = {
+    "ENABLED": os.getenv("GRAPHQL_TRACING", "True") == "True",
+    "SAMPLE_RATE": float(os.getenv("GRAPHQL_TRACING_SAMPLE_RATE", "0")),
+    "TENANT_LABEL": True,
+    # /metrics is open to staff users, these client addresses (REMOTE_ADDR,
+    # so list the proxy's if one sits in front), and this bearer token.
+    "METRICS_ALLOWED_IPS": os.getenv(
+        "METRICS_ALLOWED_IPS", "127.0.0.1,::1"
+    ).split(","),
+    "METRICS_TOKEN": os.getenv("METRICS_TOKEN", ""),
+}
+
+# Static depth/cost budgets for /graphql (see core/cost.py). Per-organization
+# overrides go in "TENANTS", e.g. {"technova-solutions": {"MAX_COST": 20000}}.
+GRAPHQL_QUERY_LIMITS = {
+    "MAX_DEPTH": int(os.getenv("GRAPHQL_MAX_DEPTH", "10")),
+    "MAX_COST": int(os.getenv("GRAPHQL_MAX_COST", "5000")),
+    "TENANTS": {},
+}
+
+# Seconds that organization lookups and membership checks stay cached in
+# each worker (see core/tenancy.py).
+TENANT_CACHE_TTL = int(os.getenv("TENANT_CACHE_TTL", "60"))
+
+# Under ASGI (see config/asgi.py) /graphql is served by the async view, which
+# resolves query root fields concurrently on MAX_WORKERS threads (see
+# core/async_execution.py). Keep MAX_WORKERS within the database pool size.
+GRAPHQL_ASYNC = {
+    "ENABLED": os.getenv("GRAPHQL_ASYNC") == "True",
+    "MAX_WORKERS": int(os.getenv("GRAPHQL_ASYNC_WORKERS", "10")),
+}
+
+# Subscriptions over /graphql/stream (see core/broker.py). Use
+# core.broker.PostgresBroker when running more than one server process.
+GRAPHQL_SUBSCRIPTIONS = {
+    "BROKER": os.getenv("GRAPHQL_SUBSCRIPTION_BROKER", "core.broker.InMemoryBroker"),
+    "QUEUE_SIZE": int(os.getenv("GRAPHQL_SUBSCRIPTION_QUEUE_SIZE", "100")),
+    "KEEPALIVE": int(os.getenv("GRAPHQL_SUBSCRIPTION_KEEPALIVE", "15")),
+}
+
+# Operations POSTed to /graphql as a JSON array run as one batch sharing the
+# request's user and caches (see core/batching.py).
+GRAPHQL_BATCH = {
+    "ENABLED": os.getenv("GRAPHQL_BATCH", "True") == "True",
+    "MAX_OPERATIONS": int(os.getenv("GRAPHQL_BATCH_MAX_OPERATIONS", "10")),
+}
+
+# ETags and 304 Not Modified for GraphQL reads sent over GET (see
+# core/etags.py). Set GRAPHQL_ETAG_SALT to the release on deploys.
+GRAPHQL_ETAGS = {
+    "ENABLED": os.getenv("GRAPHQL_ETAGS", "True") == "True",
+    "MAX_AGE": int(os.getenv("GRAPHQL_ETAG_MAX_AGE", "0")),
+    "SALT": os.getenv("GRAPHQL_ETAG_SALT", ""),
+}
+
+# JSON encoder for GraphQL responses and subscription events (see
+# core/encoding.py). orjson is used when installed.
+GRAPHQL_ENCODING = {
+    "ENCODER": os.getenv("GRAPHQL_JSON_ENCODER", "core.encoding.fast_dumps"),
+}
+
+# gzip/brotli compression of large responses (see core/compression.py).
+RESPONSE_COMPRESSION = {
+    "ENABLED": os.getenv("RESPONSE_COMPRESSION", "True") == "True",
+    "MIN_SIZE": int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024")),
+}
+
+# Parsed-document cache and persisted queries (see core/documents.py).
+GRAPHQL_DOCUMENTS = {
+    "CACHE_SIZE": int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "256")),
+    "AUTO_REGISTER": os.getenv("GRAPHQL_AUTO_REGISTER") == "True",
+    "ALLOW_LIST_ONLY": os.getenv("GRAPHQL_ALLOW_LIST_ONLY") == "True",
+}
+
+# Opt-in cache of read responses, invalidated per organization by writes (see
+# core/response_cache.py). Use "core.response_cache.DjangoResponseCache" with
+# a shared CACHES backend when running several workers.
+GRAPHQL_RESPONSE_CACHE = {
+    "ENABLED": os.getenv("GRAPHQL_RESPONSE_CACHE") == "True",
+    "BACKEND": os.getenv(
+        "GRAPHQL_RESPONSE_CACHE_BACKEND", "core.response_cache.LocalResponseCache"
+    ),
+    "TIMEOUT": int(os.getenv("GRAPHQL_RESPONSE_CACHE_TIMEOUT", "300")),
+}
+
 ALLOWED_HOSTS = [
     "*",
     "127.0.0.1",
@@ -1,13 +1,28 @@
 from django.contrib import admin
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
 
-from core.views import health_check
+from core.async_execution import get_config as graphql_async_config
+from core.views import (
+    AsyncTenantGraphQLView,
+    TenantGraphQLView,
+    graphql_stream,
+    health_check,
+    metrics,
+    readiness_check,
+)
+
+if graphql_async_config()["ENABLED"]:
+    GraphQLView = AsyncTenantGraphQLView
+else:
+    GraphQLView = TenantGraphQLView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     # Disabling CSRF for the graphql endpoint (development only)
     path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql/stream", csrf_exempt(graphql_stream)),
     path("health/", health_check),
+    path("health/ready", readiness_check),
+    path("metrics", metrics),
 ]
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Organization, Project, Task, TaskComment
+from .models import Organization, PersistedQuery, Project, Task, TaskComment
 
 admin.site.unregister(User)
 
@@ -36,10 +36,18 @@ class ProjectAdmin(admin.ModelAdmin):
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ("title", "project", "status", "assignee_email")
-    list_filter = ("project__organization", "status")
+    list_filter = ("organization", "status")
     search_fields = ("title", "assignee_email")
+    readonly_fields = ("organization",)
 
 
 @admin.register(TaskComment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ("task", "author_email", "created_at")
+    readonly_fields = ("organization",)
+
+
+@admin.register(PersistedQuery)
+class PersistedQueryAdmin(admin.ModelAdmin):
+    list_display = ("sha256", "created_at")
+    search_fields = ("sha256",)
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from graphql import ExecutionContext
+
+from .conf import settings_group
+
+# Async GraphQL execution for the ASGI server.
+#
+# Resolvers use the synchronous ORM, so they can't run on the event loop.
+# Instead each root field of a query is resolved, together with everything
+# below it, on a bounded pool of worker threads: independent root fields
+# (such as `projects` and `myTasks` on the dashboard) run concurrently, and
+# the event loop is free for other requests while they wait on the
+# database. Async resolvers are awaited back on the event loop.
+#
+# There are no DataLoaders to run here: nested fields are fetched by the
+# queryset optimizer (core/optimizer.py) in a fixed number of queries per
+# root field, and the per-process tenant and auth caches are shared by the
+# worker threads.
+#
+# Every worker thread has its own database connections, so MAX_WORKERS also
+# caps the connections one process opens; keep it within the pool size.
+
+DEFAULTS = {
+    "ENABLED": False,
+    "MAX_WORKERS": 10,
+}
+
+get_config = settings_group("GRAPHQL_ASYNC", DEFAULTS)
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_config()["MAX_WORKERS"], thread_name_prefix="graphql"
+        )
+    return _executor
+
+
+@get_config.on_change
+def _reset_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def run_sync(request, func, *args, **kwargs):
+    """Run `func` on the worker pool, counting its SQL in the request's trace."""
+    trace = getattr(request, "graphql_trace", None)
+
+    def call():
+        # What Django does around a request, for this thread's connections.
+        close_old_connections()
+        try:
+            if trace is None:
+                return func(*args, **kwargs)
+            with trace.instrument_sql():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(call, thread_sensitive=False, executor=get_executor())()
+
+
+class ThreadedExecutionContext(ExecutionContext):
+    """Resolves each root field, and the fields below it, on the worker pool."""
+
+    def execute_field(self, parent_type, source, field_nodes, path):
+        if path.prev is not None:
+            return super().execute_field(parent_type, source, field_nodes, path)
+        return self.execute_root_field(parent_type, source, field_nodes, path)
+
+    async def execute_root_field(self, parent_type, source, field_nodes, path):
+        result = await run_sync(
+            self.context_value,
+            super().execute_field,
+            parent_type,
+            source,
+            field_nodes,
+            path,
+        )
+        if self.is_awaitable(result):
+            result = await result
+        return result
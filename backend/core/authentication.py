@@ -0,0 +1,106 @@
+import time
+from datetime import timedelta
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.utils import jwt_decode
+
+from .cache import LRUCache
+from .models import Organization
+
+# JWT authentication without a query per request.
+#
+# GRAPHQL_JWT points graphql_jwt's decode and user lookup handlers here.
+# Decoded claims are cached by token, and users as a snapshot of the columns
+# requests read (USER_FIELDS) plus the ids of their organizations, so on a
+# warm cache an authenticated request loads neither the user nor its
+# memberships (see tenancy.is_member). Snapshot users are model instances
+# with the other columns, such as the password hash, deferred: they load on
+# first access, and save() only writes the loaded columns.
+#
+# Entries expire after AUTH_CACHE_TTL seconds, and core.signals drops a
+# user's snapshot as soon as the user or their memberships change in this
+# process.
+AUTH_CACHE_TTL = getattr(settings, "AUTH_CACHE_TTL", 60)
+
+USER_FIELDS = (
+    "id",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+claims_cache = LRUCache(maxsize=16384, ttl=AUTH_CACHE_TTL)
+# User id -> snapshot, and username -> user id to find it.
+user_cache = LRUCache(maxsize=16384, ttl=AUTH_CACHE_TTL)
+user_id_cache = LRUCache(maxsize=16384, ttl=AUTH_CACHE_TTL)
+
+
+def decode_token(token, context=None):
+    """JWT_DECODE_HANDLER that verifies each token once per AUTH_CACHE_TTL."""
+    payload = claims_cache.get(token)
+    if payload is None:
+        payload = jwt_decode(token, context)
+        claims_cache.set(token, payload)
+    elif _expired(payload):
+        claims_cache.delete(token)
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    return dict(payload)
+
+
+def _expired(payload):
+    if not jwt_settings.JWT_VERIFY_EXPIRATION or "exp" not in payload:
+        return False
+    leeway = jwt_settings.JWT_LEEWAY
+    if isinstance(leeway, timedelta):
+        leeway = leeway.total_seconds()
+    return payload["exp"] + leeway < time.time()
+
+
+def get_user_by_natural_key(username):
+    """JWT_GET_USER_BY_NATURAL_KEY_HANDLER returning a snapshot user."""
+    user_id = user_id_cache.get(username)
+    snapshot = user_cache.get(user_id) if user_id is not None else None
+    # A renamed user's old username must stop resolving.
+    if snapshot is None or snapshot["username"] != username:
+        snapshot = load_snapshot(username)
+        if snapshot is None:
+            return None
+
+    # from_db takes the loaded values in the model's field order.
+    fields = [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname in USER_FIELDS
+    ]
+    user = User.from_db(
+        DEFAULT_DB_ALIAS, fields, [snapshot[field] for field in fields]
+    )
+    user.organization_ids = snapshot["organization_ids"]
+    return user
+
+
+def load_snapshot(username):
+    snapshot = User.objects.filter(username=username).values(*USER_FIELDS).first()
+    if snapshot is None:
+        return None
+    snapshot["organization_ids"] = frozenset(
+        Organization.members.through.objects.filter(
+            user_id=snapshot["id"]
+        ).values_list("organization_id", flat=True)
+    )
+    user_cache.set(snapshot["id"], snapshot)
+    user_id_cache.set(username, snapshot["id"])
+    return snapshot
+
+
+def forget_users(user_ids):
+    for user_id in user_ids:
+        user_cache.delete(user_id)
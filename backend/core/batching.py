@@ -0,0 +1,48 @@
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+
+from .conf import settings_group
+
+# Batched requests: a JSON array of operations POSTed to /graphql.
+#
+# The operations run in order against the same request, so they share one
+# context: the JWT user is loaded once and reused, tenant lookups hit the
+# caches the first operation filled, and a mutation early in the batch pins
+# the reads after it to the primary. The response is an array with one
+# result (plus its `id` and `status`) per operation.
+#
+# That shared request, plus the process-wide tenant and auth caches, stands
+# in for a per-batch DataLoader context: the schema resolves nested fields
+# with the queryset optimizer rather than DataLoaders, and operations run
+# one after another, so there is nothing for a loader to batch across them.
+#
+# A batch costs its operations together, so MAX_OPERATIONS bounds how much
+# work one request can ask for.
+
+DEFAULTS = {
+    "ENABLED": True,
+    "MAX_OPERATIONS": 10,
+}
+
+get_config = settings_group("GRAPHQL_BATCH", DEFAULTS)
+
+
+def batch_error(operations):
+    """Return why a batch can't run, or None."""
+    config = get_config()
+    if not config["ENABLED"]:
+        return "Batched requests are disabled."
+    if not operations:
+        return "Received an empty list in the batch request."
+    if len(operations) > config["MAX_OPERATIONS"]:
+        return "Batches may hold at most {} operations.".format(
+            config["MAX_OPERATIONS"]
+        )
+    if not all(isinstance(operation, dict) for operation in operations):
+        return "Every operation in a batch must be an object."
+    return None
+
+
+def start_operation(request):
+    """Clear what the previous operation in a batch left on the request."""
+    if hasattr(request, MUTATION_ERRORS_FLAG):
+        delattr(request, MUTATION_ERRORS_FLAG)
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+from .conf import settings_group
+
+# Pub/sub for GraphQL subscriptions.
+#
+# Mutations publish small change messages on per-project and per-tenant
+# channels once their transaction commits; subscribers receive them through
+# `Subscription` async iterators. InMemoryBroker only reaches subscribers in
+# its own process. PostgresBroker sends every message through NOTIFY, and
+# one LISTEN connection per process fans them out to the local subscribers,
+# so every worker sees every write.
+#
+# Messages on channels nobody listens to are dropped before they reach the
+# broker, and the messages of one write are sent together, so a bulk
+# mutation costs one NOTIFY rather than one per row.
+#
+# Each subscriber has a bounded queue. A subscriber that falls QUEUE_SIZE
+# messages behind is dropped with SubscriberOverflow rather than buffering
+# without limit; its client should refetch and subscribe again.
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BROKER": "core.broker.InMemoryBroker",
+    "QUEUE_SIZE": 100,
+    # seconds between SSE keep-alive comments
+    "KEEPALIVE": 15,
+}
+
+get_config = settings_group("GRAPHQL_SUBSCRIPTIONS", DEFAULTS)
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        config = get_config()
+        _broker = import_string(config["BROKER"])(config["QUEUE_SIZE"])
+    return _broker
+
+
+@get_config.on_change
+def _reset_broker():
+    global _broker
+    _broker = None
+
+
+def publish(channel, message):
+    """Publish `message` once the current transaction (if any) commits."""
+    publish_many([(channel, message)])
+
+
+def publish_many(messages):
+    """Publish `(channel, message)` pairs together once the transaction commits."""
+    messages = list(messages)
+
+    def send():
+        broker = get_broker()
+        listened = [
+            (channel, message)
+            for channel, message in messages
+            if broker.has_listeners(channel)
+        ]
+        if listened:
+            broker.publish_many(listened)
+
+    if messages:
+        transaction.on_commit(send)
+
+
+class SubscriberOverflow(Exception):
+    pass
+
+
+class Subscription:
+    """Async iterator over one channel's messages, fed from any thread."""
+
+    def __init__(self, broker, channel, queue_size):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, message):
+        # Runs on the subscriber's event loop.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflow()
+
+    def overflow(self):
+        self.overflowed = True
+        # Wake up a consumer waiting on an empty queue.
+        if self.queue.empty():
+            self.queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = None if self.overflowed else await self.queue.get()
+        if self.overflowed:
+            self.close()
+            raise SubscriberOverflow(
+                "subscriber fell behind; refetch and subscribe again"
+            )
+        return message
+
+    async def aclose(self):
+        self.close()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """Delivers messages to subscribers in this process only."""
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            channel = self.subscribers.get(subscription.channel)
+            if channel is not None:
+                channel.discard(subscription)
+                if not channel:
+                    del self.subscribers[subscription.channel]
+
+    def has_listeners(self, channel):
+        return channel in self.subscribers
+
+    def publish(self, channel, message):
+        self.publish_many([(channel, message)])
+
+    def publish_many(self, messages):
+        for channel, message in messages:
+            self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        self._each_subscriber(channel, lambda s: s.push(message))
+
+    def overflow(self, channel=None):
+        """Drop the subscribers of `channel` (or all), e.g. after missed messages."""
+        self._each_subscriber(channel, lambda s: s.overflow())
+
+    def _each_subscriber(self, channel, callback):
+        with self.lock:
+            if channel is None:
+                subscribers = [s for group in self.subscribers.values() for s in group]
+            else:
+                subscribers = list(self.subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(callback, subscription)
+            except RuntimeError:
+                # The subscriber's event loop has been closed.
+                self.unsubscribe(subscription)
+
+
+class PostgresBroker(InMemoryBroker):
+    """Publishes with NOTIFY and listens on one connection per process."""
+
+    NOTIFY_CHANNEL = "graphql_events"
+    # NOTIFY payloads must stay below 8000 bytes.
+    MAX_PAYLOAD = 7900
+    RECONNECT_DELAY = 1.0
+    # Listening connections identify themselves so publishers can tell
+    # whether any process has subscribers.
+    APPLICATION_NAME = "graphql-listen"
+    # seconds a "some process is listening" answer is reused
+    LISTENER_CHECK_INTERVAL = 1.0
+
+    def __init__(self, queue_size):
+        super().__init__(queue_size)
+        self.listener = None
+        self.listening = (float("-inf"), False)
+
+    def subscribe(self, channel):
+        if self.listener is None:
+            with self.lock:
+                if self.listener is None:
+                    self.listener = threading.Thread(
+                        target=self.listen, name="graphql-listen", daemon=True
+                    )
+                    self.listener.start()
+        return super().subscribe(channel)
+
+    def has_listeners(self, channel):
+        # Channels subscribed in other processes aren't visible from here,
+        # only whether any process holds a LISTEN connection. A process that
+        # starts listening may miss up to LISTENER_CHECK_INTERVAL seconds of
+        # messages from publishers that last saw nobody listening.
+        if super().has_listeners(channel):
+            return True
+        checked_at, listening = self.listening
+        now = time.monotonic()
+        if now - checked_at > self.LISTENER_CHECK_INTERVAL:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT EXISTS (SELECT 1 FROM pg_stat_activity"
+                    " WHERE application_name = %s)",
+                    [self.APPLICATION_NAME],
+                )
+                listening = cursor.fetchone()[0]
+            self.listening = (now, listening)
+        return listening
+
+    def publish_many(self, messages):
+        with connection.cursor() as cursor:
+            for payload in self.payloads(messages):
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)", [self.NOTIFY_CHANNEL, payload]
+                )
+
+    def payloads(self, messages):
+        """Pack `(channel, message)` pairs into as few NOTIFY payloads as fit."""
+        envelope = len('{"messages":[]}')
+        payloads, batch, size, overflowed = [], [], envelope, []
+        for channel, message in messages:
+            item = json.dumps([channel, message], cls=DjangoJSONEncoder)
+            length = len(item.encode()) + 1
+            if envelope + length > self.MAX_PAYLOAD:
+                # Too big to send; tell the channel's subscribers to refetch.
+                overflowed.append(channel)
+                continue
+            if size + length > self.MAX_PAYLOAD:
+                payloads.append('{"messages":[%s]}' % ",".join(batch))
+                batch, size = [], envelope
+            batch.append(item)
+            size += length
+        if batch:
+            payloads.append('{"messages":[%s]}' % ",".join(batch))
+        if overflowed:
+            payloads.append(json.dumps({"overflow": sorted(set(overflowed))}))
+        return payloads
+
+    def listen(self):
+        import psycopg
+
+        params = connections["default"].settings_dict
+        conninfo = {
+            "dbname": params["NAME"],
+            "user": params["USER"],
+            "password": params["PASSWORD"],
+            "host": params["HOST"],
+            "port": params["PORT"],
+        }
+        conninfo = {key: value for key, value in conninfo.items() if value}
+        while True:
+            try:
+                with psycopg.connect(
+                    autocommit=True, application_name=self.APPLICATION_NAME, **conninfo
+                ) as conn:
+                    conn.execute(f"LISTEN {self.NOTIFY_CHANNEL}")
+                    for notify in conn.notifies():
+                        data = json.loads(notify.payload)
+                        for channel in data.get("overflow", ()):
+                            self.overflow(channel)
+                        for channel, message in data.get("messages", ()):
+                            self.deliver(channel, message)
+            except Exception:
+                logger.exception("lost the subscription LISTEN connection")
+            # Messages sent while reconnecting are lost.
+            self.overflow()
+            time.sleep(self.RECONNECT_DELAY)
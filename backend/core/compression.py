@@ -0,0 +1,129 @@
+from asgiref.sync import sync_to_async
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .conf import settings_group
+
+# Response compression negotiated from Accept-Encoding.
+#
+# Brotli (when the `brotli` package is installed) shrinks JSON boards
+# noticeably more than gzip at a similar CPU cost, so it is preferred when
+# the client accepts both. Bodies below MIN_SIZE are sent as they are: the
+# saving wouldn't pay for the CPU time. Streaming responses such as the
+# subscription event streams are never buffered for compression.
+#
+# gzip is Django's GZipMiddleware, including its BREACH mitigation (a random
+# length gzip filename), so compressed sizes don't reveal a secret guessed
+# through reflected input. Brotli has no such padding. Neither is applied to
+# responses that carry credentials in the body: mutation results (tokenAuth,
+# refreshToken, ...) are sent uncompressed.
+#
+# Under ASGI, large bodies are compressed on a worker thread so the event
+# loop isn't blocked.
+
+DEFAULTS = {
+    "ENABLED": True,
+    "MIN_SIZE": 1024,
+    "BROTLI_QUALITY": 5,
+    "CONTENT_TYPES": ("application/json", "text/html", "text/plain"),
+}
+
+get_config = settings_group("RESPONSE_COMPRESSION", DEFAULTS)
+
+
+def accepted_encodings(header):
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in header.split(","):
+        coding, *params = (item.strip() for item in part.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get("*", 0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data, coding):
+    if coding == "br":
+        return brotli.compress(data, quality=get_config()["BROTLI_QUALITY"])
+    return compress_string(data, max_random_bytes=GZipMiddleware.max_random_bytes)
+
+
+def skip_compression(response):
+    """Send `response` as it is; used for responses that carry credentials."""
+    response.skip_compression = True
+
+
+def should_compress(request, response):
+    config = get_config()
+    if not config["ENABLED"] or response.streaming or response.status_code != 200:
+        return None
+    if response.has_header("Content-Encoding"):
+        return None
+    if getattr(response, "skip_compression", False):
+        return None
+    content_type = response.get("Content-Type", "").split(";")[0].strip()
+    if content_type not in config["CONTENT_TYPES"]:
+        return None
+    patch_vary_headers(response, ["Accept-Encoding"])
+    if len(response.content) < config["MIN_SIZE"]:
+        return None
+    return choose_encoding(request.headers.get("Accept-Encoding", ""))
+
+
+def apply_brotli(response):
+    compressed = compress(response.content, "br")
+    if len(compressed) >= len(response.content):
+        return response
+    response.content = compressed
+    response["Content-Length"] = str(len(compressed))
+    response["Content-Encoding"] = "br"
+    # A strong ETag promises identical bytes; these no longer are.
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag
+    return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware with brotli and the RESPONSE_COMPRESSION filters."""
+
+    def process_response(self, request, response):
+        coding = should_compress(request, response)
+        if coding == "br":
+            return apply_brotli(response)
+        if coding == "gzip":
+            return super().process_response(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        # Compression only needs the response, so it can leave the main thread.
+        return await sync_to_async(self.process_response, thread_sensitive=False)(
+            request, response
+        )
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.signals import setting_changed
+
+# Dict-valued settings such as GRAPHQL_TRACING = {"ENABLED": False}.
+#
+# Each module declares its DEFAULTS and reads the merged values with
+#
+#     get_config = settings_group("GRAPHQL_TRACING", DEFAULTS)
+#     get_config()["ENABLED"]
+#
+# The merged dict is built once and rebuilt after the setting changes (tests
+# override settings), when the group's on_change callbacks also drop
+# anything built from the old values, such as a thread pool or a backend.
+
+
+class SettingsGroup:
+    def __init__(self, name, defaults):
+        self.name = name
+        self.defaults = defaults
+        self._values = None
+        self._callbacks = []
+        setting_changed.connect(self._reset, weak=False)
+
+    def __call__(self):
+        if self._values is None:
+            self._values = {**self.defaults, **getattr(settings, self.name, {})}
+        return self._values
+
+    def on_change(self, func):
+        """Decorator: call `func()` whenever the setting changes."""
+        self._callbacks.append(func)
+        return func
+
+    def _reset(self, setting, **kwargs):
+        if setting == self.name:
+            self._values = None
+            for func in self._callbacks:
+                func()
+
+
+def settings_group(name, defaults):
+    return SettingsGroup(name, defaults)
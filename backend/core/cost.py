@@ -0,0 +1,183 @@
+from django.conf import settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLInt,
+    GraphQLList,
+    GraphQLNonNull,
+    InlineFragmentNode,
+    get_named_type,
+    value_from_ast,
+)
+
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# Static query cost analysis.
+#
+# Every selected field costs its weight, and a list field costs its weight
+# plus its sub-selection once per item it is expected to return: the `first`
+# argument for paginated fields, a per-field estimate from LIST_SIZES, or
+# LIST_MULTIPLIER otherwise. The total is computed from the
+# document alone, before any resolver runs, so expensive operations are
+# rejected without touching the database.
+
+DEFAULT_LIMITS = {
+    "MAX_DEPTH": 10,
+    "MAX_COST": 5000,
+    # Cost of an object-typed field; scalar fields are free unless weighted.
+    "OBJECT_WEIGHT": 1,
+    "LIST_MULTIPLIER": 10,
+    # "Type.field" -> weight, for fields that are more expensive than they look.
+    "FIELD_WEIGHTS": {},
+    # "Type.field" -> expected number of items, for lists with a known bound.
+    "LIST_SIZES": {
+        "Query.myTasks": 6,
+    },
+    # slug -> overrides of MAX_DEPTH / MAX_COST for that organization.
+    "TENANTS": {},
+}
+
+
+class QueryCost:
+    def __init__(self, cost, depth, max_cost, max_depth):
+        self.cost = cost
+        self.depth = depth
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+
+    @property
+    def errors(self):
+        errors = []
+        if self.depth > self.max_depth:
+            errors.append(
+                GraphQLError(
+                    f"query depth {self.depth} exceeds the limit of {self.max_depth}"
+                )
+            )
+        if self.cost > self.max_cost:
+            errors.append(
+                GraphQLError(
+                    f"query cost {self.cost} exceeds the limit of {self.max_cost}"
+                )
+            )
+        return errors
+
+    def as_extension(self):
+        return {
+            "requested": self.cost,
+            "maximum": self.max_cost,
+            "depth": self.depth,
+            "maxDepth": self.max_depth,
+        }
+
+
+def get_limits(tenant_slugs=()):
+    """Limits for an operation whose root fields name `tenant_slugs`.
+
+    None stands for a root field that names no tenant. Each budget is the
+    strictest among the fields, so a field naming a tenant with a generous
+    override can't lend it to the others.
+    """
+    limits = {**DEFAULT_LIMITS, **getattr(settings, "GRAPHQL_QUERY_LIMITS", {})}
+    overrides = [
+        limits["TENANTS"].get(slug, {}) if slug else {} for slug in set(tenant_slugs)
+    ] or [{}]
+    for name in ("MAX_DEPTH", "MAX_COST"):
+        limits[name] = min(override.get(name, limits[name]) for override in overrides)
+    return limits
+
+
+def analyze(schema, document, operation, variables=None, tenant_slugs=()):
+    """Compute the static cost and depth of `operation` within `document`."""
+    limits = get_limits(tenant_slugs)
+    analyzer = _Analyzer(schema, document, variables or {}, limits)
+    root_type = schema.get_root_type(operation.operation)
+    cost, depth = analyzer.selection_set(root_type, operation.selection_set, 0)
+    return QueryCost(cost, depth, limits["MAX_COST"], limits["MAX_DEPTH"])
+
+
+class _Analyzer:
+    def __init__(self, schema, document, variables, limits):
+        self.schema = schema
+        self.variables = variables
+        self.limits = limits
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+
+    def selection_set(self, parent_type, selection_set, depth, page_size=None):
+        cost, max_depth = 0, depth
+        for node, field_def in self._fields(parent_type, selection_set):
+            field_cost, field_depth = self.field(
+                parent_type, node, field_def, depth + 1, page_size
+            )
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def field(self, parent_type, node, field_def, depth, page_size):
+        key = f"{parent_type.name}.{node.name.value}"
+        is_object = node.selection_set is not None
+        weight = self.limits["FIELD_WEIGHTS"].get(
+            key, self.limits["OBJECT_WEIGHT"] if is_object else 0
+        )
+        if not is_object:
+            return weight, depth
+
+        multiplier = 1
+        first = self._first(node, field_def)
+        if first is not None:
+            # The list below a paginated field (its edges) is bounded by `first`.
+            page_size = first
+        elif _is_list(field_def.type):
+            if page_size is None:
+                page_size = self.limits["LIST_SIZES"].get(
+                    key, self.limits["LIST_MULTIPLIER"]
+                )
+            multiplier, page_size = page_size, None
+
+        child_cost, child_depth = self.selection_set(
+            get_named_type(field_def.type), node.selection_set, depth, page_size
+        )
+        return multiplier * (weight + child_cost), child_depth
+
+    def _fields(self, parent_type, selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                if selection.name.value.startswith("__"):
+                    continue
+                field_def = parent_type.fields.get(selection.name.value)
+                if field_def is not None:
+                    yield selection, field_def
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments[selection.name.value]
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                yield from self._fields(fragment_type, fragment.selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.schema.get_type(
+                        selection.type_condition.name.value
+                    )
+                yield from self._fields(fragment_type, selection.selection_set)
+
+    def _first(self, node, field_def):
+        if "first" not in field_def.args:
+            return None
+        first = DEFAULT_PAGE_SIZE
+        for argument in node.arguments:
+            if argument.name.value == "first":
+                value = value_from_ast(argument.value, GraphQLInt, self.variables)
+                if isinstance(value, int):
+                    first = value
+        return max(0, min(first, MAX_PAGE_SIZE))
+
+
+def _is_list(graphql_type):
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    return isinstance(graphql_type, GraphQLList)
@@ -0,0 +1,117 @@
+import hashlib
+
+from django.conf import settings
+from graphql import GraphQLError, parse, validate
+from graphene_django.settings import graphene_settings
+
+from .cache import LRUCache
+from .conf import settings_group
+from .models import PersistedQuery
+
+# Parsed-document cache and persisted queries.
+#
+# Documents are keyed by the SHA-256 of their text, the same hash clients use
+# for automatic persisted queries (the Apollo `persistedQuery` extension), so
+# a client that sends only the hash of a hot operation skips both the query
+# upload and the parse/validate step.
+#
+# Queries registered with the register_persisted_queries command (a build
+# step for the frontend) are stored in PersistedQuery and resolve on every
+# worker. Hashes a client registers itself, by sending the hash with the
+# query, only live in the bounded in-process cache unless AUTO_REGISTER is
+# on; even then only authenticated users can add rows, and at most
+# MAX_REGISTERED of them, so clients can't grow the table without bound.
+
+DEFAULTS = {
+    "CACHE_SIZE": 256,
+    # Store hashes clients send with their query text in PersistedQuery, so
+    # that other workers resolve them too (automatic persisted queries).
+    "AUTO_REGISTER": False,
+    "MAX_REGISTERED": 1000,
+    # Only execute documents registered ahead of time, e.g. with the
+    # register_persisted_queries command.
+    "ALLOW_LIST_ONLY": False,
+}
+
+
+get_config = settings_group("GRAPHQL_DOCUMENTS", DEFAULTS)
+
+
+document_cache = LRUCache(maxsize=get_config()["CACHE_SIZE"])
+
+
+class PersistedQueryError(GraphQLError):
+    def __init__(self, message, code):
+        super().__init__(message, extensions={"code": code})
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def register_query(query):
+    sha256 = query_hash(query)
+    PersistedQuery.objects.get_or_create(sha256=sha256, defaults={"query": query})
+    return sha256
+
+
+def resolve_document(schema, query, extensions, validation_rules=None, user=None):
+    """Return `(sha256, document, errors)` for a request's query or persisted hash.
+
+    Raises PersistedQueryError when a hash can't be resolved or isn't allowed.
+    """
+    config = get_config()
+    persisted = (extensions or {}).get("persistedQuery") or {}
+    sha256 = persisted.get("sha256Hash")
+
+    if sha256 and query and query_hash(query) != sha256:
+        raise PersistedQueryError(
+            "provided sha does not match query", "PERSISTED_QUERY_HASH_MISMATCH"
+        )
+    if not sha256:
+        if not query:
+            return None, None, []
+        sha256 = query_hash(query)
+
+    document = document_cache.get(sha256)
+    if document is not None:
+        return sha256, document, []
+
+    stored = None
+    if not query or config["ALLOW_LIST_ONLY"]:
+        stored = PersistedQuery.objects.filter(sha256=sha256).only("query").first()
+        if stored is None and config["ALLOW_LIST_ONLY"]:
+            raise PersistedQueryError(
+                "query is not on the allow-list", "PERSISTED_QUERY_NOT_ALLOWED"
+            )
+        if stored is None:
+            raise PersistedQueryError(
+                "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+            )
+        query = stored.query
+
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        return sha256, None, [e]
+
+    errors = validate(
+        schema, document, validation_rules, graphene_settings.MAX_VALIDATION_ERRORS
+    )
+    if errors:
+        return sha256, None, errors
+
+    if stored is None and persisted and can_register(user, config):
+        # Hash-only requests from now on can be answered by any worker.
+        register_query(query)
+    document_cache.set(sha256, document)
+    return sha256, document, []
+
+
+def can_register(user, config):
+    return (
+        config["AUTO_REGISTER"]
+        and user is not None
+        and user.is_authenticated
+        and PersistedQuery.objects.count() < config["MAX_REGISTERED"]
+    )
@@ -0,0 +1,134 @@
+import hashlib
+import json
+
+from django.db.models import Q
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from graphql import FieldNode, OperationType
+
+from .conf import settings_group
+from .models import Organization
+from .response_cache import field_tenant, request_user
+
+# Conditional GET for GraphQL reads.
+#
+# A query sent over GET (usually as a persisted query) gets an ETag built
+# from the document, its variables, the user, and the change sequence
+# numbers of the organizations it can see (Organization.change_seq, which
+# every write to a tenant's data advances). Working that out takes one
+# small query and no resolvers, so a client revalidating with
+# If-None-Match gets a bodyless 304 when nothing changed.
+#
+# SALT is part of every ETag; change it on deploys that change what
+# resolvers return for the same data.
+
+DEFAULTS = {
+    "ENABLED": True,
+    # 0 makes clients revalidate on every use; otherwise they may reuse a
+    # response for this many seconds without asking.
+    "MAX_AGE": 0,
+    "SALT": "",
+}
+
+# Root fields that can be tagged, and the argument naming their tenant. None
+# marks fields that read across the user's own organizations.
+TAGGABLE_FIELDS = {
+    "me": None,
+    "myTasks": None,
+    "projects": "orgSlug",
+    "projectsConnection": "orgSlug",
+    "organization": "slug",
+    "project": "id",
+    "search": "orgSlug",
+    "changesSince": "orgSlug",
+}
+
+# User columns that show up in responses or decide what the user may see.
+USER_FIELDS = (
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_staff",
+    "is_superuser",
+)
+
+get_config = settings_group("GRAPHQL_ETAGS", DEFAULTS)
+
+
+def operation_etag(request, document_hash, operation, variables, operation_name):
+    """Return the ETag for a read operation, or None if it can't have one."""
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+
+    user = request_user(request)
+    if user is None or not user.is_authenticated:
+        return None
+
+    tenants, own_organizations = set(), False
+    for selection in operation.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return None
+        name = selection.name.value
+        if name == "__typename":
+            continue
+        if name not in TAGGABLE_FIELDS:
+            return None
+        argument_name = TAGGABLE_FIELDS[name]
+        if argument_name is None:
+            own_organizations = True
+            continue
+        tenant = field_tenant(user, selection, argument_name, variables)
+        if tenant is None:
+            return None
+        tenants.add(tenant)
+
+    # The one version lookup.
+    organizations = Q(pk__in=[org_id for org_id, _ in tenants])
+    if own_organizations:
+        organizations |= Q(members=user)
+    versions = list(
+        Organization.objects.filter(organizations)
+        .values_list("pk", "change_seq")
+        .distinct()
+        .order_by("pk")
+    )
+
+    payload = json.dumps(
+        [
+            get_config()["SALT"],
+            document_hash,
+            operation_name,
+            variables or {},
+            user.pk,
+            [getattr(user, field) for field in USER_FIELDS],
+            sorted(tenants),
+            versions,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    # Weak, as compression may change the bytes but not the meaning.
+    return 'W/"%s"' % hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    etags = parse_etags(header)
+    # If-None-Match uses the weak comparison.
+    return "*" in etags or etag.removeprefix("W/") in {
+        tag.removeprefix("W/") for tag in etags
+    }
+
+
+def add_validators(response, etag):
+    response["ETag"] = etag
+    max_age = get_config()["MAX_AGE"]
+    if max_age:
+        patch_cache_control(response, private=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Authorization", "Cookie"])
+    return response
@@ -0,0 +1,128 @@
+from django.db import transaction
+from graphene.utils.str_converters import to_camel_case
+
+from .broker import get_broker, publish, publish_many
+from .models import Project
+from .tenancy import project_organization_id
+
+# Change messages for the taskChanged and projectChanged subscriptions.
+# Messages carry only the fields a write touched, keyed by their GraphQL
+# names, so clients patch their cached board instead of refetching it.
+# Bulk writes publish all their messages together (see broker.publish_many).
+
+TASK_FIELDS = ("title", "description", "status", "assignee_email", "rank", "created_at")
+PROJECT_FIELDS = ("name", "description", "status", "due_date", "created_at")
+
+
+def task_channel(project_id):
+    return f"tasks.{project_id}"
+
+
+def project_channel(org_id):
+    return f"projects.{org_id}"
+
+
+def changes(instance, fields):
+    return {to_camel_case(field): getattr(instance, field) for field in fields}
+
+
+def task_changed(action, task, fields=TASK_FIELDS):
+    tasks_changed(action, [task], fields)
+
+
+def tasks_changed(action, tasks, fields=TASK_FIELDS):
+    publish_many(
+        (
+            task_channel(task.project_id),
+            {
+                "action": action,
+                "project_id": task.project_id,
+                "task_id": task.pk,
+                "changes": changes(task, fields),
+            },
+        )
+        for task in tasks
+    )
+
+
+def task_deleted(project_id, task_id):
+    tasks_deleted([(project_id, task_id)])
+
+
+def tasks_deleted(ids):
+    """Publish the deletion of `(project_id, task_id)` pairs."""
+    publish_many(
+        (
+            task_channel(project_id),
+            {"action": "DELETED", "project_id": project_id, "task_id": task_id},
+        )
+        for project_id, task_id in ids
+    )
+
+
+def comment_added(task, comment):
+    publish(
+        task_channel(task.project_id),
+        {
+            "action": "COMMENT_ADDED",
+            "project_id": task.project_id,
+            "task_id": task.pk,
+            "changes": {
+                "comment": {
+                    "id": comment.pk,
+                    "content": comment.content,
+                    "authorEmail": comment.author_email,
+                    "createdAt": comment.created_at,
+                }
+            },
+        },
+    )
+
+
+def project_changed(action, project, fields=PROJECT_FIELDS):
+    publish(
+        project_channel(project.organization_id),
+        {
+            "action": action,
+            "project_id": project.pk,
+            "changes": changes(project, fields),
+        },
+    )
+
+
+def task_counts_changed(project_ids):
+    """Publish the task counts of `project_ids` once the transaction commits."""
+    project_ids = set(project_ids)
+
+    def send():
+        broker = get_broker()
+        # Only load the counts someone is subscribed to.
+        listened = [
+            project_id
+            for project_id in project_ids
+            if broker.has_listeners(
+                project_channel(project_organization_id(project_id))
+            )
+        ]
+        if not listened:
+            return
+        projects = Project.objects.filter(pk__in=listened).only(
+            "pk", "organization_id", *Project.TASK_COUNTERS.values()
+        )
+        broker.publish_many(
+            (
+                project_channel(project.organization_id),
+                {
+                    "action": "UPDATED",
+                    "project_id": project.pk,
+                    "changes": {
+                        "taskCount": project.task_total,
+                        "completedTaskCount": project.done_task_count,
+                    },
+                },
+            )
+            for project in projects
+        )
+
+    if project_ids:
+        transaction.on_commit(send)
@@ -0,0 +1,90 @@
+import time
+
+from django.db import connections
+
+from .routers import get_config as replica_config
+from .routers import replica_lag
+
+# Readiness details for /health/ready.
+#
+# Every configured database is pinged with `SELECT 1`. With DB_POOL=True the
+# psycopg pool's statistics are reported; otherwise each worker thread holds
+# one (possibly persistent) connection per database, and only the connection
+# mode is reported. On PostgreSQL the server-wide client connection count is
+# reported next to max_connections, which is the budget every worker's pool
+# shares. Replicas also report their replication lag.
+
+
+def database_status(alias):
+    """Ping one database and describe its connections; raises DatabaseError."""
+    connection = connections[alias]
+
+    started = time.perf_counter()
+    connection.ensure_connection()
+    acquire_ms = _ms(time.perf_counter() - started)
+
+    with connection.cursor() as cursor:
+        started = time.perf_counter()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        latency_ms = _ms(time.perf_counter() - started)
+
+        server = None
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT count(*), current_setting('max_connections')::int "
+                "FROM pg_stat_activity WHERE backend_type = 'client backend'"
+            )
+            in_use, limit = cursor.fetchone()
+            server = {"connections": in_use, "maxConnections": limit}
+
+    pool = getattr(connection, "pool", None)
+    if pool is not None:
+        connections_info = pool_stats(pool)
+    else:
+        max_age = connection.settings_dict.get("CONN_MAX_AGE", 0)
+        # Unpooled connections are per thread; there is nothing to count.
+        connections_info = {
+            "pooled": False,
+            "mode": "persistent" if max_age != 0 else "per-request",
+            "maxAge": max_age,
+        }
+
+    status = {
+        "vendor": connection.vendor,
+        "latencyMs": latency_ms,
+        "acquireMs": acquire_ms,
+        "pool": connections_info,
+        "server": server,
+    }
+    if alias in replica_config()["ALIASES"]:
+        status["lagSeconds"] = replica_lag(alias)
+    return status
+
+
+def pool_stats(pool):
+    """Summarize psycopg_pool's counters; unset counters are left out of get_stats()."""
+    stats = pool.get_stats()
+    size = stats.get("pool_size", 0)
+    idle = stats.get("pool_available", 0)
+    queued = stats.get("requests_queued", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "pooled": True,
+        "mode": "pool",
+        "minSize": stats.get("pool_min", 0),
+        "maxSize": stats.get("pool_max", 0),
+        "size": size,
+        "inUse": size - idle,
+        "idle": idle,
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": stats.get("requests_num", 0),
+        "queued": queued,
+        "waitMs": wait_ms,
+        "averageWaitMs": round(wait_ms / queued, 2) if queued else 0,
+        "timeouts": stats.get("requests_errors", 0),
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
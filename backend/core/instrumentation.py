@@ -0,0 +1,275 @@
+import random
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+from .conf import settings_group
+from .tenancy import resolve_organization
+
+# Request tracing and Prometheus metrics for /graphql.
+#
+# Every request records its total time and SQL query count/time (through
+# connection.execute_wrapper), labelled by operation name and tenant slug.
+# Both come from the client, so a request is only labelled with a tenant the
+# user can access, and each metric keeps at most MAX_SERIES label sets;
+# later ones are counted under "other".
+# Per-field resolver timings are only collected for requests that send the
+# trace header, or for a sampled fraction of requests, since wrapping every
+# resolver is the expensive part. Traced requests from staff users (or any
+# request when DEBUG is on) get an Apollo-style trace in
+# `extensions.tracing`.
+#
+# Metrics live in the worker process and are served by /metrics in the
+# Prometheus text format, to staff users, METRICS_ALLOWED_IPS, and scrapers
+# sending "Authorization: Bearer <METRICS_TOKEN>".
+
+DEFAULTS = {
+    "ENABLED": True,
+    # request.META key of the header that asks for a trace
+    "HEADER": "HTTP_X_GRAPHQL_TRACE",
+    # fraction of requests whose resolvers are timed for the metrics
+    "SAMPLE_RATE": 0.0,
+    # label request metrics with the tenant slug
+    "TENANT_LABEL": True,
+    # distinct label sets kept per metric
+    "MAX_SERIES": 500,
+    "METRICS_ALLOWED_IPS": ("127.0.0.1", "::1"),
+    "METRICS_TOKEN": "",
+}
+
+get_config = settings_group("GRAPHQL_TRACING", DEFAULTS)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None and len(self._series) >= get_config()["MAX_SERIES"]:
+                labels = ("other",) * len(self.labelnames)
+                series = self._series.get(labels)
+            if series is None:
+                # One count per bucket, then the sum and the total count.
+                series = self._series[labels] = [0] * len(self.buckets) + [0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, values in series:
+            pairs = [
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labelnames, labels)
+            ]
+            for bound, count in zip(self.buckets, values):
+                bucket = ",".join(pairs + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket}}} {count}")
+            bucket = ",".join(pairs + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{bucket}}} {values[-1]}")
+            label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{label_text} {values[-2]}")
+            lines.append(f"{self.name}_count{label_text} {values[-1]}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+REQUEST_LABELS = ("operation", "tenant")
+request_duration = Histogram(
+    "graphql_request_duration_seconds",
+    "Time spent executing GraphQL requests.",
+    REQUEST_LABELS,
+    DURATION_BUCKETS,
+)
+request_sql_queries = Histogram(
+    "graphql_request_sql_queries",
+    "SQL queries run per GraphQL request.",
+    REQUEST_LABELS,
+    COUNT_BUCKETS,
+)
+request_sql_duration = Histogram(
+    "graphql_request_sql_duration_seconds",
+    "Time spent in SQL per GraphQL request.",
+    REQUEST_LABELS,
+    DURATION_BUCKETS,
+)
+resolver_duration = Histogram(
+    "graphql_resolver_duration_seconds",
+    "Time spent in one field's resolvers per traced request.",
+    ("type", "field"),
+    DURATION_BUCKETS,
+)
+METRICS = [
+    request_duration,
+    request_sql_queries,
+    request_sql_duration,
+    resolver_duration,
+]
+
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in METRICS) + "\n"
+
+
+def can_read_metrics(request):
+    config = get_config()
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    token = config["METRICS_TOKEN"]
+    if token and constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return True
+    return request.META.get("REMOTE_ADDR") in config["METRICS_ALLOWED_IPS"]
+
+
+class RequestTrace:
+    """Timings for one GraphQL request; stored on the request as `graphql_trace`."""
+
+    def __init__(self, requested, sampled):
+        self.requested = requested
+        self.resolvers = requested or sampled
+        self.operation = ""
+        # The slug the operation names, and once finish() has checked that
+        # the user can access it, the tenant label.
+        self.tenant_slug = None
+        self.tenant = ""
+        self.sql_count = 0
+        self.sql_duration = 0.0
+        # The async view runs SQL for one request on several threads.
+        self._sql_lock = threading.Lock()
+        self.fields = []
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    @classmethod
+    def start(cls, request):
+        config = get_config()
+        if not config["ENABLED"]:
+            return None
+        requested = bool(request.META.get(config["HEADER"]))
+        sampled = random.random() < config["SAMPLE_RATE"]
+        trace = cls(requested, sampled)
+        request.graphql_trace = trace
+        return trace
+
+    def record_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            with self._sql_lock:
+                self.sql_count += 1
+                self.sql_duration += duration
+
+    def instrument_sql(self):
+        """Context manager that counts queries on this thread's connections."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self.record_sql))
+        return stack
+
+    def record_field(self, info, started, duration):
+        self.fields.append((info, started - self._started, duration))
+
+    def finish(self, user=None):
+        self.duration = time.perf_counter() - self._started
+        self.tenant = self.accessible_tenant(user)
+        labels = (self.operation or "anonymous", self.tenant or "none")
+        if not get_config()["TENANT_LABEL"]:
+            labels = (labels[0], "")
+        request_duration.observe(self.duration, *labels)
+        request_sql_queries.observe(self.sql_count, *labels)
+        request_sql_duration.observe(self.sql_duration, *labels)
+
+        totals = {}
+        for info, _, duration in self.fields:
+            key = (info.parent_type.name, info.field_name)
+            totals[key] = totals.get(key, 0.0) + duration
+        for (type_name, field_name), duration in totals.items():
+            resolver_duration.observe(duration, type_name, field_name)
+
+    def accessible_tenant(self, user):
+        if not self.tenant_slug or user is None or not user.is_authenticated:
+            return ""
+        org, is_member = resolve_organization(user, self.tenant_slug)
+        if org is None or not (is_member or user.is_superuser):
+            return ""
+        return self.tenant_slug
+
+    def as_extension(self):
+        return {
+            "version": 1,
+            "startTime": _iso(self.started_at),
+            "endTime": _iso(self.started_at + self.duration),
+            "duration": _ns(self.duration),
+            "operation": self.operation or None,
+            "tenant": self.tenant or None,
+            "sql": {"count": self.sql_count, "duration": _ns(self.sql_duration)},
+            "execution": {
+                "resolvers": [
+                    {
+                        "path": list(info.path.as_list()),
+                        "parentType": info.parent_type.name,
+                        "fieldName": info.field_name,
+                        "returnType": str(info.return_type),
+                        "startOffset": _ns(offset),
+                        "duration": _ns(duration),
+                    }
+                    for info, offset, duration in self.fields
+                ]
+            },
+        }
+
+
+def _ns(seconds):
+    return int(seconds * 1e9)
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class TracingMiddleware:
+    """Graphene middleware that times resolvers on traced requests."""
+
+    def resolve(self, next, root, info, **args):
+        trace = getattr(info.context, "graphql_trace", None)
+        if trace is None or not trace.resolvers:
+            return next(root, info, **args)
+        started = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            trace.record_field(info, started, time.perf_counter() - started)
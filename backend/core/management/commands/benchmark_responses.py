@@ -0,0 +1,99 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory
+
+from core.compression import brotli, compress
+from core.encoding import fast_dumps, standard_dumps
+from core.models import Project
+from core.schema import schema
+
+# The board query the project page sends (GetProjectDetails).
+BOARD_QUERY = """
+    query GetProjectDetails($id: ID!) {
+        project(id: $id) {
+            id name description status dueDate
+            tasks {
+                id title status assigneeEmail description createdAt
+                comments { id content authorEmail createdAt }
+            }
+        }
+    }
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares JSON encoders and compression on a board response: bytes and "
+        "milliseconds per response (seed a large tenant with seed_data first)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            type=int,
+            help="Project to load (default: the one with the most tasks)",
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=20, help="Timed runs per case"
+        )
+
+    def handle(self, *args, **options):
+        project_id = options["project"]
+        if project_id is None:
+            largest = (
+                Project.objects.annotate(size=Count("tasks"))
+                .order_by("-size")
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if largest is None:
+                raise CommandError("no projects; run seed_data --orgs N first")
+            project_id = largest
+
+        project = (
+            Project.objects.select_related("organization")
+            .filter(pk=project_id)
+            .first()
+        )
+        if project is None:
+            raise CommandError(f"project {project_id} does not exist")
+        request = RequestFactory().post("/graphql")
+        request.user = project.organization.members.first() or AnonymousUser()
+        result = schema.execute(
+            BOARD_QUERY, variables={"id": project_id}, context_value=request
+        )
+        if result.errors:
+            raise CommandError(str(result.errors[0]))
+        data = {"data": result.data}
+        tasks = len(result.data["project"]["tasks"])
+        self.stdout.write(f"Project {project_id}: {tasks} tasks")
+
+        iterations = options["iterations"]
+        self.stdout.write(f"{'step':<24}{'bytes':>12}{'p50 ms':>10}")
+        for name, encode in (("json", standard_dumps), ("orjson", fast_dumps)):
+            body, ms = self.measure(iterations, encode, data)
+            self.report(f"encode {name}", len(body), ms)
+
+        body = fast_dumps(data).encode()
+        self.report("identity", len(body), 0.0)
+        codings = ["gzip", "br"] if brotli is not None else ["gzip"]
+        for coding in codings:
+            compressed, ms = self.measure(iterations, compress, body, coding)
+            self.report(f"compress {coding}", len(compressed), ms)
+        if brotli is None:
+            self.stdout.write("brotli is not installed; skipped br.")
+
+    def measure(self, iterations, func, *args):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            output = func(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+        return output, statistics.median(timings)
+
+    def report(self, step, size, ms):
+        self.stdout.write(f"{step:<24}{size:>12}{ms:>10.2f}")
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from core.models import Organization, Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes old tombstones; clients whose changesSince cursor predates them "
+        "must refetch everything"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Keep tombstones younger than this many days",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        expired = Tombstone.objects.filter(deleted_at__lt=cutoff)
+        pruned = (
+            expired.values("organization_id")
+            .annotate(last=Max("change_seq"))
+            .order_by()
+            .values_list("organization_id", "last")
+        )
+
+        count = 0
+        for org_id, last in pruned:
+            with transaction.atomic():
+                Organization.objects.filter(pk=org_id).update(
+                    pruned_change_seq=Greatest("pruned_change_seq", last)
+                )
+                deleted, _ = Tombstone.objects.filter(
+                    organization_id=org_id, change_seq__lte=last
+                ).delete()
+            count += deleted
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {count} tombstone(s)."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+from core.models import Task
+from core.ranking import MAX_RANK_LENGTH
+
+
+class Command(BaseCommand):
+    help = "Respreads the ranks of board columns whose ranks have grown too long"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-length",
+            type=int,
+            default=MAX_RANK_LENGTH,
+            help="Rebalance columns holding a rank longer than this",
+        )
+
+    def handle(self, *args, **options):
+        columns = (
+            Task.objects.annotate(rank_length=Length("rank"))
+            .filter(rank_length__gt=options["max_length"])
+            .values_list("project_id", "status")
+            .distinct()
+            .order_by()
+        )
+
+        count = 0
+        for project_id, status in columns:
+            Task.rebalance_column(project_id, status)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebalanced {count} column(s)."))
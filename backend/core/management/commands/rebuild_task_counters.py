@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from core.models import Project
+
+
+class Command(BaseCommand):
+    help = "Recounts each project's per-status task counters and fixes any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift, and exit with an error if any is found",
+        )
+
+    def handle(self, *args, **options):
+        counters = Project.TASK_COUNTERS
+        projects = Project.objects.only("organization_id", *counters.values()).annotate(
+            **{
+                f"counted_{field}": Count("tasks", filter=Q(tasks__status=status))
+                for status, field in counters.items()
+            }
+        )
+
+        drifted = 0
+        for project in projects.iterator():
+            actual = {
+                field: getattr(project, f"counted_{field}")
+                for field in counters.values()
+            }
+            stored = {field: getattr(project, field) for field in counters.values()}
+            if actual == stored:
+                continue
+
+            drifted += 1
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Project {project.pk}: stored {stored}, actual {actual}"
+                )
+            )
+            if not options["check"]:
+                Project.set_task_counters(project.pk, actual, project.organization_id)
+
+        if drifted and options["check"]:
+            raise CommandError(f"{drifted} project(s) have drifted task counters")
+        if drifted:
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt counters for {drifted} project(s).")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Task counters are consistent."))
@@ -0,0 +1,39 @@
+import re
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from graphql import GraphQLError, parse
+
+from core.documents import register_query
+
+# Matches gql`...` and gql(`...`) template literals in the frontend sources.
+GQL_TEMPLATE = re.compile(r"gql\(?\s*`(.*?)`", re.DOTALL)
+
+
+class Command(BaseCommand):
+    help = "Registers the GraphQL documents in the given files as persisted queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="+",
+            help=".graphql files, or .ts/.js files containing gql`...` templates",
+        )
+
+    def handle(self, *args, **options):
+        for path in options["paths"]:
+            source = Path(path).read_text()
+            if path.endswith(".graphql"):
+                documents = [source]
+            else:
+                documents = GQL_TEMPLATE.findall(source)
+
+            for query in documents:
+                try:
+                    parse(query)
+                except GraphQLError as e:
+                    raise CommandError(f"{path}: {e.message}")
+                sha256 = register_query(query)
+                self.stdout.write(f"{sha256}  {path}")
+
+        self.stdout.write(self.style.SUCCESS("Persisted queries registered."))
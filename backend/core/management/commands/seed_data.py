@@ -1,12 +1,68 @@
-from django.core.management.base import BaseCommand
+import io
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from core.models import Organization, Project, Task
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.models import Organization, Project, Task, TaskComment
+from core.ranking import spread_ranks
+
+WORDS = (
+    "api billing board bug cache checkout client dashboard database deploy "
+    "design docs email export feature feedback flow form import invoice "
+    "login mobile metrics migration onboarding payment performance plan "
+    "pricing profile release report review roadmap search security server "
+    "settings signup sprint storage support sync team test tracking upload "
+    "user webhook"
+).split()
+VERBS = "add audit clean fix improve investigate refactor review ship update".split()
+TASK_STATUSES = (("TODO", 0.3), ("IN_PROGRESS", 0.2), ("DONE", 0.5))
+PROJECT_STATUSES = (("ACTIVE", 0.7), ("COMPLETED", 0.2), ("ON_HOLD", 0.1))
 
 
 class Command(BaseCommand):
-    help = "Seeds initial data for the application"
+    help = (
+        "Seeds initial data for the application. With --orgs, also generates "
+        "synthetic tenants for load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--orgs", type=int, default=0, help="Synthetic organizations to create"
+        )
+        parser.add_argument("--members-per-org", type=int, default=5)
+        parser.add_argument("--projects-per-org", type=int, default=10)
+        parser.add_argument("--tasks-per-project", type=int, default=20)
+        parser.add_argument("--comments-per-task", type=float, default=2)
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.2,
+            help=(
+                "Pareto shape of tenant sizes; lower means a few huge tenants "
+                "and a longer tail of small ones (must be > 1)"
+            ),
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed")
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Rows written per batch"
+        )
+        parser.add_argument(
+            "--password", default="password", help="Password of every generated user"
+        )
+
+    def handle(self, *args, **options):
+        if options["orgs"] > 0 and options["skew"] <= 1:
+            raise CommandError("--skew must be greater than 1")
 
-    def handle(self, *args, **kwargs):
         self.stdout.write("Seeding data...")
 
         if not User.objects.filter(username="admin").exists():
@@ -31,4 +87,353 @@ class Command(BaseCommand):
                 self.style.WARNING(f"Organization {org_name} already exists")
             )
 
+        if options["orgs"] > 0:
+            started = time.monotonic()
+            totals = SyntheticData(options, self.stdout).generate()
+            summary = ", ".join(f"{count} {name}" for name, count in totals.items())
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Generated {summary} in {time.monotonic() - started:.1f}s."
+                )
+            )
+
         self.stdout.write(self.style.SUCCESS("Database seeded successfully."))
+
+
+class SyntheticData:
+    """Streams skewed synthetic tenants into the database in batches.
+
+    Rows are plain tuples with primary keys assigned up front, so children
+    never wait for their parents' ids and nothing is kept in memory beyond
+    the current batch and the current organization's member emails.
+    """
+
+    def __init__(self, options, stdout):
+        self.options = options
+        self.stdout = stdout
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+        # Hashing is deliberately slow; every generated user shares one hash.
+        self.password = make_password(options["password"])
+
+        self.batch_size = options["batch_size"]
+        self.next_ids = {}
+        # The current organization's last change sequence number.
+        self.change_seq = 0
+        # Flushed in this order so parents are always written first.
+        self.tables = {
+            "organizations": TableWriter(
+                Organization,
+                [
+                    "id",
+                    "name",
+                    "slug",
+                    "contact_email",
+                    "created_at",
+                    "change_seq",
+                    "pruned_change_seq",
+                ],
+            ),
+            "users": TableWriter(
+                User,
+                [
+                    "id",
+                    "password",
+                    "is_superuser",
+                    "username",
+                    "first_name",
+                    "last_name",
+                    "email",
+                    "is_staff",
+                    "is_active",
+                    "date_joined",
+                ],
+            ),
+            "memberships": TableWriter(
+                Organization.members.through, ["organization", "user"]
+            ),
+            "projects": TableWriter(
+                Project,
+                ["id", "organization", "name", "description", "status", "created_at"]
+                + list(Project.TASK_COUNTERS.values())
+                + ["updated_at", "change_seq"],
+            ),
+            "tasks": TableWriter(
+                Task,
+                [
+                    "id",
+                    "project",
+                    "organization",
+                    "title",
+                    "description",
+                    "status",
+                    "assignee_email",
+                    "created_at",
+                    "rank",
+                    "updated_at",
+                    "change_seq",
+                ],
+            ),
+            "comments": TableWriter(
+                TaskComment,
+                [
+                    "id",
+                    "task",
+                    "organization",
+                    "content",
+                    "author_email",
+                    "created_at",
+                    "updated_at",
+                    "change_seq",
+                ],
+            ),
+        }
+
+    def generate(self):
+        for model in (Organization, User, Project, Task, TaskComment):
+            top = model.objects.aggregate(top=Max("pk"))["top"] or 0
+            self.next_ids[model] = top + 1
+
+        first_org_id = self.next_ids[Organization]
+        orgs = self.options["orgs"]
+        for n in range(orgs):
+            self.add_organization()
+            if (n + 1) % max(1, orgs // 10) == 0:
+                self.stdout.write(f"  {n + 1}/{orgs} organizations")
+        self.flush()
+        self.finish_change_sequences(first_org_id)
+
+        if connection.vendor == "postgresql":
+            # Ids were assigned here, so move the sequences past them.
+            models = [Organization, User, Project, Task, TaskComment]
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+        return {name: table.written for name, table in self.tables.items()}
+
+    def finish_change_sequences(self, first_org_id):
+        # Continue each new tenant's change sequence after its highest row.
+        latest = [
+            Coalesce(
+                Subquery(
+                    model.objects.filter(organization=OuterRef("pk"))
+                    .order_by()
+                    .values("organization")
+                    .annotate(top=Max("change_seq"))
+                    .values("top")
+                ),
+                0,
+            )
+            for model in (Project, Task, TaskComment)
+        ]
+        Organization.objects.filter(pk__gte=first_org_id).update(
+            change_seq=Greatest(*latest)
+        )
+
+    def next_change_seq(self):
+        self.change_seq += 1
+        return self.change_seq
+
+    def allocate_id(self, model):
+        pk = self.next_ids[model]
+        self.next_ids[model] += 1
+        return pk
+
+    def scale(self):
+        """A Pareto-distributed size factor with a mean of 1."""
+        alpha = self.options["skew"]
+        return self.rng.paretovariate(alpha) * (alpha - 1) / alpha
+
+    def count(self, mean, scale=1.0):
+        """A count around `mean * scale`, exponentially spread."""
+        if mean <= 0:
+            return 0
+        return int(self.rng.expovariate(1 / (mean * scale)) + 0.5)
+
+    def choose(self, weighted):
+        values, weights = zip(*weighted)
+        return self.rng.choices(values, weights)[0]
+
+    def words(self, count):
+        return " ".join(self.rng.choice(WORDS) for _ in range(count))
+
+    def created_at(self, after=None, within_days=365):
+        start = after or self.now - timedelta(days=within_days)
+        span = (self.now - start).total_seconds()
+        return start + timedelta(seconds=self.rng.uniform(0, span))
+
+    def add_organization(self):
+        options = self.options
+        size = self.scale()
+        org_id = self.allocate_id(Organization)
+        org_created = self.created_at()
+        self.change_seq = 0
+        self.add(
+            "organizations",
+            (
+                org_id,
+                f"{self.words(2).title()} {org_id}",
+                f"org-{org_id}",
+                f"admin@org-{org_id}.example.com",
+                org_created,
+                0,
+                0,
+            ),
+        )
+
+        emails = []
+        for _ in range(max(1, round(options["members_per_org"] * size))):
+            user_id = self.allocate_id(User)
+            email = f"user{user_id}@org-{org_id}.example.com"
+            emails.append(email)
+            joined = self.created_at(after=org_created)
+            self.add(
+                "users",
+                (
+                    user_id,
+                    self.password,
+                    False,
+                    f"user{user_id}",
+                    "",
+                    "",
+                    email,
+                    False,
+                    True,
+                    joined,
+                ),
+            )
+            self.add("memberships", (org_id, user_id))
+
+        for _ in range(max(1, round(options["projects_per_org"] * size))):
+            self.add_project(org_id, org_created, emails, size)
+
+    def add_project(self, org_id, org_created, emails, size):
+        project_id = self.allocate_id(Project)
+        project_created = self.created_at(after=org_created)
+
+        # Bigger tenants run bigger projects too.
+        columns = {status: [] for status, _ in TASK_STATUSES}
+        for _ in range(self.count(self.options["tasks_per_project"], size ** 0.5)):
+            columns[self.choose(TASK_STATUSES)].append(self.allocate_id(Task))
+
+        self.add(
+            "projects",
+            (
+                project_id,
+                org_id,
+                f"{self.words(2).title()} {project_id}",
+                self.words(12),
+                self.choose(PROJECT_STATUSES),
+                project_created,
+            )
+            + tuple(len(columns[status]) for status in Project.TASK_COUNTERS)
+            + (project_created, self.next_change_seq()),
+        )
+
+        for status, task_ids in columns.items():
+            for task_id, rank in zip(task_ids, spread_ranks(len(task_ids))):
+                task_created = self.created_at(after=project_created)
+                self.add(
+                    "tasks",
+                    (
+                        task_id,
+                        project_id,
+                        org_id,
+                        f"{self.rng.choice(VERBS).title()} {self.words(3)}",
+                        self.words(self.rng.randint(0, 30)),
+                        status,
+                        self.rng.choice(emails),
+                        task_created,
+                        rank,
+                        task_created,
+                        self.next_change_seq(),
+                    ),
+                )
+                for _ in range(self.count(self.options["comments_per_task"])):
+                    comment = (
+                        self.allocate_id(TaskComment),
+                        task_id,
+                        org_id,
+                        self.words(self.rng.randint(3, 25)),
+                        self.rng.choice(emails),
+                        self.created_at(after=task_created),
+                    )
+                    # updated_at starts out as created_at.
+                    self.add(
+                        "comments", comment + (comment[-1], self.next_change_seq())
+                    )
+
+    def add(self, table, row):
+        writer = self.tables[table]
+        writer.rows.append(row)
+        if len(writer.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # One transaction per batch keeps PostgreSQL's deferred foreign key
+        # checks (and any failure) bounded to a batch.
+        with transaction.atomic():
+            for writer in self.tables.values():
+                writer.flush()
+
+
+class TableWriter:
+    """Buffers rows for one table and writes them with COPY or executemany."""
+
+    def __init__(self, model, field_names):
+        self.table = model._meta.db_table
+        self.fields = [model._meta.get_field(name) for name in field_names]
+        self.rows = []
+        self.written = 0
+
+    def flush(self):
+        if not self.rows:
+            return
+        columns = ", ".join(connection.ops.quote_name(f.column) for f in self.fields)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                table = connection.ops.quote_name(self.table)
+                sql = f"COPY {table} ({columns}) FROM STDIN"
+                data = "".join(self.copy_line(row) for row in self.rows)
+                if hasattr(cursor, "copy_expert"):  # psycopg2
+                    cursor.copy_expert(sql, io.StringIO(data))
+                else:
+                    with cursor.copy(sql) as copy:
+                        copy.write(data)
+            else:
+                placeholders = ", ".join(["%s"] * len(self.fields))
+                cursor.executemany(
+                    f"INSERT INTO {connection.ops.quote_name(self.table)} "
+                    f"({columns}) VALUES ({placeholders})",
+                    [self.adapt(row) for row in self.rows],
+                )
+        self.written += len(self.rows)
+        self.rows = []
+
+    def adapt(self, row):
+        return [
+            field.get_db_prep_value(value, connection)
+            for field, value in zip(self.fields, row)
+        ]
+
+    @staticmethod
+    def copy_line(row):
+        values = []
+        for value in row:
+            if value is None:
+                values.append("\\N")
+            elif isinstance(value, bool):
+                values.append("t" if value else "f")
+            elif isinstance(value, str):
+                values.append(
+                    value.replace("\\", "\\\\")
+                    .replace("\t", "\\t")
+                    .replace("\n", "\\n")
+                    .replace("\r", "\\r")
+                )
+            elif hasattr(value, "isoformat"):
+                values.append(value.isoformat())
+            else:
+                values.append(str(value))
+        return "\t".join(values) + "\n"
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-18 08:45
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+COUNTERS = {
+    "TODO": "todo_task_count",
+    "IN_PROGRESS": "in_progress_task_count",
+    "DONE": "done_task_count",
+}
+
+
+def backfill_task_counters(apps, schema_editor):
+    Project = apps.get_model("core", "Project")
+    projects = Project.objects.annotate(
+        **{
+            f"counted_{field}": Count("tasks", filter=Q(tasks__status=status))
+            for status, field in COUNTERS.items()
+        }
+    )
+    for project in projects.iterator():
+        counts = {field: getattr(project, f"counted_{field}") for field in COUNTERS.values()}
+        Project.objects.filter(pk=project.pk).update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_persistedquery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='done_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='in_progress_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='todo_task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_task_counters, migrations.RunPython.noop),
+    ]
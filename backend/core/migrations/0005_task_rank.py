@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+from core.ranking import spread_ranks
+
+
+def backfill_ranks(apps, schema_editor):
+    # Keep the current creation order inside every (project, status) column.
+    Task = apps.get_model("core", "Task")
+    columns = Task.objects.values_list("project_id", "status").distinct()
+    for project_id, status in columns.order_by().iterator():
+        tasks = list(
+            Task.objects.filter(project_id=project_id, status=status)
+            .order_by("created_at", "id")
+            .only("pk")
+        )
+        for task, rank in zip(tasks, spread_ranks(len(tasks))):
+            task.rank = rank
+        Task.objects.bulk_update(tasks, ["rank"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_project_task_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'rank'], name='task_column_rank_idx'),
+        ),
+        migrations.RunPython(backfill_ranks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_organizations(apps, schema_editor):
+    Project = apps.get_model("core", "Project")
+    Task = apps.get_model("core", "Task")
+    TaskComment = apps.get_model("core", "TaskComment")
+    Task.objects.update(
+        organization_id=Subquery(
+            Project.objects.filter(pk=OuterRef("project_id")).values(
+                "organization_id"
+            )[:1]
+        )
+    )
+    TaskComment.objects.update(
+        organization_id=Subquery(
+            Task.objects.filter(pk=OuterRef("task_id")).values("organization_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tenant_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.organization'),
+        ),
+        migrations.AddField(
+            model_name='taskcomment',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_comments', to='core.organization'),
+        ),
+        migrations.RunPython(backfill_organizations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_task_organization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.organization'),
+        ),
+        migrations.AlterField(
+            model_name='taskcomment',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_comments', to='core.organization'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 6.0 on 2026-10-18 09:30
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The vectors are computed by triggers so every write path (save(),
+# bulk_create(), raw SQL) keeps them current. The text search configuration
+# must match core.search.SEARCH_CONFIG.
+INSTALL_SQL = """
+CREATE FUNCTION core_task_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_task_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON core_task
+    FOR EACH ROW EXECUTE FUNCTION core_task_search_vector();
+
+CREATE FUNCTION core_taskcomment_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.content, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_taskcomment_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF content ON core_taskcomment
+    FOR EACH ROW EXECUTE FUNCTION core_taskcomment_search_vector();
+
+UPDATE core_task SET search_vector =
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B');
+
+UPDATE core_taskcomment SET search_vector =
+    setweight(to_tsvector('english', coalesce(content, '')), 'C');
+
+CREATE INDEX task_search_vector_idx ON core_task USING gin (search_vector);
+CREATE INDEX comment_search_vector_idx ON core_taskcomment USING gin (search_vector);
+"""
+
+UNINSTALL_SQL = """
+DROP INDEX IF EXISTS comment_search_vector_idx;
+DROP INDEX IF EXISTS task_search_vector_idx;
+DROP TRIGGER IF EXISTS core_taskcomment_search_vector_trigger ON core_taskcomment;
+DROP FUNCTION IF EXISTS core_taskcomment_search_vector();
+DROP TRIGGER IF EXISTS core_task_search_vector_trigger ON core_task;
+DROP FUNCTION IF EXISTS core_task_search_vector();
+"""
+
+
+def install_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(INSTALL_SQL, params=None)
+
+
+def uninstall_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(UNINSTALL_SQL, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_task_organization_not_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='taskcomment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_rows(apps, schema_editor):
+    # Give every existing row its own number so that syncing from cursor 0
+    # returns it; updated_at starts out as the creation time.
+    Organization = apps.get_model("core", "Organization")
+    models_to_number = [
+        apps.get_model("core", name) for name in ("Project", "Task", "TaskComment")
+    ]
+    for model in models_to_number:
+        model.objects.update(updated_at=F("created_at"))
+    for org_id in Organization.objects.values_list("pk", flat=True).iterator():
+        seq = 0
+        for model in models_to_number:
+            rows = list(model.objects.filter(organization_id=org_id).only("pk"))
+            for seq, row in enumerate(rows, seq + 1):
+                row.change_seq = seq
+            model.objects.bulk_update(rows, ["change_seq"], batch_size=1000)
+        Organization.objects.filter(pk=org_id).update(change_seq=seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_search_vectors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('PROJECT', 'Project'), ('TASK', 'Task'), ('COMMENT', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('change_seq', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='pruned_change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='taskcomment',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='taskcomment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['organization', 'change_seq'], name='project_org_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'change_seq'], name='task_org_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['organization', 'change_seq'], name='comment_org_change_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='core.organization'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['organization', 'change_seq'], name='tombstone_org_change_idx'),
+        ),
+        migrations.RunPython(number_existing_rows, migrations.RunPython.noop),
+    ]
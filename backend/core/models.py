@@ -1,5 +1,9 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from django.utils.text import slugify
+from .ranking import MAX_RANK_LENGTH, rank_after, spread_ranks
 from django.contrib.auth.models import User
 
 
@@ -13,17 +17,124 @@ class Organization(models.Model):
 
     members = models.ManyToManyField(User, related_name="organizations", blank=True)
 
+    # The tenant's latest change sequence number (see ChangeTracked), and the
+    # newest one whose tombstone has been pruned.
+    change_seq = models.BigIntegerField(default=0, editable=False)
+    pruned_change_seq = models.BigIntegerField(default=0, editable=False)
+
+    SEQUENCE_FIELDS = ("change_seq", "pruned_change_seq")
+
     def save(self, *args, **kwargs):
         # Automatically create a slug from the name if not provided.
         if not self.slug:
             self.slug = slugify(str(self.name))
+        # The sequences are only ever advanced with F() updates (but a copy
+        # to another database writes everything).
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and kwargs.get("using") in (None, self._state.db)
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SEQUENCE_FIELDS
+            ]
         super().save(*args, **kwargs)
 
+    @classmethod
+    def touch(cls, org_ids):
+        """Advance the sequence of tenants whose other data changed (see core.etags)."""
+        cls.objects.filter(pk__in=org_ids).update(change_seq=F("change_seq") + 1)
+
+    @classmethod
+    def allocate_change_seqs(cls, org_id, count=1):
+        """Reserve `count` consecutive change sequence numbers; returns the first.
+
+        Call inside the transaction that writes the numbered rows: the UPDATE
+        locks the organization row until it ends, so a tenant's numbers
+        become visible in order.
+
+        That lock is the price of a gap-free cursor: changesSince can hand
+        out "everything after N" only because no row numbered below N can
+        still commit. It also means a tenant's writing transactions commit
+        one at a time from their first allocation on, and a slow transaction
+        (a large bulk mutation) holds up every other write in that tenant.
+        Other tenants are unaffected. Keep numbered writes at the end of
+        their transactions, and number bulk writes with one allocation per
+        tenant (stamp_changes, Project.adjust_task_counters_many).
+        """
+        # One UPDATE ... RETURNING (PostgreSQL, SQLite 3.35+) instead of an
+        # UPDATE and a SELECT on every write.
+        connection = connections[router.db_for_write(cls)]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET change_seq = change_seq + %s WHERE id = %s "
+                "RETURNING change_seq",
+                [count, org_id],
+            )
+            (last,) = cursor.fetchone()
+        return last - count + 1
+
     def __str__(self):
         return str(self.name)
 
 
-class Project(models.Model):
+def _delete_where_in(model, column, values):
+    connection = connections[router.db_for_write(model)]
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ", ".join(["%s"] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {connection.ops.quote_name(column)} "
+            f"IN ({placeholders})",
+            list(values),
+        )
+
+
+class ChangeTracked(models.Model):
+    """
+    Rows the changesSince query syncs. Every write stamps the row with the
+    next number of its tenant's change sequence, so "everything after cursor
+    N" is one indexed range scan per table. Deletes leave a Tombstone.
+    """
+
+    updated_at = models.DateTimeField(auto_now=True)
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "updated_at", "change_seq"}
+        # Allocate and write together, so no row with a lower number can
+        # commit after this one.
+        with transaction.atomic(savepoint=False):
+            self.change_seq = Organization.allocate_change_seqs(self.organization_id)
+            super().save(*args, **kwargs)
+
+
+def stamp_changes(instances):
+    """Number rows written by bulk_create / bulk_update (see ChangeTracked).
+
+    Call inside the transaction that writes them.
+    """
+    tenants = {}
+    for instance in instances:
+        tenants.setdefault(instance.organization_id, []).append(instance)
+    now = timezone.now()
+    for org_id, rows in tenants.items():
+        first = Organization.allocate_change_seqs(org_id, len(rows))
+        for seq, instance in enumerate(rows, first):
+            instance.change_seq = seq
+            if isinstance(instance, ChangeTracked):
+                instance.updated_at = now
+
+
+class Project(ChangeTracked):
     class Status(models.TextChoices):
         ACTIVE = "ACTIVE", "Active"  # type: ignore
         COMPLETED = "COMPLETED", "Completed"  # type: ignore
@@ -45,11 +156,126 @@ class Project(models.Model):
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Per-status task counters, kept in step with the tasks table by
+    # Task.save() and the post_delete signal. rebuild_task_counters repairs
+    # any drift.
+    todo_task_count = models.IntegerField(default=0)
+    in_progress_task_count = models.IntegerField(default=0)
+    done_task_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Organization project lists, newest first.
+            models.Index(
+                fields=["organization", "created_at"], name="project_org_created_idx"
+            ),
+            models.Index(
+                fields=["organization", "change_seq"], name="project_org_change_idx"
+            ),
+        ]
+
+    TASK_COUNTERS = {
+        "TODO": "todo_task_count",
+        "IN_PROGRESS": "in_progress_task_count",
+        "DONE": "done_task_count",
+    }
+
+    def save(self, *args, **kwargs):
+        # Counters are only ever changed with F() updates; never write back
+        # the (possibly stale) values loaded with this instance.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.TASK_COUNTERS.values()
+                and field.attname not in self.get_deferred_fields()
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def task_total(self):
+        return sum(getattr(self, field) for field in self.TASK_COUNTERS.values())
+
+    @classmethod
+    def adjust_task_counters(
+        cls, project_id, deltas, organization_id=None, change_seq=None
+    ):
+        """Apply `{status: delta}` to a project's counters in one UPDATE."""
+        changes = {}
+        for status, delta in deltas.items():
+            field = cls.TASK_COUNTERS.get(status)
+            if field and delta:
+                changes[field] = changes.get(field, 0) + delta
+        if changes:
+            cls.set_task_counters(
+                project_id,
+                {field: F(field) + delta for field, delta in changes.items()},
+                organization_id,
+                change_seq,
+            )
+
+    @classmethod
+    def adjust_task_counters_many(cls, counter_changes, organization_ids):
+        """adjust_task_counters for several projects, numbering them together.
+
+        `counter_changes` maps project ids to `{status: delta}`, and
+        `organization_ids` maps the same project ids to their tenants.
+        """
+        tenants = {}
+        for project_id in counter_changes:
+            tenants.setdefault(organization_ids[project_id], []).append(project_id)
+        with transaction.atomic(savepoint=False):
+            for organization_id, project_ids in tenants.items():
+                first = Organization.allocate_change_seqs(
+                    organization_id, len(project_ids)
+                )
+                for change_seq, project_id in enumerate(project_ids, first):
+                    cls.adjust_task_counters(
+                        project_id,
+                        counter_changes[project_id],
+                        organization_id,
+                        change_seq=change_seq,
+                    )
+
+    @classmethod
+    def set_task_counters(
+        cls, project_id, counters, organization_id=None, change_seq=None
+    ):
+        # Counts are synced to clients like any other project field.
+        if organization_id is None:
+            organization_id = cls.objects.values_list(
+                "organization_id", flat=True
+            ).get(pk=project_id)
+        with transaction.atomic(savepoint=False):
+            if change_seq is None:
+                change_seq = Organization.allocate_change_seqs(organization_id)
+            cls.objects.filter(pk=project_id).update(
+                **counters, updated_at=timezone.now(), change_seq=change_seq
+            )
+
     def __str__(self):
         return f"{self.name} ({self.organization.name})"
 
 
-class Task(models.Model):
+class TenantQuerySet(models.QuerySet):
+    def for_org(self, org):
+        """Rows belonging to `org` (an Organization or its id)."""
+        return self.filter(organization_id=getattr(org, "pk", org))
+
+
+class SearchableManager(models.Manager.from_queryset(TenantQuerySet)):
+    """Leaves the search_vector column out of loaded rows.
+
+    Only core/search.py filters on the vectors; every other read would load a
+    tsvector that nothing uses.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer("search_vector")
+
+
+class Task(ChangeTracked):
     class Status(models.TextChoices):
         TODO = "TODO", "To Do"  # type: ignore
         IN_PROGRESS = "IN_PROGRESS", "In Progress"  # type: ignore
@@ -60,6 +286,13 @@ class Task(models.Model):
         on_delete=models.CASCADE,
         related_name="tasks",
     )
+    # Copied from the project when the task is created, so tenant filters
+    # don't have to join through core_project.
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="tasks",
+    )
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     status = models.CharField(
@@ -71,15 +304,230 @@ class Task(models.Model):
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Position inside the project's status column (see core/ranking.py).
+    rank = models.CharField(max_length=255, blank=True, default="")
+
+    # Weighted title + description, maintained by a database trigger on
+    # PostgreSQL (see core/search.py). Unused on other databases.
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    objects = SearchableManager()
+
+    class Meta:
+        ordering = ["rank", "id"]
+        indexes = [
+            # Board columns; also serves plain (project, status) filters.
+            models.Index(
+                fields=["project", "status", "rank"], name="task_column_rank_idx"
+            ),
+            # Project task lists, paginated by creation time.
+            models.Index(
+                fields=["project", "created_at"], name="task_project_created_idx"
+            ),
+            # "My tasks": open tasks by assignee, newest first.
+            models.Index(
+                fields=["assignee_email", "created_at"],
+                name="task_open_assignee_idx",
+                condition=~Q(status="DONE"),
+            ),
+            models.Index(
+                fields=["organization", "change_seq"], name="task_org_change_idx"
+            ),
+        ]
+
+    @classmethod
+    def last_rank(cls, project_id, status):
+        return (
+            cls.objects.filter(project_id=project_id, status=status)
+            .order_by("-rank")
+            .values_list("rank", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def rebalance_column(cls, project_id, status):
+        """Respread the ranks of one column so they are short again."""
+        with transaction.atomic(savepoint=False):
+            tasks = list(
+                cls.objects.filter(project_id=project_id, status=status)
+                .order_by("rank", "id")
+                .only("pk", "organization_id", "rank")
+            )
+            for task, rank in zip(tasks, spread_ranks(len(tasks))):
+                task.rank = rank
+            stamp_changes(tasks)
+            cls.objects.bulk_update(
+                tasks, ["rank", "updated_at", "change_seq"], batch_size=500
+            )
+
+    @classmethod
+    def delete_rows(cls, ids):
+        """Delete tasks and their comments with one DELETE per table.
+
+        No rows are loaded and no signals are sent: callers record the
+        tombstones and adjust the project counters themselves.
+        """
+        if not ids:
+            return
+        with transaction.atomic(savepoint=False):
+            _delete_where_in(TaskComment, "task_id", ids)
+            _delete_where_in(cls, "id", ids)
+
+    def project_organization_id(self):
+        if Task.project.is_cached(self):
+            return self.project.organization_id
+        return Project.objects.values_list("organization_id", flat=True).get(
+            pk=self.project_id
+        )
+
+    def needs_rebalance(self):
+        return len(self.rank) > MAX_RANK_LENGTH
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so save() can move the project counters.
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get("update_fields")
+        # Saves that don't write the status column leave the counters alone.
+        tracked = adding or (
+            "status" not in self.get_deferred_fields()
+            and (update_fields is None or "status" in update_fields)
+        )
+
+        old_status = None
+        if tracked and not adding:
+            old_status = getattr(self, "_loaded_status", None)
+            if old_status is None:
+                old_status = (
+                    Task.objects.filter(pk=self.pk)
+                    .values_list("status", flat=True)
+                    .first()
+                )
+
+        if adding:
+            self.organization_id = self.project_organization_id()
+
+        appended = adding and not self.rank
+        if appended:
+            # New tasks go to the bottom of their column.
+            self.rank = rank_after(Task.last_rank(self.project_id, self.status))
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if tracked and old_status != self.status:
+                deltas = {self.status: 1}
+                if old_status is not None:
+                    deltas[old_status] = deltas.get(old_status, 0) - 1
+                Project.adjust_task_counters(
+                    self.project_id, deltas, self.organization_id
+                )
+            if appended and self.needs_rebalance():
+                Task.rebalance_column(self.project_id, self.status)
+                self.rank = (
+                    Task.objects.values_list("rank", flat=True).get(pk=self.pk)
+                )
+        if tracked:
+            self._loaded_status = self.status
+
     def __str__(self):
         return str(self.title)
 
 
-class TaskComment(models.Model):
+class TaskComment(ChangeTracked):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="comments")
+    # Copied from the task when the comment is created (see Task.organization).
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="task_comments",
+    )
     content = models.TextField()
     author_email = models.EmailField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Comment content, maintained like Task.search_vector.
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    objects = SearchableManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task", "created_at"], name="comment_task_created_idx"),
+            models.Index(
+                fields=["organization", "change_seq"], name="comment_org_change_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            if TaskComment.task.is_cached(self):
+                self.organization_id = self.task.organization_id
+            else:
+                self.organization_id = Task.objects.values_list(
+                    "organization_id", flat=True
+                ).get(pk=self.task_id)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Comment by {self.author_email} on {self.task.title}"  # type:ignore
+
+
+class Tombstone(models.Model):
+    """
+    A deleted project, task or comment, kept so changesSince can tell clients
+    to drop it. Rows deleted along with their parent get none: a project's
+    tombstone covers its tasks, and a task's covers its comments.
+    """
+
+    class Kind(models.TextChoices):
+        PROJECT = "PROJECT", "Project"  # type: ignore
+        TASK = "TASK", "Task"  # type: ignore
+        COMMENT = "COMMENT", "Comment"  # type: ignore
+
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="tombstones"
+    )
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    change_seq = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "change_seq"], name="tombstone_org_change_idx"
+            ),
+        ]
+
+    @classmethod
+    def record(cls, kind, instances):
+        """Tombstone deleted rows; call inside the deleting transaction."""
+        tombstones = [
+            cls(
+                organization_id=instance.organization_id,
+                kind=kind,
+                object_id=instance.pk,
+            )
+            for instance in instances
+        ]
+        stamp_changes(tombstones)
+        cls.objects.bulk_create(tombstones)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class PersistedQuery(models.Model):
+    # Registered GraphQL documents, addressed by the SHA-256 of their text so
+    # clients can send the hash instead of the full query.
+    sha256 = models.CharField(max_length=64, unique=True)
+    query = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
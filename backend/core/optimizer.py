@@ -0,0 +1,263 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, prefetch_related_objects
+from graphene.utils.str_converters import to_snake_case
+from graphql import FragmentSpreadNode, InlineFragmentNode, get_named_type
+from graphql.execution.values import get_argument_values
+
+from .pagination import page_attr, page_size
+
+
+# Selection-set aware queryset optimizer.
+#
+# Walks the fields a GraphQL operation asks for and turns them into
+# select_related / prefetch_related / only() calls on the root queryset, so
+# nested lists such as project { tasks { comments } } load in one query per
+# level instead of one query per parent row.
+#
+# Non-model fields can declare what they need through an `optimizer_hints`
+# dict on the DjangoObjectType:
+#
+#     optimizer_hints = {
+#         "task_count": {"only": list(Project.TASK_COUNTERS.values())},
+#         "completed_task_count": {"only": ["done_task_count"]},
+#     }
+#
+# "only" lists extra columns the resolver reads (here the denormalized
+# counters), "prefetch" extra relations it walks, and "queryset" a callable
+# applied to the queryset that loads the type (for annotations).
+#
+# Nested keyset connections declare a "page" hint naming the reverse relation
+# they page through, the ordering key and the arguments that filter it:
+#
+#     "tasks_connection": {"page": {"relation": "tasks", "filters": ["status"]}}
+#
+# The first page of every parent is then prefetched with one sliced
+# (ROW_NUMBER() OVER (PARTITION BY parent)) query, and the resolver reads it
+# back with pagination.prefetched_page. Requests for later pages (`after`)
+# still run one keyset query per parent.
+
+
+class QueryPlan:
+    def __init__(self):
+        self.only = set()
+        self.select_related = set()
+        self.prefetch = []
+        self.transforms = []
+
+    def apply(self, queryset):
+        for transform in self.transforms:
+            queryset = transform(queryset)
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        if self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def optimize(queryset, info, path=()):
+    """Apply the plan for the fields selected under `info` to `queryset`.
+
+    `path` descends through wrapper fields first, e.g. ("edges", "node") for
+    a connection.
+    """
+    graphql_type, selections = _resolve_path(info, path)
+    if graphql_type is None:
+        return queryset
+    plan = _build_plan(info, queryset.model, graphql_type, selections)
+    if plan.only:
+        # Related managers (project.tasks.all()) read the FK back from every
+        # row they return; keep it loaded instead of fetching it per row.
+        for field in queryset._known_related_objects:
+            plan.only.add(field.attname)
+    return plan.apply(queryset)
+
+
+def optimize_instance(instance, info, path=()):
+    """Prefetch the relations selected under `info` onto an already loaded object."""
+    graphql_type, selections = _resolve_path(info, path)
+    if graphql_type is None:
+        return instance
+    plan = _build_plan(
+        info, type(instance), graphql_type, selections, allow_select_related=False
+    )
+    if plan.prefetch:
+        prefetch_related_objects([instance], *plan.prefetch)
+    return instance
+
+
+def _resolve_path(info, path):
+    graphql_type = get_named_type(info.return_type)
+    selections = _collect(info, info.field_nodes)
+    return _descend(info, graphql_type, selections, path)
+
+
+def _descend(info, graphql_type, selections, path):
+    for name in path:
+        fields = getattr(graphql_type, "fields", None) or {}
+        if name not in fields:
+            return None, []
+        graphql_type = get_named_type(fields[name].type)
+        selections = _collect(
+            info, [node for node in selections if node.name.value == name]
+        )
+    return graphql_type, selections
+
+
+def _collect(info, field_nodes):
+    """Flatten the sub-selections of `field_nodes`, expanding fragments."""
+    collected = []
+
+    def walk(selection_set):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpreadNode):
+                walk(info.fragments[selection.name.value].selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                walk(selection.selection_set)
+            else:
+                collected.append(selection)
+
+    for node in field_nodes:
+        walk(node.selection_set)
+    return collected
+
+
+def _build_plan(info, model, graphql_type, selections, allow_select_related=True):
+    plan = QueryPlan()
+    graphene_type = getattr(graphql_type, "graphene_type", None)
+    hints = getattr(graphene_type, "optimizer_hints", {})
+
+    grouped = {}
+    for node in selections:
+        grouped.setdefault(node.name.value, []).append(node)
+
+    for graphql_name, nodes in grouped.items():
+        if graphql_name.startswith("__"):
+            continue
+        name = to_snake_case(graphql_name)
+
+        hint = hints.get(name)
+        if hint:
+            plan.only.update(hint.get("only", ()))
+            plan.prefetch.extend(hint.get("prefetch", ()))
+            if "queryset" in hint and hint["queryset"] not in plan.transforms:
+                plan.transforms.append(hint["queryset"])
+            if "page" in hint:
+                field_def = graphql_type.fields[graphql_name]
+                prefetch = _page_prefetch(
+                    info, model, field_def, nodes, name, hint["page"]
+                )
+                if prefetch is not None:
+                    plan.prefetch.append(prefetch)
+            continue
+
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+
+        if not field.is_relation:
+            plan.only.add(field.name)
+            continue
+
+        child_type = get_named_type(graphql_type.fields[graphql_name].type)
+        child_selections = _collect(info, nodes)
+        related_model = field.related_model
+
+        if field.concrete and (field.many_to_one or field.one_to_one):
+            child = _build_plan(
+                info,
+                related_model,
+                child_type,
+                child_selections,
+                allow_select_related=allow_select_related,
+            )
+            plan.only.add(field.name)
+            if allow_select_related and not child.transforms:
+                # Join the parent in and fold its plan into ours.
+                lookup = field.name
+                plan.select_related.add(lookup)
+                plan.select_related.update(
+                    f"{lookup}__{related}" for related in child.select_related
+                )
+                plan.only.update(f"{lookup}__{column}" for column in child.only)
+                plan.prefetch.extend(
+                    _prefix_prefetch(f"{lookup}__", related) for related in child.prefetch
+                )
+            else:
+                plan.prefetch.append(
+                    Prefetch(
+                        field.name,
+                        queryset=child.apply(related_model._default_manager.all()),
+                    )
+                )
+            continue
+
+        # Reverse foreign keys and many-to-many relations are prefetched with
+        # their own optimized queryset.
+        child = _build_plan(
+            info,
+            related_model,
+            child_type,
+            child_selections,
+            allow_select_related=True,
+        )
+        if field.one_to_many:
+            # The prefetch matches rows back to parents through this column.
+            child.only.add(field.remote_field.name)
+        accessor = field.get_accessor_name() if field.auto_created else field.name
+        plan.prefetch.append(
+            Prefetch(
+                accessor,
+                queryset=child.apply(related_model._default_manager.all()),
+            )
+        )
+
+    return plan
+
+
+def _page_prefetch(info, model, field_def, nodes, name, page):
+    """Prefetch the first page of a nested connection for every parent."""
+    arguments = [
+        get_argument_values(field_def, node, info.variable_values) for node in nodes
+    ]
+    args = arguments[0]
+    # Aliases asking for different pages, later pages and invalid sizes are
+    # left to the resolver.
+    if any(other != args for other in arguments) or args.get("after"):
+        return None
+    first = args.get("first")
+    if first is not None and first < 0:
+        return None
+
+    relation = model._meta.get_field(page["relation"])
+    related_model = relation.related_model
+    key = page.get("key", "created_at")
+    node_type, selections = _descend(
+        info, get_named_type(field_def.type), _collect(info, nodes), ("edges", "node")
+    )
+    child = _build_plan(info, related_model, node_type, selections)
+    if child.only:
+        # Rows are matched to parents by the FK and cursors built from the key.
+        child.only.update({relation.remote_field.name, key})
+
+    queryset = related_model._default_manager.filter(
+        **{f: args[f] for f in page.get("filters", ()) if args.get(f)}
+    )
+    queryset = child.apply(queryset).order_by(key, "pk")[: page_size(first) + 1]
+    return Prefetch(
+        relation.get_accessor_name(), queryset=queryset, to_attr=page_attr(name)
+    )
+
+
+def _prefix_prefetch(prefix, lookup):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(
+            prefix + lookup.prefetch_through,
+            queryset=lookup.queryset,
+            to_attr=lookup.to_attr,
+        )
+    return prefix + lookup
@@ -0,0 +1,120 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from graphene import relay
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# Keyset (seek) pagination over a (timestamp, id) pair.
+#
+# Each page is fetched with `WHERE (ts, id) > (cursor_ts, cursor_id)` and a
+# LIMIT, so the cost of a page doesn't depend on how deep into the list it
+# is, unlike OFFSET. Cursors are opaque base64 blobs of the last row's key.
+
+
+def encode_cursor(timestamp, pk):
+    raw = json.dumps([timestamp.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp = parse_datetime(timestamp)
+    except (ValueError, TypeError):
+        raise Exception("invalid cursor")
+    if timestamp is None or not isinstance(pk, int):
+        raise Exception("invalid cursor")
+    return timestamp, pk
+
+
+def page_size(first):
+    if first is None:
+        return DEFAULT_PAGE_SIZE
+    if first < 0:
+        raise Exception("first must be a non-negative integer")
+    return min(first, MAX_PAGE_SIZE)
+
+
+def paginate(queryset, first=None, after=None, key="created_at", descending=False):
+    """Return one page of `queryset` ordered by (key, id) and whether more follow."""
+    first = page_size(first)
+
+    if after:
+        timestamp, pk = decode_cursor(after)
+        op = "lt" if descending else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{key}__{op}": timestamp}) | Q(**{key: timestamp, f"pk__{op}": pk})
+        )
+
+    # The cursor is built from `key`, so it must survive an only() applied by
+    # the optimizer.
+    field_names, deferred = queryset.query.deferred_loading
+    if field_names and not deferred:
+        queryset = queryset.only(*field_names, key)
+
+    direction = "-" if descending else ""
+    rows = list(queryset.order_by(f"{direction}{key}", f"{direction}pk")[: first + 1])
+    return rows[:first], len(rows) > first
+
+
+def prefetched_page(parent, name, first=None, after=None):
+    """Return `(rows, has_next)` the optimizer prefetched for `parent.<name>`.
+
+    Nested connections on a list of parents would otherwise run one keyset
+    query per parent; the optimizer loads the first page of every parent in
+    one windowed query instead (see the "page" optimizer hint). Later pages
+    aren't prefetched, and None means paginate as usual.
+    """
+    rows = getattr(parent, page_attr(name), None)
+    if rows is None or after:
+        return None
+    first = page_size(first)
+    return rows[:first], len(rows) > first
+
+
+def page_attr(name):
+    return f"_{name}_page"
+
+
+def connection_from_queryset(
+    connection_type, queryset, first=None, after=None, key="created_at", descending=False
+):
+    rows, has_next = paginate(queryset, first, after, key, descending)
+    return connection_from_page(connection_type, rows, has_next, after, key)
+
+
+def connection_from_page(connection_type, rows, has_next, after=None, key="created_at"):
+    edges = [
+        connection_type.Edge(node=row, cursor=encode_cursor(getattr(row, key), row.pk))
+        for row in rows
+    ]
+    page_info = relay.PageInfo(
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+        has_next_page=has_next,
+        has_previous_page=bool(after),
+    )
+    return connection_type(edges=edges, page_info=page_info)
+
+
+# Ranked lists (search results) have no stable key to seek on, so their
+# cursors carry an offset instead. Keep them for shallow result lists only.
+
+
+def encode_offset_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+
+def decode_offset_cursor(cursor):
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"]
+    except (ValueError, TypeError, KeyError):
+        raise Exception("invalid cursor")
+    if not isinstance(offset, int) or offset < 0:
+        raise Exception("invalid cursor")
+    return offset
@@ -0,0 +1,105 @@
+# Lexicographic fractional ranks for ordering tasks inside a board column.
+#
+# A rank is a string of base-36 digits read as a fraction (0.xyz...), so a
+# new rank can always be generated between two neighbours and a move only
+# rewrites the moved row. Ranks never end in "0", which keeps string order
+# and numeric order identical. Only digits and lowercase letters are used so
+# the order is the same under any database collation.
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Columns whose ranks grow past this length get respread (see
+# Task.rebalance_column).
+MAX_RANK_LENGTH = 24
+
+
+def rank_between(before, after):
+    """Return a rank strictly between `before` and `after`.
+
+    Either bound may be None (or "") for the start or end of the column.
+    Raises ValueError if `before` doesn't sort before `after`.
+    """
+    before = before or ""
+    after = after or None
+    if after is not None and before >= after:
+        raise ValueError(f"{before!r} does not sort before {after!r}")
+    if before.endswith(DIGITS[0]) or (after or "").endswith(DIGITS[0]):
+        raise ValueError("ranks must not end with the zero digit")
+    if after is None:
+        return rank_after(before)
+    return _midpoint(before, after)
+
+
+def rank_after(before):
+    """Return a short rank after `before`, for appending to a column.
+
+    Increments the shortest prefix of `before` that has room, rather than
+    bisecting towards the end of the column, so appends only add a digit
+    once every len(DIGITS) - 1 ranks.
+    """
+    before = before or ""
+    n = 1
+    while True:
+        # Missing digits of `before` count as zeros.
+        prefix = before[:n].ljust(n, DIGITS[0]).rstrip(DIGITS[-1])
+        if prefix:
+            return prefix[:-1] + DIGITS[DIGITS.index(prefix[-1]) + 1]
+        n += 1
+
+
+def _midpoint(a, b):
+    zero = DIGITS[0]
+    if b is not None:
+        # Copy the common prefix, treating missing digits of `a` as zeros.
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else zero) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+
+    # The first digits are adjacent.
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def spread_ranks(count):
+    """Return `count` short, evenly spaced ranks in ascending order."""
+    base = len(DIGITS)
+    width = 1
+    while base**width <= count:
+        width += 1
+    width += 1  # leave room to insert between neighbours
+    step = base**width // (count + 1)
+
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, base)
+            digits.append(DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return ranks
+
+
+def ranks_between(before, after, count):
+    """Return `count` ascending ranks between `before` and `after`.
+
+    Splits the gap recursively so rank length grows with log(count) rather
+    than count, e.g. when appending a whole batch to a column.
+    """
+    if count <= 0:
+        return []
+    middle = rank_between(before, after)
+    left = (count - 1) // 2
+    return (
+        ranks_between(before, middle, left)
+        + [middle]
+        + ranks_between(middle, after, count - 1 - left)
+    )
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.contrib.auth import authenticate
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+from graphql import FieldNode, OperationType, value_from_ast_untyped
+from graphql_jwt.utils import get_http_authorization
+
+from .cache import LRUCache
+from .conf import settings_group
+from .tenancy import is_member, project_organization_id, resolve_organization
+
+# Tenant-scoped GraphQL response cache.
+#
+# Read operations whose root fields all belong to one organization are cached
+# under (document hash, operation name, variables, tenant, permission scope,
+# tenant generation). Writes to a tenant's data bump its generation (see
+# core.signals), so stale entries are simply never looked up again and age
+# out of the backend.
+
+DEFAULTS = {
+    "ENABLED": False,
+    "BACKEND": "core.response_cache.LocalResponseCache",
+    # Options for the backend: MAX_ENTRIES for the local LRU, ALIAS for the
+    # Django cache used by DjangoResponseCache.
+    "OPTIONS": {},
+    "TIMEOUT": 300,
+}
+
+# Root fields that can be cached, and the argument naming their tenant.
+CACHEABLE_FIELDS = {
+    "projects": "orgSlug",
+    "projectsConnection": "orgSlug",
+    "organization": "slug",
+    "project": "id",
+    "search": "orgSlug",
+}
+
+
+class LocalResponseCache:
+    """In-process LRU backend; each worker keeps its own entries."""
+
+    def __init__(self, timeout, options):
+        self.entries = LRUCache(maxsize=options.get("MAX_ENTRIES", 1024), ttl=timeout)
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries.set(key, value)
+
+    def generation(self, tenant_id):
+        return self.generations.get(tenant_id, 0)
+
+    def bump(self, tenant_id):
+        with self.lock:
+            self.generations[tenant_id] = self.generations.get(tenant_id, 0) + 1
+
+    def stats(self):
+        return {"hits": self.entries.hits, "misses": self.entries.misses}
+
+
+class DjangoResponseCache:
+    """Backend on a Django cache (e.g. Redis or Memcached) shared by all workers."""
+
+    def __init__(self, timeout, options):
+        self.cache = caches[options.get("ALIAS", "default")]
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def generation(self, tenant_id):
+        key = f"gql:generation:{tenant_id}"
+        # Seed missing counters with a fresh value so an evicted counter can't
+        # fall back to a generation that old entries were stored under.
+        self.cache.add(key, time.time_ns(), None)
+        return self.cache.get(key)
+
+    def bump(self, tenant_id):
+        key = f"gql:generation:{tenant_id}"
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, time.time_ns(), None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_backend = None
+
+
+get_config = settings_group("GRAPHQL_RESPONSE_CACHE", DEFAULTS)
+
+
+def get_response_cache():
+    """Return the configured backend, or None when the cache is disabled."""
+    global _backend
+    config = get_config()
+    if not config["ENABLED"]:
+        return None
+    if _backend is None:
+        backend_class = import_string(config["BACKEND"])
+        _backend = backend_class(config["TIMEOUT"], config["OPTIONS"])
+    return _backend
+
+
+@get_config.on_change
+def _reset_backend():
+    global _backend
+    _backend = None
+
+
+def stats():
+    backend = get_response_cache()
+    if backend is None:
+        return {"enabled": False}
+    counts = backend.stats()
+    lookups = counts["hits"] + counts["misses"]
+    return {
+        "enabled": True,
+        **counts,
+        "hitRate": round(counts["hits"] / lookups, 4) if lookups else None,
+    }
+
+
+def invalidate_tenant(org_id):
+    """Bump the generation of `org_id` once the current transaction commits."""
+    backend = get_response_cache()
+    if backend is not None and org_id is not None:
+        transaction.on_commit(lambda: backend.bump(org_id))
+
+
+def request_user(request):
+    """The request's user, authenticating a JWT up front if one was sent."""
+    user = getattr(request, "user", None)
+    if (user is None or user.is_anonymous) and get_http_authorization(request):
+        try:
+            user = authenticate(request=request)
+        except Exception:
+            # Leave the error for the resolvers to report.
+            return None
+        if user is not None:
+            request.user = user
+    return user
+
+
+def cache_key(backend, request, document_hash, operation, variables, operation_name):
+    """Return the cache key for `operation`, or None if it can't be cached."""
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+
+    user = request_user(request)
+    if user is None or not user.is_authenticated:
+        return None
+
+    tenants = set()
+    for selection in operation.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return None
+        name = selection.name.value
+        if name == "__typename":
+            continue
+        if name not in CACHEABLE_FIELDS:
+            return None
+        tenant = field_tenant(user, selection, CACHEABLE_FIELDS[name], variables)
+        if tenant is None:
+            return None
+        tenants.add(tenant)
+
+    if len(tenants) != 1:
+        return None
+    org_id, member = tenants.pop()
+    if user.is_superuser:
+        scope = "superuser"
+    elif member:
+        scope = "member"
+    else:
+        return None
+
+    payload = json.dumps(
+        [
+            document_hash,
+            operation_name,
+            variables or {},
+            org_id,
+            scope,
+            backend.generation(org_id),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return "gql:response:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def field_tenant(user, field, argument_name, variables):
+    """`(org id, is member)` for the tenant a root field's argument names, or None."""
+    value = None
+    for argument in field.arguments:
+        if argument.name.value == argument_name:
+            value = value_from_ast_untyped(argument.value, variables or {})
+    if value is None:
+        return None
+
+    if argument_name == "id":
+        org_id = project_organization_id(value)
+        if org_id is None:
+            return None
+        return org_id, is_member(user, org_id)
+
+    org, member = resolve_organization(user, value)
+    if org is None:
+        return None
+    return org.pk, member
@@ -0,0 +1,134 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .conf import settings_group
+
+# Read-replica routing for /graphql.
+#
+# Everything reads from and writes to the primary unless it runs inside
+# `read_from_replica()`, which the GraphQL view enters for query operations.
+# A replica is only picked while its replication lag (checked at most every
+# LAG_CHECK_INTERVAL seconds) is within MAX_LAG; otherwise reads fall back to
+# the primary. After a mutation the view sets a short-lived signed cookie
+# that keeps that client's reads on the primary, so it never reads data
+# older than its own writes.
+
+DEFAULTS = {
+    # database aliases that serve replicated reads
+    "ALIASES": [],
+    # seconds of replication lag after which a replica is skipped
+    "MAX_LAG": 5.0,
+    "LAG_CHECK_INTERVAL": 5.0,
+    # seconds a client's reads stay on the primary after it writes
+    "STICKY_SECONDS": 10,
+    "COOKIE": "db_primary",
+}
+
+# (checked at, lag in seconds or None when unreachable) per replica alias
+_lag_checks = {}
+
+_replica = ContextVar("replica", default=None)
+
+
+get_config = settings_group("DATABASE_REPLICAS", DEFAULTS)
+get_config.on_change(_lag_checks.clear)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def replica_lag(alias):
+    """Seconds `alias` is behind the primary, or None if it can't be reached."""
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked is not None and now - checked[0] < get_config()["LAG_CHECK_INTERVAL"]:
+        return checked[1]
+
+    connection = connections[alias]
+    lag = 0.0
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+            else:
+                cursor.execute("SELECT 1")
+    except DatabaseError:
+        lag = None
+    _lag_checks[alias] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    """A random replica that is close enough to the primary, or None."""
+    max_lag = get_config()["MAX_LAG"]
+    candidates = []
+    for alias in get_config()["ALIASES"]:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            candidates.append(alias)
+    return random.choice(candidates) if candidates else None
+
+
+@contextmanager
+def read_from(alias):
+    """Route reads in this block to `alias` (None for the primary)."""
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+def read_from_replica():
+    """Route reads in this block to a replica; yields its alias or None."""
+    return read_from(choose_replica())
+
+
+def pinned_to_primary(request):
+    config = get_config()
+    return (
+        request.get_signed_cookie(
+            config["COOKIE"],
+            default=None,
+            salt=config["COOKIE"],
+            max_age=config["STICKY_SECONDS"],
+        )
+        is not None
+    )
+
+
+def pin_to_primary(response):
+    config = get_config()
+    if not config["ALIASES"]:
+        return
+    response.set_signed_cookie(
+        config["COOKIE"],
+        "1",
+        salt=config["COOKIE"],
+        max_age=config["STICKY_SECONDS"],
+        httponly=True,
+        samesite="Lax",
+    )
@@ -1,7 +1,36 @@
+from functools import partial
+
 import graphene
 import graphql_jwt
+from django.db import transaction
+from graphene import relay
+from graphene.types.generic import GenericScalar
 from graphene_django import DjangoObjectType
-from .models import Organization, Project, Task, TaskComment
+from . import events
+from .async_execution import run_sync
+from .broker import get_broker
+from .models import (
+    Organization,
+    Project,
+    Task,
+    TaskComment,
+    Tombstone,
+    stamp_changes,
+)
+from .optimizer import optimize, optimize_instance
+from .pagination import (
+    connection_from_page,
+    connection_from_queryset,
+    decode_offset_cursor,
+    encode_offset_cursor,
+    page_size,
+    prefetched_page,
+)
+from .ranking import rank_between, ranks_between
+from .response_cache import invalidate_tenant
+from .search import search
+from .sync import change_limit, changes_since, decode_change_cursor
+from .tenancy import is_member, project_organization_id, resolve_organization
 from django.contrib.auth.models import User
 
 
@@ -18,37 +47,140 @@ class UserType(DjangoObjectType):
         return self.organization_set.all()
 
 
+class UserConnection(relay.Connection):
+    class Meta:
+        node = UserType
+
+
 class OrganizationType(DjangoObjectType):
     class Meta:
         model = Organization
         fields = "__all__"
 
+    members_connection = graphene.Field(
+        UserConnection, first=graphene.Int(), after=graphene.String()
+    )
+
+    def resolve_members_connection(self, info, first=None, after=None):
+        members = optimize(self.members.all(), info, path=("edges", "node"))
+        return connection_from_queryset(
+            UserConnection, members, first, after, key="date_joined"
+        )
+
 
 class TaskCommentType(DjangoObjectType):
     class Meta:
         model = TaskComment
-        fields = "__all__"
+        exclude = ["search_vector"]
+
+
+class TaskCommentConnection(relay.Connection):
+    class Meta:
+        node = TaskCommentType
 
 
 class TaskType(DjangoObjectType):
+    optimizer_hints = {
+        "comments_connection": {"page": {"relation": "comments"}},
+    }
+
     class Meta:
         model = Task
-        fields = "__all__"
+        exclude = ["search_vector"]
+
+    comments_connection = graphene.Field(
+        TaskCommentConnection, first=graphene.Int(), after=graphene.String()
+    )
+
+    def resolve_comments_connection(self, info, first=None, after=None):
+        page = prefetched_page(self, "comments_connection", first, after)
+        if page is not None:
+            return connection_from_page(TaskCommentConnection, *page)
+        comments = optimize(self.comments.all(), info, path=("edges", "node"))  # type: ignore
+        return connection_from_queryset(TaskCommentConnection, comments, first, after)
+
+
+class TaskConnection(relay.Connection):
+    class Meta:
+        node = TaskType
 
 
 class ProjectType(DjangoObjectType):
     task_count = graphene.Int()
     completed_task_count = graphene.Int()
 
+    optimizer_hints = {
+        "task_count": {"only": list(Project.TASK_COUNTERS.values())},
+        "completed_task_count": {"only": ["done_task_count"]},
+        "tasks_connection": {"page": {"relation": "tasks", "filters": ["status"]}},
+    }
+
     class Meta:
         model = Project
         fields = "__all__"
 
+    tasks_connection = graphene.Field(
+        TaskConnection,
+        first=graphene.Int(),
+        after=graphene.String(),
+        status=graphene.String(),
+    )
+
+    def resolve_tasks_connection(self, info, first=None, after=None, status=None):
+        page = prefetched_page(self, "tasks_connection", first, after)
+        if page is not None:
+            return connection_from_page(TaskConnection, *page)
+        tasks = self.tasks.all()  # type: ignore
+        if status:
+            tasks = tasks.filter(status=status)
+        tasks = optimize(tasks, info, path=("edges", "node"))
+        return connection_from_queryset(TaskConnection, tasks, first, after)
+
+    # Both counts are read from the project's denormalized counter columns.
     def resolve_task_count(self, _info):
-        return self.tasks.count()  # type: ignore - "tasks" is a reverse relation dynamic attribute
+        return self.task_total
 
     def resolve_completed_task_count(self, _info):
-        return self.tasks.filter(status="DONE").count()  # type: ignore
+        return self.done_task_count
+
+
+class ProjectConnection(relay.Connection):
+    class Meta:
+        node = ProjectType
+
+
+class TombstoneType(DjangoObjectType):
+    class Meta:
+        model = Tombstone
+        fields = ["kind", "object_id", "deleted_at", "change_seq"]
+
+
+class ChangeSetType(graphene.ObjectType):
+    cursor = graphene.String(
+        required=True, description="Pass as `cursor` to fetch the next changes."
+    )
+    has_more = graphene.Boolean(
+        required=True, description="More changes follow; sync again right away."
+    )
+    projects = graphene.List(graphene.NonNull(ProjectType), required=True)
+    tasks = graphene.List(graphene.NonNull(TaskType), required=True)
+    comments = graphene.List(graphene.NonNull(TaskCommentType), required=True)
+    deleted = graphene.List(graphene.NonNull(TombstoneType), required=True)
+
+
+class SearchHitType(graphene.ObjectType):
+    kind = graphene.String(required=True, description='"task" or "comment"')
+    rank = graphene.Float(required=True)
+    snippet = graphene.String(
+        description="HTML-escaped matching text with matches wrapped in <mark> tags."
+    )
+    task = graphene.Field(TaskType)
+    comment = graphene.Field(TaskCommentType)
+
+
+class SearchHitConnection(relay.Connection):
+    class Meta:
+        node = SearchHitType
 
 
 # --- 2. Define Queries ---
@@ -57,34 +189,122 @@ class ProjectType(DjangoObjectType):
 class Query(graphene.ObjectType):
     me = graphene.Field(UserType)
     projects = graphene.List(ProjectType, org_slug=graphene.String(required=True))
+    projects_connection = graphene.Field(
+        ProjectConnection,
+        org_slug=graphene.String(required=True),
+        first=graphene.Int(),
+        after=graphene.String(),
+        status=graphene.String(),
+    )
     project = graphene.Field(ProjectType, id=graphene.ID(required=True))
     my_tasks = graphene.List(TaskType)
+    search = graphene.Field(
+        SearchHitConnection,
+        org_slug=graphene.String(required=True),
+        text=graphene.String(required=True),
+        first=graphene.Int(),
+        after=graphene.String(),
+    )
+
+    changes_since = graphene.Field(
+        ChangeSetType,
+        org_slug=graphene.String(required=True),
+        cursor=graphene.String(description='"0" (the default) fetches everything.'),
+        first=graphene.Int(),
+        description="Projects, tasks and comments changed or deleted after `cursor`.",
+    )
 
     organization = graphene.Field(OrganizationType, slug=graphene.String(required=True))
 
     def resolve_projects(self, info, org_slug):
         user = info.context.user
         org = check_organization_access(user, org_slug)
-        return Project.objects.filter(organization=org).order_by("-created_at")
+        return optimize(
+            Project.objects.filter(organization=org).order_by("-created_at"), info
+        )
 
-    def resolve_project(self, _info, id):
-        return Project.objects.get(pk=id)  # type: ignore
+    def resolve_projects_connection(
+        self, info, org_slug, first=None, after=None, status=None
+    ):
+        user = info.context.user
+        org = check_organization_access(user, org_slug)
+        projects = Project.objects.filter(organization=org)
+        if status:
+            projects = projects.filter(status=status)
+        projects = optimize(projects, info, path=("edges", "node"))
+        return connection_from_queryset(
+            ProjectConnection, projects, first, after, descending=True
+        )
+
+    def resolve_project(self, info, id):
+        return optimize(Project.objects.all(), info).get(pk=id)  # type: ignore
 
     def resolve_my_tasks(self, info):
         user = info.context.user
         if not user.is_authenticated:
             return []
 
-        return (
+        tasks = (
             Task.objects.filter(
                 assignee_email=user.email,
-                project__organization__members=user,
+                organization__members=user,
                 project__status="ACTIVE",
             )
             .exclude(status="DONE")
-            .select_related("project")
-            .order_by("-created_at")[:6]
+            .order_by("-created_at")
         )
+        return optimize(tasks, info)[:6]
+
+    def resolve_search(self, info, org_slug, text, first=None, after=None):
+        user = info.context.user
+        org = check_organization_access(user, org_slug)
+        first = page_size(first)
+        offset = decode_offset_cursor(after) if after else 0
+        hits, has_next = search(org, text, first, offset)
+
+        tasks = optimize(
+            Task.objects.filter(pk__in=[hit.task_id for hit in hits]),
+            info,
+            path=("edges", "node", "task"),
+        ).in_bulk()
+        comments = optimize(
+            TaskComment.objects.filter(pk__in=[hit.comment_id for hit in hits]),
+            info,
+            path=("edges", "node", "comment"),
+        ).in_bulk()
+        for hit in hits:
+            hit.task = tasks.get(hit.task_id)
+            hit.comment = comments.get(hit.comment_id)
+
+        edges = [
+            SearchHitConnection.Edge(
+                node=hit, cursor=encode_offset_cursor(offset + i + 1)
+            )
+            for i, hit in enumerate(hits)
+        ]
+        return SearchHitConnection(
+            edges=edges,
+            page_info=relay.PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_next_page=has_next,
+                has_previous_page=offset > 0,
+            ),
+        )
+
+    def resolve_changes_since(self, info, org_slug, cursor=None, first=None):
+        user = info.context.user
+        org = check_organization_access(user, org_slug)
+        sources = {
+            "projects": optimize(Project.objects.all(), info, path=("projects",)),
+            "tasks": optimize(Task.objects.all(), info, path=("tasks",)),
+            "comments": optimize(TaskComment.objects.all(), info, path=("comments",)),
+            "deleted": Tombstone.objects.all(),
+        }
+        changes, cursor, has_more = changes_since(
+            org, decode_change_cursor(cursor), change_limit(first), sources
+        )
+        return ChangeSetType(cursor=cursor, has_more=has_more, **changes)
 
     def resolve_me(self, info):
         user = info.context.user
@@ -94,7 +314,8 @@ class Query(graphene.ObjectType):
 
     def resolve_organization(self, info, slug):
         user = info.context.user
-        return check_organization_access(user, slug)
+        org = check_organization_access(user, slug)
+        return optimize_instance(org, info)
 
 
 class CreateProjectMutation(graphene.Mutation):
@@ -119,6 +340,7 @@ class CreateProjectMutation(graphene.Mutation):
             project = Project.objects.create(
                 organization=org, name=name, description=description, due_date=due_date
             )
+            events.project_changed("CREATED", project)
             return CreateProjectMutation(project=project)
         except Organization.DoesNotExist:
             raise Exception("Organization not found")
@@ -152,6 +374,7 @@ class UpdateProjectMutation(graphene.Mutation):
             project.due_date = due_date
 
         project.save()
+        events.project_changed("UPDATED", project)
         return UpdateProjectMutation(project=project)
 
 
@@ -173,6 +396,8 @@ class CreateTaskMutation(graphene.Mutation):
             description=description,
             assignee_email=assignee_email,
         )
+        events.task_changed("CREATED", task)
+        events.task_counts_changed([task.project_id])
         return CreateTaskMutation(task=task)  # type: ignore - Graphene handles the dynamic constructor
 
 
@@ -185,11 +410,99 @@ class UpdateTaskStatusMutation(graphene.Mutation):
 
     def mutate(self, _info, task_id, status):
         task = Task.objects.get(pk=task_id)  # type: ignore
+        old_status = task.status
         task.status = status
+        changes = ["status"]
+        if old_status != status:
+            # Like moveTask, a task changing column goes to its bottom.
+            task.rank = rank_between(Task.last_rank(task.project_id, status), None)
+            changes.append("rank")
         task.save()
+
+        rebalance_if_needed(task)
+        events.task_changed("UPDATED", task, changes)
+        if old_status != status:
+            events.task_counts_changed([task.project_id])
         return UpdateTaskStatusMutation(task=task)  # type: ignore
 
 
+class MoveTaskMutation(graphene.Mutation):
+    """
+    Move a task into `status` between the tasks `after_id` (above it) and
+    `before_id` (below it). Omitting both appends it to the column.
+    """
+
+    class Arguments:
+        task_id = graphene.ID(required=True)
+        status = graphene.String(required=True)
+        after_id = graphene.ID()
+        before_id = graphene.ID()
+
+    task = graphene.Field(TaskType)
+
+    def mutate(self, info, task_id, status, after_id=None, before_id=None):
+        task = load_task_for_update(info.context.user, task_id)
+        if status not in Task.Status.values:
+            raise Exception("invalid status")
+
+        try:
+            rank = rank_between(
+                *column_neighbour_ranks(task, status, after_id, before_id)
+            )
+        except ValueError:
+            # Neighbours share a rank or are out of order; respread the
+            # column and try once more.
+            Task.rebalance_column(task.project_id, status)
+            try:
+                rank = rank_between(
+                    *column_neighbour_ranks(task, status, after_id, before_id)
+                )
+            except ValueError:
+                raise Exception("after_id must come before before_id")
+
+        old_status = task.status
+        task.status = status
+        task.rank = rank
+        task.save(update_fields=["status", "rank"])
+
+        rebalance_if_needed(task)
+        events.task_changed("UPDATED", task, ["status", "rank"])
+        if old_status != status:
+            events.task_counts_changed([task.project_id])
+        return MoveTaskMutation(task=task)  # type: ignore
+
+
+def rebalance_if_needed(task):
+    """Respread the task's column after commit if its rank grew too long."""
+    if task.needs_rebalance():
+        transaction.on_commit(
+            partial(Task.rebalance_column, task.project_id, task.status)
+        )
+
+
+def column_neighbour_ranks(task, status, after_id, before_id):
+    """Ranks of the tasks a moved task lands between, in one query."""
+    if not after_id and not before_id:
+        return Task.last_rank(task.project_id, status), None
+
+    neighbours = {
+        str(pk): (rank, (project_id, neighbour_status))
+        for pk, rank, project_id, neighbour_status in Task.objects.filter(
+            pk__in=[pk for pk in (after_id, before_id) if pk]
+        ).values_list("pk", "rank", "project_id", "status")
+    }
+    ranks = []
+    for pk in (after_id, before_id):
+        if not pk:
+            ranks.append(None)
+            continue
+        rank, column = neighbours.get(str(pk), (None, None))
+        if column != (task.project_id, status):
+            raise Exception("neighbour task is not in the target column")
+        ranks.append(rank)
+    return ranks
+
+
 class DeleteTaskMutation(graphene.Mutation):
     class Arguments:
         task_id = graphene.ID(required=True)
@@ -198,10 +511,270 @@ class DeleteTaskMutation(graphene.Mutation):
 
     def mutate(self, _info, task_id):
         task = Task.objects.get(pk=task_id)
+        project_id = task.project_id
         task.delete()
+        events.task_deleted(project_id, int(task_id))
+        events.task_counts_changed([project_id])
         return DeleteTaskMutation(id=task_id)
 
 
+# --- Bulk task mutations ---
+#
+# Each runs in one transaction, checks tenant access once per project and
+# writes with bulk_create / bulk_update / a single DELETE, so a 500-task board
+# operation costs a handful of queries. Per-task problems are reported in the
+# results instead of failing the whole batch. Signals don't fire for bulk
+# writes, so project counters, tombstones and the response cache are updated
+# here.
+
+MAX_BULK_TASKS = 1000
+
+
+class BulkTaskInput(graphene.InputObjectType):
+    project_id = graphene.ID(required=True)
+    title = graphene.String(required=True)
+    description = graphene.String()
+    assignee_email = graphene.String()
+    status = graphene.String()
+
+
+class BulkTaskResult(graphene.ObjectType):
+    id = graphene.ID()
+    ok = graphene.Boolean(required=True)
+    error = graphene.String()
+    task = graphene.Field(TaskType)
+
+
+def check_bulk_size(items):
+    if len(items) > MAX_BULK_TASKS:
+        raise Exception(f"at most {MAX_BULK_TASKS} tasks can be changed at once")
+
+
+def check_authenticated(user):
+    if not user.is_authenticated:
+        raise Exception("authentication credentials were not provided")
+
+
+def project_access_errors(user, project_ids):
+    """Map each inaccessible project id to the reason, checking each project once."""
+    check_authenticated(user)
+
+    errors = {}
+    for project_id in set(project_ids):
+        org_id = project_organization_id(project_id)
+        if org_id is None:
+            errors[project_id] = "project not found"
+        elif not user.is_superuser and not is_member(user, org_id):
+            errors[project_id] = "you do not have permission to access this project"
+    return errors
+
+
+def load_tasks_for_update(user, task_ids):
+    """Return `(tasks by id, errors by id)` for the requested task ids."""
+    check_authenticated(user)
+    tasks = {
+        str(task.pk): task
+        for task in Task.objects.filter(pk__in=task_ids).only(
+            "pk", "project_id", "organization_id", "status", "rank"
+        )
+    }
+    # Tasks carry their organization, so access is checked once per tenant.
+    allowed = {
+        org_id: user.is_superuser or is_member(user, org_id)
+        for org_id in {task.organization_id for task in tasks.values()}
+    }
+    errors = {}
+    for task_id in task_ids:
+        task = tasks.get(str(task_id))
+        if task is None:
+            errors[str(task_id)] = "task not found"
+        elif not allowed[task.organization_id]:
+            errors[str(task_id)] = "you do not have permission to access this project"
+    return tasks, errors
+
+
+def load_task_for_update(user, task_id):
+    """Return one task the user may change, like load_tasks_for_update."""
+    check_authenticated(user)
+    task = Task.objects.filter(pk=task_id).first()
+    if task is None:
+        raise Exception("task not found")
+    if not user.is_superuser and not is_member(user, task.organization_id):
+        raise Exception("you do not have permission to access this project")
+    return task
+
+
+def apply_counter_changes(counter_changes):
+    organization_ids = {
+        project_id: project_organization_id(project_id)
+        for project_id in counter_changes
+    }
+    Project.adjust_task_counters_many(counter_changes, organization_ids)
+    for organization_id in set(organization_ids.values()):
+        invalidate_tenant(organization_id)
+    events.task_counts_changed(counter_changes)
+
+
+class BulkCreateTasksMutation(graphene.Mutation):
+    class Arguments:
+        tasks = graphene.List(graphene.NonNull(BulkTaskInput), required=True)
+
+    results = graphene.List(graphene.NonNull(BulkTaskResult))
+
+    def mutate(self, info, tasks):
+        check_bulk_size(tasks)
+        access_errors = project_access_errors(
+            info.context.user, [int(item.project_id) for item in tasks]
+        )
+
+        results, new_tasks = [], []
+        for item in tasks:
+            project_id = int(item.project_id)
+            status = item.status or Task.Status.TODO
+            if project_id in access_errors:
+                error = access_errors[project_id]
+                results.append(BulkTaskResult(ok=False, error=error))
+            elif status not in Task.Status.values:
+                results.append(BulkTaskResult(ok=False, error="invalid status"))
+            else:
+                task = Task(
+                    project_id=project_id,
+                    organization_id=project_organization_id(project_id),
+                    title=item.title,
+                    description=item.description or "",
+                    assignee_email=item.assignee_email or "",
+                    status=status,
+                )
+                new_tasks.append(task)
+                results.append(BulkTaskResult(ok=True, task=task))
+
+        # Append each column's new tasks after its current last task.
+        columns = {}
+        for task in new_tasks:
+            columns.setdefault((task.project_id, task.status), []).append(task)
+
+        with transaction.atomic():
+            counter_changes = {}
+            for (project_id, status), column in columns.items():
+                last = Task.last_rank(project_id, status)
+                for task, rank in zip(column, ranks_between(last, None, len(column))):
+                    task.rank = rank
+                counter_changes.setdefault(project_id, {})[status] = len(column)
+                rebalance_if_needed(column[-1])
+
+            stamp_changes(new_tasks)
+            Task.objects.bulk_create(new_tasks, batch_size=500)
+            apply_counter_changes(counter_changes)
+            events.tasks_changed("CREATED", new_tasks)
+
+        for result in results:
+            if result.task is not None:
+                result.id = result.task.pk
+        return BulkCreateTasksMutation(results=results)
+
+
+class BulkUpdateTaskStatusMutation(graphene.Mutation):
+    class Arguments:
+        task_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+        status = graphene.String(required=True)
+
+    results = graphene.List(graphene.NonNull(BulkTaskResult))
+
+    def mutate(self, info, task_ids, status):
+        check_bulk_size(task_ids)
+        if status not in Task.Status.values:
+            raise Exception("invalid status")
+
+        with transaction.atomic():
+            tasks, errors = load_tasks_for_update(info.context.user, task_ids)
+            moved = [
+                task
+                for task_id, task in tasks.items()
+                if task_id not in errors and task.status != status
+            ]
+
+            # Moved tasks go to the bottom of the target column, in request order.
+            order = {str(task_id): i for i, task_id in enumerate(task_ids)}
+            moved.sort(key=lambda task: order[str(task.pk)])
+            columns, counter_changes = {}, {}
+            for task in moved:
+                columns.setdefault(task.project_id, []).append(task)
+                deltas = counter_changes.setdefault(task.project_id, {})
+                deltas[task.status] = deltas.get(task.status, 0) - 1
+                deltas[status] = deltas.get(status, 0) + 1
+            for project_id, column in columns.items():
+                last = Task.last_rank(project_id, status)
+                for task, rank in zip(column, ranks_between(last, None, len(column))):
+                    task.status = status
+                    task.rank = rank
+                rebalance_if_needed(column[-1])
+
+            stamp_changes(moved)
+            Task.objects.bulk_update(
+                moved, ["status", "rank", "updated_at", "change_seq"], batch_size=500
+            )
+            apply_counter_changes(counter_changes)
+            events.tasks_changed("UPDATED", moved, ["status", "rank"])
+
+        # The tasks were loaded with only the columns the update needs; load
+        # what the client selected under results.task in one query.
+        ok_ids = [task.pk for task_id, task in tasks.items() if task_id not in errors]
+        updated = optimize(
+            Task.objects.filter(pk__in=ok_ids),
+            info,
+            path=("results", "task"),
+        ).in_bulk()
+
+        results = []
+        for task_id in task_ids:
+            error = errors.get(str(task_id))
+            results.append(
+                BulkTaskResult(
+                    id=task_id,
+                    ok=error is None,
+                    error=error,
+                    task=None if error else updated.get(tasks[str(task_id)].pk),
+                )
+            )
+        return BulkUpdateTaskStatusMutation(results=results)
+
+
+class BulkDeleteTasksMutation(graphene.Mutation):
+    class Arguments:
+        task_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    results = graphene.List(graphene.NonNull(BulkTaskResult))
+
+    def mutate(self, info, task_ids):
+        check_bulk_size(task_ids)
+
+        with transaction.atomic():
+            tasks, errors = load_tasks_for_update(info.context.user, task_ids)
+            deleted = [task for task_id, task in tasks.items() if task_id not in errors]
+
+            counter_changes = {}
+            for task in deleted:
+                deltas = counter_changes.setdefault(task.project_id, {})
+                deltas[task.status] = deltas.get(task.status, 0) - 1
+
+            # One DELETE per table and no per-row signals, so the counters,
+            # tombstones and events the signals would handle are done here.
+            Task.delete_rows([task.pk for task in deleted])
+            Tombstone.record(Tombstone.Kind.TASK, deleted)
+            apply_counter_changes(counter_changes)
+            events.tasks_deleted((task.project_id, task.pk) for task in deleted)
+
+        results = [
+            BulkTaskResult(
+                id=task_id,
+                ok=str(task_id) not in errors,
+                error=errors.get(str(task_id)),
+            )
+            for task_id in task_ids
+        ]
+        return BulkDeleteTasksMutation(results=results)
+
+
 class CreateCommentMutation(graphene.Mutation):
     class Arguments:
         task_id = graphene.ID(required=True)
@@ -217,6 +790,7 @@ class CreateCommentMutation(graphene.Mutation):
             content=content,
             author_email=author_email,
         )
+        events.comment_added(task, comment)
         return CreateCommentMutation(comment=comment)  # type: ignore
 
 
@@ -307,6 +881,55 @@ class ChangePasswordMutation(graphene.Mutation):
         return ChangePasswordMutation(success=True)
 
 
+# --- Subscriptions ---
+#
+# Served as server-sent events by core.views.graphql_stream. Access is
+# checked once, when subscribing; messages come from core.events.
+
+
+class TaskChangeEvent(graphene.ObjectType):
+    action = graphene.String(
+        required=True, description="CREATED, UPDATED, DELETED or COMMENT_ADDED"
+    )
+    project_id = graphene.ID(required=True)
+    task_id = graphene.ID(required=True)
+    changes = GenericScalar(description="Changed task fields, by GraphQL name.")
+
+
+class ProjectChangeEvent(graphene.ObjectType):
+    action = graphene.String(required=True, description="CREATED or UPDATED")
+    project_id = graphene.ID(required=True)
+    changes = GenericScalar(description="Changed project fields, by GraphQL name.")
+
+
+def check_project_access(user, project_id):
+    errors = project_access_errors(user, [int(project_id)])
+    if errors:
+        raise Exception(errors[int(project_id)])
+
+
+class Subscription(graphene.ObjectType):
+    task_changed = graphene.Field(
+        TaskChangeEvent, project_id=graphene.ID(required=True)
+    )
+    project_changed = graphene.Field(
+        ProjectChangeEvent, org_slug=graphene.String(required=True)
+    )
+
+    # Subscribing before the stream is returned means access errors are
+    # reported up front and no message published after this point is missed.
+    async def subscribe_task_changed(root, info, project_id):
+        user = info.context.user
+        await run_sync(info.context, check_project_access, user, project_id)
+        return get_broker().subscribe(events.task_channel(project_id))
+
+    async def subscribe_project_changed(root, info, org_slug):
+        org = await run_sync(
+            info.context, check_organization_access, info.context.user, org_slug
+        )
+        return get_broker().subscribe(events.project_channel(org.pk))
+
+
 class Mutation(graphene.ObjectType):
     # user
     create_user = CreateUserMutation.Field()
@@ -322,22 +945,25 @@ class Mutation(graphene.ObjectType):
     update_project = UpdateProjectMutation.Field()
     create_task = CreateTaskMutation.Field()
     update_task_status = UpdateTaskStatusMutation.Field()
+    move_task = MoveTaskMutation.Field()
+    bulk_create_tasks = BulkCreateTasksMutation.Field()
+    bulk_update_task_status = BulkUpdateTaskStatusMutation.Field()
+    bulk_delete_tasks = BulkDeleteTasksMutation.Field()
     create_comment = CreateCommentMutation.Field()
     update_comment = CreateCommentMutation.Field()
     delete_task = DeleteTaskMutation.Field()
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
 
 
 def check_organization_access(user, org_slug):
     if not user.is_authenticated:
         raise Exception("authentication credentials were not provided")
 
-    try:
-        org = Organization.objects.get(slug=org_slug)
-        if not user.is_superuser and user not in org.members.all():
-            raise Exception("you do not have permission to access this organization")
-        return org
-    except Organization.DoesNotExist:
+    org, is_member = resolve_organization(user, org_slug)
+    if org is None:
         raise Exception("Organization not found")
+    if not user.is_superuser and not is_member:
+        raise Exception("you do not have permission to access this organization")
+    return org
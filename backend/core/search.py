@@ -0,0 +1,227 @@
+import re
+from html import escape
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    IntegerField,
+    Q,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Concat
+
+from .models import Task, TaskComment
+
+# Full-text search over one tenant's tasks and comments.
+#
+# On PostgreSQL rows are matched against the trigger-maintained, GIN indexed
+# `search_vector` columns and ranked with ts_rank; title words weigh more
+# than description words, which weigh more than comment words. Other
+# databases (the SQLite test setup) fall back to case-insensitive substring
+# matching with a similar ranking.
+#
+# Tasks and comments are ranked together in one UNION query, and snippets
+# are only built for the rows on the returned page. Snippets are always cut
+# from the stored text and HTML-escaped here: ts_headline drops tag-like
+# tokens, so its output is only used to learn which words matched.
+
+# Must match the configuration used by the 0009_search_vectors triggers.
+SEARCH_CONFIG = "english"
+
+MAX_SEARCH_OFFSET = 1000
+SNIPPET_WORDS = 20
+# Matches are delimited with control characters, which never appear in
+# escaped text, then the snippet is HTML-escaped and they become <mark> tags.
+START_SEL, STOP_SEL = "\x02", "\x03"
+MARKED = re.compile(f"{START_SEL}(.*?){STOP_SEL}", re.S)
+
+HIT_FIELDS = ("kind", "task_ref", "comment_ref", "score")
+
+
+class SearchHit:
+    def __init__(self, kind, task_id, comment_id, rank):
+        self.kind = kind
+        self.task_id = task_id
+        self.comment_id = comment_id
+        self.rank = rank
+        self.snippet = ""
+        self.task = None
+        self.comment = None
+
+
+def search(org, text, first, offset=0):
+    """Return `(hits, has_next)` for one page of `text` matches inside `org`."""
+    if offset > MAX_SEARCH_OFFSET:
+        raise Exception(
+            f"search results are limited to the first {MAX_SEARCH_OFFSET} matches"
+        )
+    if not text.split():
+        return [], False
+
+    if connection.vendor == "postgresql":
+        backend = PostgresSearch(text)
+    else:
+        backend = FallbackSearch(text)
+    tasks = backend.tasks(Task.objects.for_org(org)).annotate(
+        kind=Value("task"),
+        task_ref=F("pk"),
+        comment_ref=Value(None, output_field=IntegerField()),
+    )
+    comments = backend.comments(TaskComment.objects.for_org(org)).annotate(
+        kind=Value("comment"),
+        task_ref=F("task_id"),
+        comment_ref=F("pk"),
+    )
+    page = tasks.order_by().values(*HIT_FIELDS).union(
+        comments.order_by().values(*HIT_FIELDS), all=True
+    )
+    rows = list(
+        page.order_by("-score", "kind", "task_ref", "comment_ref")[
+            offset : offset + first + 1
+        ]
+    )
+
+    hits = [
+        SearchHit(row["kind"], row["task_ref"], row["comment_ref"], row["score"])
+        for row in rows[:first]
+    ]
+    backend.add_snippets(hits)
+    return hits, len(rows) > first
+
+
+def mark(snippet):
+    """HTML-escape `snippet` and turn the match delimiters into <mark> tags."""
+    return (
+        escape(snippet).replace(START_SEL, "<mark>").replace(STOP_SEL, "</mark>")
+    )
+
+
+def snippet(text, terms):
+    """Cut a window of words around the first match and mark every term."""
+    # Stray delimiters in the text itself would become tags.
+    words = text.replace(START_SEL, "").replace(STOP_SEL, "").split()
+    lowered = [term.lower() for term in terms]
+    matches = (
+        i for i, word in enumerate(words) if any(t in word.lower() for t in lowered)
+    )
+    first_match = next(matches, 0)
+    start = max(0, first_match - SNIPPET_WORDS // 4)
+    window = " ".join(words[start : start + SNIPPET_WORDS])
+    if not terms:
+        return mark(window)
+    longest_first = sorted(terms, key=len, reverse=True)
+    pattern = "|".join(re.escape(term) for term in longest_first)
+    return mark(
+        re.sub(f"({pattern})", rf"{START_SEL}\1{STOP_SEL}", window, flags=re.I)
+    )
+
+
+def _split_hits(hits):
+    tasks = [hit for hit in hits if hit.kind == "task"]
+    comments = [hit for hit in hits if hit.kind == "comment"]
+    return tasks, comments
+
+
+class PostgresSearch:
+    def __init__(self, text):
+        self.query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+
+    def tasks(self, queryset):
+        return queryset.filter(search_vector=self.query).annotate(
+            score=SearchRank(F("search_vector"), self.query)
+        )
+
+    # Both tables have a search_vector column.
+    comments = tasks
+
+    def headline(self, expression):
+        return SearchHeadline(
+            expression,
+            self.query,
+            config=SEARCH_CONFIG,
+            start_sel=START_SEL,
+            stop_sel=STOP_SEL,
+            max_words=SNIPPET_WORDS,
+            min_words=SNIPPET_WORDS // 2,
+        )
+
+    def add_snippets(self, hits):
+        task_hits, comment_hits = _split_hits(hits)
+        if task_hits:
+            text = Concat("title", Value("\n"), "description", output_field=TextField())
+            rows = self.matched_text(Task, [hit.task_id for hit in task_hits], text)
+            for hit in task_hits:
+                hit.snippet = snippet(*rows.get(hit.task_id, ("", ())))
+        if comment_hits:
+            comment_ids = [hit.comment_id for hit in comment_hits]
+            rows = self.matched_text(TaskComment, comment_ids, F("content"))
+            for hit in comment_hits:
+                hit.snippet = snippet(*rows.get(hit.comment_id, ("", ())))
+
+    def matched_text(self, model, ids, expression):
+        """Map pk -> (stored text, words ts_headline marked in it)."""
+        rows = (
+            model.objects.filter(pk__in=ids)
+            .annotate(text=expression, headline=self.headline(expression))
+            .values_list("pk", "text", "headline")
+        )
+        return {
+            pk: (text, set(MARKED.findall(headline))) for pk, text, headline in rows
+        }
+
+
+class FallbackSearch:
+    # Per-term scores, mirroring the A/B/C weights of the PostgreSQL vectors.
+    TITLE_SCORE, DESCRIPTION_SCORE, COMMENT_SCORE = 1.0, 0.4, 0.2
+
+    def __init__(self, text):
+        self.terms = text.split()
+
+    def tasks(self, queryset):
+        for term in self.terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(description__icontains=term)
+            )
+        score = sum(
+            (
+                Case(
+                    When(title__icontains=term, then=Value(self.TITLE_SCORE)),
+                    default=Value(self.DESCRIPTION_SCORE),
+                    output_field=FloatField(),
+                )
+                for term in self.terms
+            ),
+            Value(0.0),
+        )
+        return queryset.annotate(score=score)
+
+    def comments(self, queryset):
+        for term in self.terms:
+            queryset = queryset.filter(content__icontains=term)
+        return queryset.annotate(
+            score=Value(self.COMMENT_SCORE * len(self.terms), output_field=FloatField())
+        )
+
+    def add_snippets(self, hits):
+        task_hits, comment_hits = _split_hits(hits)
+        texts = {
+            pk: f"{title}\n{description}"
+            for pk, title, description in Task.objects.filter(
+                pk__in=[hit.task_id for hit in task_hits]
+            ).values_list("pk", "title", "description")
+        }
+        for hit in task_hits:
+            hit.snippet = snippet(texts.get(hit.task_id, ""), self.terms)
+
+        texts = dict(
+            TaskComment.objects.filter(
+                pk__in=[hit.comment_id for hit in comment_hits]
+            ).values_list("pk", "content")
+        )
+        for hit in comment_hits:
+            hit.snippet = snippet(texts.get(hit.comment_id, ""), self.terms)
@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_users
+from .models import Organization, Project, Task, TaskComment, Tombstone
+from .response_cache import invalidate_tenant
+from .tenancy import (
+    forget_memberships,
+    forget_organizations,
+    project_organization_cache,
+)
+
+
+@receiver(m2m_changed, sender=Organization.members.through)
+def membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # pk_set isn't provided for clear(), so look up who is affected first.
+        if reverse:
+            pk_set = set(instance.organizations.values_list("pk", flat=True))
+        else:
+            pk_set = set(instance.members.values_list("pk", flat=True))
+    elif action not in ("post_add", "post_remove"):
+        return
+
+    if reverse:
+        forget_users([instance.pk])
+        for org_id in pk_set:
+            forget_memberships(org_id, [instance.pk])
+            invalidate_tenant(org_id)
+        Organization.touch(pk_set)
+    else:
+        forget_users(pk_set)
+        forget_memberships(instance.pk, pk_set)
+        invalidate_tenant(instance.pk)
+        Organization.touch([instance.pk])
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def organization_changed(sender, instance, created=False, **kwargs):
+    forget_organizations()
+    invalidate_tenant(instance.pk)
+    if kwargs["signal"] is post_save and not created:
+        Organization.touch([instance.pk])
+
+
+# Every write to a tenant's data bumps its response cache generation, which
+# covers the GraphQL mutations as well as the admin. Project, task and
+# comment writes also advance the tenant's change sequence themselves (see
+# ChangeTracked); the organization, membership and user receivers here
+# advance it with Organization.touch so ETags change too.
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, **kwargs):
+    project_organization_cache.delete(instance.pk)
+    invalidate_tenant(instance.organization_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, **kwargs):
+    invalidate_tenant(instance.organization_id)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    Project.adjust_task_counters(
+        instance.project_id, {instance.status: -1}, instance.organization_id
+    )
+
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate_tenant(instance.organization_id)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    # Members are part of organization responses; logins only touch last_login.
+    if created or update_fields == frozenset({"last_login"}):
+        return
+    forget_users([instance.pk])
+    org_ids = list(instance.organizations.values_list("pk", flat=True))
+    for org_id in org_ids:
+        invalidate_tenant(org_id)
+    Organization.touch(org_ids)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_users([instance.pk])
+
+
+TOMBSTONE_KINDS = {
+    Project: Tombstone.Kind.PROJECT,
+    Task: Tombstone.Kind.TASK,
+    TaskComment: Tombstone.Kind.COMMENT,
+}
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=TaskComment)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # `origin` is what delete() was called on; rows removed along with a
+    # deleted parent are covered by the parent's tombstone.
+    if getattr(origin, "model", type(origin)) is sender:
+        Tombstone.record(TOMBSTONE_KINDS[sender], [instance])
@@ -0,0 +1,135 @@
+import copy
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from graphql import value_from_ast_untyped
+
+from .cache import LRUCache
+from .models import Organization, Project
+
+# Root-field arguments that name the organization an operation runs against.
+TENANT_ARGUMENTS = ("org_slug", "orgSlug", "slug")
+
+
+def operation_tenant_slug(operation, variables=None):
+    """Return the organization slug an operation targets, if it names one.
+
+    Looks at the arguments of the operation's root fields, so it works
+    before execution (and before JWT authentication has run).
+    """
+    if operation is None:
+        return None
+
+    for selection in operation.selection_set.selections:
+        for argument in getattr(selection, "arguments", None) or ():
+            if argument.name.value in TENANT_ARGUMENTS:
+                value = value_from_ast_untyped(argument.value, variables or {})
+                if isinstance(value, str):
+                    return value
+    return None
+
+
+def operation_tenant_slugs(operation, variables=None):
+    """Return the slug each root field of `operation` names, or None for it."""
+    slugs = []
+    for selection in operation.selection_set.selections:
+        if getattr(selection, "name", None) and selection.name.value == "__typename":
+            continue
+        slug = None
+        for argument in getattr(selection, "arguments", None) or ():
+            if argument.name.value in TENANT_ARGUMENTS:
+                value = value_from_ast_untyped(argument.value, variables or {})
+                if isinstance(value, str):
+                    slug = value
+                    break
+        slugs.append(slug)
+    return slugs
+
+
+# Slug -> Organization and (user id, org id) -> membership caches for
+# check_organization_access. Entries expire after TENANT_CACHE_TTL seconds,
+# and core.signals drops them as soon as memberships or organizations change
+# in this process.
+TENANT_CACHE_TTL = getattr(settings, "TENANT_CACHE_TTL", 60)
+
+organization_cache = LRUCache(maxsize=1024, ttl=TENANT_CACHE_TTL)
+membership_cache = LRUCache(maxsize=16384, ttl=TENANT_CACHE_TTL)
+
+
+def _membership(user):
+    return Organization.members.through.objects.filter(
+        organization=OuterRef("pk"), user_id=user.pk
+    )
+
+
+def resolve_organization(user, slug):
+    """Return `(organization, is_member)` for `slug`, or `(None, False)`.
+
+    Costs a single query on a cold cache and none on a warm one.
+    """
+    cached = organization_cache.get(slug)
+    if cached is None:
+        org = (
+            Organization.objects.annotate(is_member=Exists(_membership(user)))
+            .filter(slug=slug)
+            .first()
+        )
+        if org is None:
+            return None, False
+        member = org.__dict__.pop("is_member")
+        organization_cache.set(slug, copy.copy(org))
+        membership_cache.set((user.pk, org.pk), member)
+        return org, member
+
+    # Callers may attach prefetched relations, so never hand out the
+    # cached instance itself.
+    org = copy.copy(cached)
+    return org, is_member(user, org.pk)
+
+
+def is_member(user, org_id):
+    # Users authenticated by core.authentication carry their memberships.
+    organization_ids = getattr(user, "organization_ids", None)
+    if organization_ids is not None:
+        return org_id in organization_ids
+    member = membership_cache.get((user.pk, org_id))
+    if member is None:
+        member = Organization.members.through.objects.filter(
+            organization_id=org_id, user_id=user.pk
+        ).exists()
+        membership_cache.set((user.pk, org_id), member)
+    return member
+
+
+# Project id -> organization id. core.signals drops entries when projects are
+# saved or deleted.
+project_organization_cache = LRUCache(maxsize=16384)
+
+
+def project_organization_id(project_id):
+    """Return the id of the organization owning `project_id`, or None."""
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return None
+    org_id = project_organization_cache.get(project_id)
+    if org_id is None:
+        org_id = (
+            Project.objects.filter(pk=project_id)
+            .values_list("organization_id", flat=True)
+            .first()
+        )
+        if org_id is not None:
+            project_organization_cache.set(project_id, org_id)
+    return org_id
+
+
+def forget_organizations():
+    # Organization writes are rare, and a slug rename would leave the old key
+    # behind, so drop every entry.
+    organization_cache.clear()
+
+
+def forget_memberships(org_id, user_ids):
+    for user_id in user_ids:
+        membership_cache.delete((user_id, org_id))
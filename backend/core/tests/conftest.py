@@ -0,0 +1,37 @@
+import pytest
+from django.test import RequestFactory
+from core.authentication import claims_cache, user_cache, user_id_cache
+from core.tenancy import (
+    membership_cache,
+    organization_cache,
+    project_organization_cache,
+)
+
+
+@pytest.fixture
+def make_context():
+    """
+    Build the request object graphene-django passes as `info.context`.
+    """
+
+    def build(user, method="post", path="/graphql", **extra):
+        request = getattr(RequestFactory(), method)(path, **extra)
+        request.user = user
+        return request
+
+    return build
+
+
+@pytest.fixture(autouse=True)
+def clear_tenant_caches():
+    """
+    Test databases reuse primary keys, so cached memberships must not leak
+    between tests.
+    """
+    organization_cache.clear()
+    membership_cache.clear()
+    project_organization_cache.clear()
+    claims_cache.clear()
+    user_cache.clear()
+    user_id_cache.clear()
+    yield
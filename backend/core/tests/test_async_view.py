@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+
+import graphene
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from mixer.backend.django import mixer
+
+from core.models import Project
+from core.views import AsyncTenantGraphQLView, TenantGraphQLView
+
+DASHBOARD_QUERY = """
+    query ($slug: String!) {
+        projects(orgSlug: $slug) { name taskCount }
+        myTasks { title project { name } }
+    }
+"""
+
+# Worker threads use their own database connections, so these tests commit.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def member():
+    user = mixer.blend("auth.User", is_staff=True, email="owner@example.com")
+    org = mixer.blend("core.Organization", slug="acme")
+    org.members.add(user)
+    project = mixer.blend("core.Project", organization=org, name="Launch")
+    mixer.blend("core.Task", project=project, title="Ship", assignee_email=user.email)
+    return user
+
+
+def run_async(make_context, user, query, variables=None, schema=None, **extra):
+    options = {"schema": schema} if schema else {}
+    view = AsyncTenantGraphQLView.as_view(**options)
+    request = make_context(
+        user,
+        data=json.dumps({"query": query, "variables": variables or {}}),
+        content_type="application/json",
+        **extra,
+    )
+    response = async_to_sync(view)(request)
+    return json.loads(response.content)
+
+
+def test_async_view_matches_the_sync_view(member, make_context):
+    variables = {"slug": "acme"}
+    sync_view = TenantGraphQLView.as_view()
+    request = make_context(
+        member,
+        data=json.dumps({"query": DASHBOARD_QUERY, "variables": variables}),
+        content_type="application/json",
+    )
+    expected = json.loads(sync_view(request).content)
+
+    result = run_async(make_context, member, DASHBOARD_QUERY, variables)
+
+    assert "errors" not in result, result["errors"]
+    assert result["data"] == expected["data"]
+    assert result["data"]["myTasks"][0]["project"]["name"] == "Launch"
+
+
+def test_root_fields_resolve_concurrently(make_context):
+    threads = []
+
+    class SlowQuery(graphene.ObjectType):
+        first = graphene.String()
+        second = graphene.String()
+
+        def resolve_first(root, info):
+            threads.append(threading.current_thread().name)
+            time.sleep(0.3)
+            return "first"
+
+        resolve_second = resolve_first
+
+    started = time.perf_counter()
+    result = run_async(
+        make_context,
+        AnonymousUser(),
+        "{ first second }",
+        schema=graphene.Schema(SlowQuery),
+    )
+    elapsed = time.perf_counter() - started
+
+    assert result["data"] == {"first": "first", "second": "first"}
+    assert elapsed < 0.55
+    assert len(set(threads)) == 2
+    assert all(name.startswith("graphql") for name in threads)
+
+
+def test_mutations_run_through_the_async_view(member, make_context):
+    result = run_async(
+        make_context,
+        member,
+        'mutation { createProject(orgSlug: "acme", name: "Async") { project { name } } }',
+    )
+
+    assert result["data"]["createProject"]["project"]["name"] == "Async"
+    assert Project.objects.filter(name="Async").exists()
+
+
+def test_traces_count_sql_from_every_worker(member, make_context):
+    result = run_async(
+        make_context,
+        member,
+        DASHBOARD_QUERY,
+        {"slug": "acme"},
+        HTTP_X_GRAPHQL_TRACE="1",
+    )
+
+    tracing = result["extensions"]["tracing"]
+    assert tracing["sql"]["count"] >= 2
+    fields = {r["fieldName"] for r in tracing["execution"]["resolvers"]}
+    assert {"projects", "myTasks"} <= fields
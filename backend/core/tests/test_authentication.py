@@ -0,0 +1,107 @@
+import json
+
+import jwt
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.settings import jwt_settings
+from graphql_jwt.shortcuts import get_token
+from mixer.backend.django import mixer
+
+from core import authentication
+
+ORG_TEAM = """
+    query GetOrgTeam($slug: String!) {
+        organization(slug: $slug) { name }
+    }
+"""
+ME = "query { me { firstName email } }"
+UPDATE_PROFILE = """
+    mutation { updateProfile(firstName: "Ada") { user { firstName } } }
+"""
+CHANGE_PASSWORD = """
+    mutation {
+        changePassword(oldPassword: "secret", newPassword: "s3cret!") { success }
+    }
+"""
+
+
+@pytest.fixture
+def member():
+    user = mixer.blend("auth.User", email="owner@example.com", is_active=True)
+    user.set_password("secret")
+    user.save()
+    org = mixer.blend("core.Organization", slug="acme", name="Acme")
+    org.members.add(user)
+    return user, org
+
+
+def post(client, token, query, variables=None):
+    return client.post(
+        "/graphql",
+        json.dumps({"query": query, "variables": variables or {}}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"JWT {token}",
+    )
+
+
+@pytest.mark.django_db
+def test_warm_requests_do_not_load_the_user(client, member):
+    user, _ = member
+    token = get_token(user)
+    post(client, token, ORG_TEAM, {"slug": "acme"})
+
+    with CaptureQueriesContext(connection) as queries:
+        response = post(client, token, ORG_TEAM, {"slug": "acme"})
+    assert response.json()["data"]["organization"]["name"] == "Acme"
+    # Neither the user nor the membership is queried again.
+    assert not [q for q in queries if "auth_user" in q["sql"]]
+    assert not [q for q in queries if "core_organization_members" in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_profile_and_password_changes_refresh_the_snapshot(client, member):
+    user, _ = member
+    token = get_token(user)
+    post(client, token, ME)
+
+    updated = post(client, token, UPDATE_PROFILE)
+    assert updated.json()["data"]["updateProfile"]["user"]["firstName"] == "Ada"
+    assert post(client, token, ME).json()["data"]["me"]["firstName"] == "Ada"
+
+    # The deferred password hash loads for the check, and saving keeps the
+    # snapshot's other columns intact.
+    changed = post(client, token, CHANGE_PASSWORD)
+    assert changed.json()["data"]["changePassword"]["success"] is True
+    user.refresh_from_db()
+    assert user.check_password("s3cret!")
+    assert user.first_name == "Ada" and user.email == "owner@example.com"
+
+
+@pytest.mark.django_db
+def test_membership_changes_apply_immediately(client, member):
+    user, org = member
+    token = get_token(user)
+    assert post(client, token, ORG_TEAM, {"slug": "acme"}).json()["data"][
+        "organization"
+    ]
+
+    org.members.remove(user)
+    denied = post(client, token, ORG_TEAM, {"slug": "acme"})
+    assert denied.json()["data"]["organization"] is None
+
+    user.organizations.add(org)
+    allowed = post(client, token, ORG_TEAM, {"slug": "acme"})
+    assert allowed.json()["data"]["organization"]["name"] == "Acme"
+
+
+@pytest.mark.django_db
+def test_cached_claims_still_expire(member, monkeypatch):
+    user, _ = member
+    token = get_token(user)
+    payload = authentication.decode_token(token)
+
+    monkeypatch.setattr(jwt_settings, "JWT_VERIFY_EXPIRATION", True)
+    monkeypatch.setattr(authentication.time, "time", lambda: payload["exp"] + 1)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        authentication.decode_token(token)
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from graphql_jwt.shortcuts import get_token
+from mixer.backend.django import mixer
+
+MY_ORGS = "query GetMyOrgs { me { email organizations { slug } } }"
+ORG_TEAM = """
+    query GetOrgTeam($slug: String!) {
+        organization(slug: $slug) { name members { email } }
+    }
+"""
+PROJECTS = """
+    query GetProjects($slug: String!) { projects(orgSlug: $slug) { name } }
+"""
+CREATE_PROJECT = """
+    mutation ($slug: String!) {
+        createProject(orgSlug: $slug, name: "Launch") { project { name } }
+    }
+"""
+
+
+@pytest.fixture
+def member():
+    user = mixer.blend("auth.User", email="owner@example.com", is_staff=True)
+    org = mixer.blend("core.Organization", slug="acme", name="Acme")
+    org.members.add(user)
+    return user
+
+
+def post(client, user, operations):
+    return client.post(
+        "/graphql",
+        json.dumps(operations),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"JWT {get_token(user)}",
+    )
+
+
+@pytest.mark.django_db
+def test_batch_shares_one_authenticated_user(client, member):
+    operations = [
+        {"id": 1, "query": MY_ORGS},
+        {"id": 2, "query": ORG_TEAM, "variables": {"slug": "acme"}},
+        {"id": 3, "query": PROJECTS, "variables": {"slug": "acme"}},
+    ]
+    with CaptureQueriesContext(connection) as queries:
+        response = post(client, member, operations)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["id"] for result in results] == [1, 2, 3]
+    assert results[0]["data"]["me"]["email"] == "owner@example.com"
+    assert results[1]["data"]["organization"]["name"] == "Acme"
+    assert results[2]["data"]["projects"] == []
+    # The JWT user is loaded for the first operation only.
+    user_loads = [q for q in queries if 'WHERE "auth_user"."username"' in q["sql"]]
+    assert len(user_loads) == 1
+
+
+@pytest.mark.django_db
+def test_reads_after_a_mutation_in_the_batch_see_its_write(client, member):
+    response = post(
+        client,
+        member,
+        [
+            {"query": CREATE_PROJECT, "variables": {"slug": "acme"}},
+            {"query": PROJECTS, "variables": {"slug": "acme"}},
+        ],
+    )
+    created, listed = response.json()
+    assert created["data"]["createProject"]["project"]["name"] == "Launch"
+    assert listed["data"]["projects"] == [{"name": "Launch"}]
+
+
+@pytest.mark.django_db
+def test_batches_are_limited(client, member):
+    with override_settings(GRAPHQL_BATCH={"MAX_OPERATIONS": 2}):
+        response = post(client, member, [{"query": MY_ORGS}] * 3)
+    assert response.status_code == 400
+    assert "at most 2" in response.json()["errors"][0]["message"]
+
+    assert post(client, member, []).status_code == 400
+    assert post(client, member, [MY_ORGS]).status_code == 400
+
+    with override_settings(GRAPHQL_BATCH={"ENABLED": False}):
+        assert post(client, member, [{"query": MY_ORGS}]).status_code == 400
+
+    single = post(client, member, {"query": MY_ORGS})
+    assert single.json()["data"]["me"]["email"] == "owner@example.com"
@@ -0,0 +1,273 @@
+"""
+Benchmarks for every GraphQL operation the frontend ships.
+
+Each operation runs against a small, medium and large tenant. The SQL query
+count, wall time (p50/p95) and peak allocated memory are compared with
+benchmark_baselines.json, which holds one set of baselines per database
+vendor. The query count must not grow; time and memory may not exceed the
+baseline by more than the tolerance.
+
+Query counts are checked on every run. Time and memory depend on the machine,
+so those tests carry the `benchmark` marker, which pytest.ini deselects; run
+them with `-m benchmark`.
+
+    BENCHMARK_UPDATE=1      rewrite the baselines for this database (with
+                            `-m benchmark`)
+    BENCHMARK_ITERATIONS=n  runs per case (default 10)
+    BENCHMARK_TOLERANCE=x   allowed time slowdown factor (default 3)
+"""
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from graphql import parse
+from mixer.backend.django import mixer
+
+from core.management.commands.register_persisted_queries import GQL_TEMPLATE
+from core.models import Project, Task, TaskComment
+from core.ranking import spread_ranks
+from core.schema import schema
+
+client = Client(schema)
+
+FRONTEND_GRAPHQL = Path(__file__).resolve().parents[3] / "frontend" / "src" / "graphql"
+BASELINES = Path(__file__).with_name("benchmark_baselines.json")
+
+ITERATIONS = int(os.getenv("BENCHMARK_ITERATIONS", "10"))
+TIME_TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "3"))
+MEMORY_TOLERANCE = 1.5
+UPDATE = os.getenv("BENCHMARK_UPDATE") == "1"
+
+# projects, tasks per project, comments per task, members
+TENANT_SIZES = {
+    "small": (2, 5, 1, 3),
+    "medium": (5, 20, 2, 10),
+    "large": (10, 60, 3, 25),
+}
+
+PASSWORD = "benchmark"
+STATUSES = ("TODO", "IN_PROGRESS", "DONE")
+
+
+def new_task(tenant, i):
+    task = Task.objects.create(project_id=tenant.project_id, title=f"Disposable {i}")
+    return {"taskId": task.id}
+
+
+# Variables for iteration `i` of each operation. Setup done here (such as
+# creating the task DeleteTask removes) is not measured.
+VARIABLES = {
+    "GetDashboardData": lambda t, i: {"orgSlug": t.slug},
+    "GetProjects": lambda t, i: {"orgSlug": t.slug},
+    "GetProjectDetails": lambda t, i: {"id": t.project_id},
+    "GetMyOrgs": lambda t, i: {},
+    "GetOrgTeam": lambda t, i: {"slug": t.slug},
+    "CreateProject": lambda t, i: {"orgSlug": t.slug, "name": f"Project {i}"},
+    "CreateTask": lambda t, i: {"projectId": t.project_id, "title": f"Task {i}"},
+    "UpdateTaskStatus": lambda t, i: {"taskId": t.task_id, "status": STATUSES[i % 3]},
+    "CreateComment": lambda t, i: {
+        "taskId": t.task_id,
+        "content": f"Comment {i}",
+        "authorEmail": t.user.email,
+    },
+    "DeleteTask": new_task,
+    "Login": lambda t, i: {"username": t.user.username, "password": PASSWORD},
+    "UpdateProject": lambda t, i: {"projectId": t.project_id, "name": f"Renamed {i}"},
+    "CreateUser": lambda t, i: {
+        "orgSlug": t.slug,
+        "email": f"new{i}@example.com",
+        "username": f"new{i}",
+        "password": PASSWORD,
+    },
+    "UpdateProfile": lambda t, i: {"firstName": f"Bench {i}"},
+    "ChangePassword": lambda t, i: {"oldPassword": PASSWORD, "newPassword": PASSWORD},
+}
+
+
+def frontend_operations():
+    operations = {}
+    for path in sorted(FRONTEND_GRAPHQL.glob("*.ts")):
+        for query in GQL_TEMPLATE.findall(path.read_text()):
+            for definition in parse(query).definitions:
+                operations.setdefault(definition.name.value, query)
+    return operations
+
+
+OPERATIONS = frontend_operations()
+needs_frontend = pytest.mark.skipif(
+    not OPERATIONS, reason="frontend GraphQL sources not available"
+)
+
+
+@pytest.fixture
+def fast_hasher(settings):
+    # Password hashing is deliberately slow and isn't what is measured here.
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+def build_tenant(size):
+    """Create an organization of the given size with bulk inserts."""
+    projects, tasks_per_project, comments_per_task, members = TENANT_SIZES[size]
+    org = mixer.blend("core.Organization", slug=f"bench-{size}")
+    user = mixer.blend("auth.User", is_staff=True, email=f"owner@{size}.example.com")
+    user.set_password(PASSWORD)
+    user.save()
+    org.members.add(user, *mixer.cycle(members - 1).blend("auth.User"))
+
+    project_ids = []
+    for p in range(projects):
+        project = Project.objects.create(organization=org, name=f"Project {p}")
+        project_ids.append(project.id)
+        tasks = Task.objects.bulk_create(
+            Task(
+                project=project,
+                organization=org,
+                title=f"Task {n}",
+                description="benchmark task",
+                status=STATUSES[n % 3],
+                assignee_email=user.email,
+                rank=rank,
+            )
+            for n, rank in enumerate(spread_ranks(tasks_per_project))
+        )
+        TaskComment.objects.bulk_create(
+            TaskComment(
+                task=task,
+                organization=org,
+                content=f"Comment {c}",
+                author_email=user.email,
+            )
+            for task in tasks
+            for c in range(comments_per_task)
+        )
+    call_command("rebuild_task_counters", stdout=open(os.devnull, "w"))
+
+    return SimpleNamespace(
+        slug=org.slug,
+        user=user,
+        project_id=project_ids[0],
+        task_id=Task.objects.filter(project_id=project_ids[0]).first().id,
+    )
+
+
+def count_queries(query, variables_for, tenant, context):
+    counts = []
+    for i in range(ITERATIONS):
+        variables = variables_for(tenant, i)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.execute(query, variables=variables, context_value=context)
+        assert "errors" not in response, response["errors"]
+        counts.append(len(ctx.captured_queries))
+    return max(counts)
+
+
+def measure(query, variables_for, tenant, context):
+    counts, timings = [], []
+    for i in range(ITERATIONS):
+        variables = variables_for(tenant, i)
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = client.execute(query, variables=variables, context_value=context)
+            timings.append(time.perf_counter() - started)
+        assert "errors" not in response, response["errors"]
+        counts.append(len(ctx.captured_queries))
+
+    # Measured separately, as tracing allocations slows everything down.
+    variables = variables_for(tenant, ITERATIONS)
+    tracemalloc.start()
+    try:
+        client.execute(query, variables=variables, context_value=context)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings_ms = sorted(t * 1000 for t in timings)
+    return {
+        "queries": max(counts),
+        "p50_ms": round(statistics.median(timings_ms), 2),
+        "p95_ms": round(timings_ms[int(0.95 * (len(timings_ms) - 1))], 2),
+        "peak_kb": round(peak / 1024),
+    }
+
+
+@pytest.fixture(scope="module")
+def baselines():
+    stored = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    yield stored
+    if UPDATE:
+        BASELINES.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+
+
+@needs_frontend
+def test_every_frontend_operation_is_benchmarked():
+    assert set(OPERATIONS) <= set(VARIABLES)
+
+
+def stored_baseline(baselines, name):
+    baseline = baselines.get(connection.vendor, {}).get(name)
+    if baseline is None:
+        pytest.skip(f"no {connection.vendor} baseline for {name}")
+    return baseline
+
+
+@needs_frontend
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", TENANT_SIZES)
+@pytest.mark.parametrize("operation", sorted(VARIABLES))
+def test_operation_queries(operation, size, baselines, make_context, fast_hasher):
+    if operation not in OPERATIONS:
+        pytest.skip(f"{operation} is no longer used by the frontend")
+    if UPDATE:
+        pytest.skip("baselines are rewritten by test_operation_budget")
+
+    name = f"{operation}[{size}]"
+    baseline = stored_baseline(baselines, name)
+    tenant = build_tenant(size)
+    queries = count_queries(
+        OPERATIONS[operation], VARIABLES[operation], tenant, make_context(tenant.user)
+    )
+
+    assert queries <= baseline["queries"], (name, queries, baseline)
+
+
+@needs_frontend
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", TENANT_SIZES)
+@pytest.mark.parametrize("operation", sorted(VARIABLES))
+def test_operation_budget(operation, size, baselines, make_context, fast_hasher):
+    if operation not in OPERATIONS:
+        pytest.skip(f"{operation} is no longer used by the frontend")
+
+    tenant = build_tenant(size)
+    result = measure(
+        OPERATIONS[operation], VARIABLES[operation], tenant, make_context(tenant.user)
+    )
+
+    name = f"{operation}[{size}]"
+    if UPDATE:
+        baselines.setdefault(connection.vendor, {})[name] = result
+        return
+    baseline = stored_baseline(baselines, name)
+
+    # Small absolute allowances keep sub-millisecond cases from flaking.
+    assert result["p95_ms"] <= baseline["p95_ms"] * TIME_TOLERANCE + 5, (
+        name,
+        result,
+        baseline,
+    )
+    assert result["peak_kb"] <= baseline["peak_kb"] * MEMORY_TOLERANCE + 64, (
+        name,
+        result,
+        baseline,
+    )
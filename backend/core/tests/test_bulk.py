@@ -0,0 +1,202 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from graphene.test import Client
+from core.models import Task, TaskComment
+from core.schema import schema
+
+client = Client(schema)
+
+BULK_CREATE = """
+    mutation ($tasks: [BulkTaskInput!]!) {
+        bulkCreateTasks(tasks: $tasks) { results { id ok error } }
+    }
+"""
+
+BULK_STATUS = """
+    mutation ($ids: [ID!]!, $status: String!) {
+        bulkUpdateTaskStatus(taskIds: $ids, status: $status) {
+            results { id ok error task { status } }
+        }
+    }
+"""
+
+BULK_DELETE = """
+    mutation ($ids: [ID!]!) {
+        bulkDeleteTasks(taskIds: $ids) { results { id ok error } }
+    }
+"""
+
+
+def counters(project):
+    project.refresh_from_db()
+    return (
+        project.todo_task_count,
+        project.in_progress_task_count,
+        project.done_task_count,
+    )
+
+
+@pytest.fixture
+def member_setup(make_context):
+    user = mixer.blend("auth.User")
+    org = mixer.blend("core.Organization")
+    org.members.add(user)
+    project = mixer.blend("core.Project", organization=org)
+    return project, make_context(user)
+
+
+@pytest.mark.django_db
+def test_bulk_create_reports_per_item_results(member_setup):
+    project, context = member_setup
+    other = mixer.blend("core.Project")
+    tasks = [
+        {"projectId": project.id, "title": "A"},
+        {"projectId": project.id, "title": "B", "status": "DONE"},
+        {"projectId": other.id, "title": "C"},
+        {"projectId": project.id, "title": "D", "status": "LATER"},
+    ]
+
+    result = client.execute(
+        BULK_CREATE, variables={"tasks": tasks}, context_value=context
+    )
+
+    results = result["data"]["bulkCreateTasks"]["results"]
+    assert [r["ok"] for r in results] == [True, True, False, False]
+    assert results[2]["error"] == "you do not have permission to access this project"
+    assert results[3]["error"] == "invalid status"
+    assert counters(project) == (1, 0, 1)
+    assert not Task.objects.filter(project=other).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_create_appends_in_order(member_setup):
+    project, context = member_setup
+    mixer.blend("core.Task", project=project, title="existing")
+    tasks = [{"projectId": project.id, "title": str(i)} for i in range(50)]
+
+    client.execute(BULK_CREATE, variables={"tasks": tasks}, context_value=context)
+
+    titles = list(Task.objects.filter(project=project).values_list("title", flat=True))
+    assert titles == ["existing"] + [str(i) for i in range(50)]
+
+
+@pytest.mark.django_db
+def test_bulk_status_update_moves_tasks_and_counters(member_setup):
+    project, context = member_setup
+    tasks = mixer.cycle(3).blend("core.Task", project=project, status="TODO")
+    ids = [str(task.id) for task in tasks] + ["999999"]
+
+    result = client.execute(
+        BULK_STATUS,
+        variables={"ids": ids, "status": "IN_PROGRESS"},
+        context_value=context,
+    )
+
+    results = result["data"]["bulkUpdateTaskStatus"]["results"]
+    assert [r["ok"] for r in results] == [True, True, True, False]
+    assert results[0]["task"]["status"] == "IN_PROGRESS"
+    assert results[3]["error"] == "task not found"
+    assert counters(project) == (0, 3, 0)
+
+
+@pytest.mark.django_db
+def test_bulk_delete_removes_tasks_and_comments(member_setup):
+    project, context = member_setup
+    tasks = mixer.cycle(4).blend("core.Task", project=project, status="DONE")
+    mixer.blend("core.TaskComment", task=tasks[0])
+    foreign = mixer.blend("core.Task")
+
+    result = client.execute(
+        BULK_DELETE,
+        variables={"ids": [tasks[0].id, tasks[1].id, foreign.id]},
+        context_value=context,
+    )
+
+    results = result["data"]["bulkDeleteTasks"]["results"]
+    assert [r["ok"] for r in results] == [True, True, False]
+    assert Task.objects.filter(project=project).count() == 2
+    assert Task.objects.filter(pk=foreign.pk).exists()
+    assert not TaskComment.objects.exists()
+    assert counters(project) == (0, 0, 2)
+
+
+@pytest.mark.django_db
+def test_bulk_status_update_query_count_is_constant(member_setup):
+    project, context = member_setup
+
+    def run(count):
+        tasks = mixer.cycle(count).blend("core.Task", project=project, status="TODO")
+        ids = [str(task.id) for task in tasks]
+        with CaptureQueriesContext(connection) as queries:
+            result = client.execute(
+                BULK_STATUS,
+                variables={"ids": ids, "status": "DONE"},
+                context_value=context,
+            )
+        assert "errors" not in result
+        return len(queries)
+
+    run(1)  # warm the tenant access caches
+    assert run(5) == run(100)
+
+
+@pytest.mark.django_db
+def test_bulk_status_update_loads_selected_task_fields_once(member_setup):
+    project, context = member_setup
+    query = BULK_STATUS.replace("task { status }", "task { title description }")
+
+    def run(count):
+        tasks = mixer.cycle(count).blend("core.Task", project=project, status="TODO")
+        with CaptureQueriesContext(connection) as queries:
+            result = client.execute(
+                query,
+                variables={"ids": [task.id for task in tasks], "status": "DONE"},
+                context_value=context,
+            )
+        assert "errors" not in result
+        results = result["data"]["bulkUpdateTaskStatus"]["results"]
+        assert [r["task"]["title"] for r in results] == [t.title for t in tasks]
+        return len(queries)
+
+    run(1)  # warm the tenant access caches
+    assert run(5) == run(50)
+
+
+@pytest.mark.django_db
+def test_bulk_mutations_require_authentication(make_context):
+    project = mixer.blend("core.Project")
+    result = client.execute(
+        BULK_CREATE,
+        variables={"tasks": [{"projectId": project.id, "title": "A"}]},
+        context_value=make_context(AnonymousUser()),
+    )
+    assert result["errors"][0]["message"] == "authentication credentials were not provided"
+
+
+@pytest.mark.django_db
+def test_bulk_create_numbers_changes_once_per_write(member_setup):
+    project, context = member_setup
+    projects = [project] + mixer.cycle(2).blend(
+        "core.Project", organization=project.organization
+    )
+    tasks = [{"projectId": p.id, "title": f"T{i}"} for i, p in enumerate(projects * 5)]
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.execute(
+            BULK_CREATE, variables={"tasks": tasks}, context_value=context
+        )
+
+    assert "errors" not in response, response.get("errors")
+    # One range for the tasks and one for the three projects' counters.
+    allocations = [
+        q for q in ctx.captured_queries if 'UPDATE "core_organization"' in q["sql"]
+    ]
+    assert len(allocations) == 2
+    seqs = [p.change_seq for p in projects]
+    for p in projects:
+        p.refresh_from_db()
+    assert len({p.change_seq for p in projects}) == 3
+    assert all(p.change_seq > seq for p, seq in zip(projects, seqs))
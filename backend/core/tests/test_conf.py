@@ -0,0 +1,13 @@
+from core.conf import settings_group
+
+
+def test_settings_group_rereads_changed_settings(settings):
+    get_config = settings_group("TEST_GROUP", {"SIZE": 1, "NAME": "a"})
+    changes = []
+    get_config.on_change(lambda: changes.append(get_config()["SIZE"]))
+    assert get_config() == {"SIZE": 1, "NAME": "a"}
+
+    settings.TEST_GROUP = {"SIZE": 2}
+
+    assert get_config() == {"SIZE": 2, "NAME": "a"}
+    assert changes == [2]
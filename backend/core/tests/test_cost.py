@@ -0,0 +1,142 @@
+import json
+
+import pytest
+from graphql import get_operation_ast, parse
+from core.cost import analyze
+from core.schema import schema
+from core.tenancy import operation_tenant_slugs
+
+
+def cost_of(query, variables=None, tenant_slugs=None):
+    document = parse(query)
+    operation = get_operation_ast(document)
+    if tenant_slugs is None:
+        tenant_slugs = operation_tenant_slugs(operation, variables)
+    return analyze(schema.graphql_schema, document, operation, variables, tenant_slugs)
+
+
+def test_list_fields_multiply_nested_cost():
+    cost = cost_of(
+        """
+        query {
+            project(id: 1) {
+                name
+                tasks { title comments { content } }
+            }
+        }
+        """
+    )
+    # project (1) + 10 tasks * (1 + 10 comments)
+    assert cost.cost == 1 + 10 * (1 + 10 * 1)
+    assert cost.depth == 4
+
+
+def test_paginated_fields_use_first_argument():
+    cost = cost_of(
+        """
+        query Tasks($first: Int) {
+            project(id: 1) {
+                tasksConnection(first: $first) {
+                    edges { node { id title } }
+                }
+            }
+        }
+        """,
+        variables={"first": 50},
+    )
+    # project (1) + connection (1 + 50 * (edges 1 + node 1))
+    assert cost.cost == 1 + 1 + 50 * 2
+
+
+def test_fragments_are_counted():
+    cost = cost_of(
+        """
+        query {
+            organization(slug: "acme") { ...Team }
+        }
+        fragment Team on OrganizationType { members { username } }
+        """
+    )
+    assert cost.cost == 1 + 10 * 1
+
+
+def test_limits_reject_deep_and_expensive_operations(settings):
+    settings.GRAPHQL_QUERY_LIMITS = {"MAX_DEPTH": 3, "MAX_COST": 50}
+    cost = cost_of(
+        """
+        query {
+            organization(slug: "acme") {
+                members { organizations { members { username } } }
+            }
+        }
+        """
+    )
+    messages = [error.message for error in cost.errors]
+    assert messages == [
+        "query depth 5 exceeds the limit of 3",
+        "query cost 1111 exceeds the limit of 50",
+    ]
+
+
+def test_tenant_overrides_raise_budget(settings):
+    settings.GRAPHQL_QUERY_LIMITS = {
+        "MAX_COST": 50,
+        "TENANTS": {"big": {"MAX_COST": 5000}},
+    }
+    query = 'query { projects(orgSlug: "big") { tasks { comments { id } } } }'
+    assert cost_of(query).errors == []
+    assert cost_of(query, tenant_slugs=["small"]).errors != []
+
+
+def test_mixed_tenant_operations_get_the_strictest_budget(settings):
+    settings.GRAPHQL_QUERY_LIMITS = {
+        "MAX_COST": 50,
+        "TENANTS": {
+            "big": {"MAX_COST": 5000},
+            "tiny": {"MAX_COST": 10},
+        },
+    }
+    # A throwaway field naming "big" doesn't raise the budget for the rest.
+    borrowed = """
+        query {
+            organization(slug: "big") { id }
+            projects(orgSlug: "small") { tasks { comments { id } } }
+        }
+    """
+    assert cost_of(borrowed).errors != []
+    unscoped = 'query { organization(slug: "big") { id } myTasks { project { id } } }'
+    assert cost_of(unscoped).errors == []
+    assert cost_of(unscoped.replace('"big"', '"tiny"')).errors != []
+
+
+@pytest.mark.django_db
+def test_view_rejects_operation_over_budget(client, settings):
+    settings.GRAPHQL_QUERY_LIMITS = {"MAX_COST": 50}
+    response = client.post(
+        "/graphql",
+        json.dumps({"query": 'query { projects(orgSlug: "acme") { tasks { id } } }'}),
+        content_type="application/json",
+    )
+    body = response.json()
+
+    assert response.status_code == 400
+    assert "data" not in body
+    assert body["errors"][0]["message"] == "query cost 110 exceeds the limit of 50"
+    assert body["extensions"]["cost"]["requested"] == 110
+
+
+@pytest.mark.django_db
+def test_view_reports_cost_extension(client):
+    response = client.post(
+        "/graphql",
+        json.dumps({"query": "query { me { id username } }"}),
+        content_type="application/json",
+    )
+    body = response.json()
+
+    assert body["extensions"]["cost"] == {
+        "requested": 1,
+        "maximum": 5000,
+        "depth": 2,
+        "maxDepth": 10,
+    }
@@ -0,0 +1,90 @@
+import pytest
+from django.core.management import CommandError, call_command
+from mixer.backend.django import mixer
+from graphene.test import Client
+from core.models import Project, Task
+from core.schema import schema
+
+client = Client(schema)
+
+
+def counters(project):
+    project.refresh_from_db()
+    return (
+        project.todo_task_count,
+        project.in_progress_task_count,
+        project.done_task_count,
+    )
+
+
+@pytest.mark.django_db
+def test_mutations_keep_counters_in_step():
+    project = mixer.blend("core.Project")
+
+    created = client.execute(
+        f'mutation {{ createTask(projectId: "{project.id}", title: "A") {{ task {{ id }} }} }}'
+    )
+    task_id = created["data"]["createTask"]["task"]["id"]
+    assert counters(project) == (1, 0, 0)
+
+    client.execute(
+        f'mutation {{ updateTaskStatus(taskId: "{task_id}", status: "DONE") {{ task {{ id }} }} }}'
+    )
+    assert counters(project) == (0, 0, 1)
+
+    client.execute(f'mutation {{ deleteTask(taskId: "{task_id}") {{ id }} }}')
+    assert counters(project) == (0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_queryset_delete_and_resave_keep_counters():
+    project = mixer.blend("core.Project")
+    mixer.cycle(3).blend("core.Task", project=project, status="IN_PROGRESS")
+    task = Task.objects.first()
+
+    # Saving without a status change must not touch the counters.
+    task.title = "renamed"
+    task.save()
+    assert counters(project) == (0, 3, 0)
+
+    Task.objects.filter(project=project).delete()
+    assert counters(project) == (0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_project_save_does_not_overwrite_counters():
+    project = mixer.blend("core.Project")
+    stale = Project.objects.get(pk=project.pk)
+    mixer.blend("core.Task", project=project, status="TODO")
+
+    stale.name = "Renamed"
+    stale.save()
+
+    assert counters(project) == (1, 0, 0)
+
+
+@pytest.mark.django_db
+def test_task_counts_are_read_from_columns(django_assert_num_queries):
+    project = mixer.blend("core.Project")
+    mixer.cycle(2).blend("core.Task", project=project, status="DONE")
+    mixer.blend("core.Task", project=project, status="TODO")
+
+    query = f'query {{ project(id: "{project.id}") {{ taskCount completedTaskCount }} }}'
+    with django_assert_num_queries(1):
+        response = client.execute(query)
+
+    assert response["data"]["project"] == {"taskCount": 3, "completedTaskCount": 2}
+
+
+@pytest.mark.django_db
+def test_rebuild_command_detects_and_fixes_drift():
+    project = mixer.blend("core.Project")
+    mixer.cycle(2).blend("core.Task", project=project, status="TODO")
+    Project.objects.filter(pk=project.pk).update(todo_task_count=7, done_task_count=1)
+
+    with pytest.raises(CommandError, match="1 project"):
+        call_command("rebuild_task_counters", "--check")
+    call_command("rebuild_task_counters")
+
+    assert counters(project) == (2, 0, 0)
+    call_command("rebuild_task_counters", "--check")
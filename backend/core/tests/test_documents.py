@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from mixer.backend.django import mixer
+from core.documents import document_cache, query_hash
+from core.models import PersistedQuery
+
+QUERY = "query GetMe { me { id } }"
+
+
+@pytest.fixture(autouse=True)
+def clear_document_cache():
+    document_cache.clear()
+    document_cache.reset_stats()
+    yield
+    document_cache.clear()
+
+
+def post(client, **body):
+    response = client.post(
+        "/graphql", json.dumps(body), content_type="application/json"
+    )
+    return response.json()
+
+
+def persisted(sha256):
+    return {"persistedQuery": {"version": 1, "sha256Hash": sha256}}
+
+
+@pytest.mark.django_db
+def test_repeated_query_is_parsed_once(client):
+    post(client, query=QUERY)
+    post(client, query=QUERY)
+    post(client, query=QUERY)
+
+    assert document_cache.stats()["misses"] == 1
+    assert document_cache.stats()["hits"] == 2
+
+
+@pytest.mark.django_db
+def test_unknown_hash_asks_client_for_the_query(client):
+    body = post(client, extensions=persisted(query_hash(QUERY)))
+
+    assert body["errors"][0]["message"] == "PersistedQueryNotFound"
+    assert body["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+
+@pytest.mark.django_db
+def test_client_registered_hashes_stay_in_process(client):
+    sha256 = query_hash(QUERY)
+    post(client, query=QUERY, extensions=persisted(sha256))
+    assert not PersistedQuery.objects.exists()
+
+    # This worker answers hash-only requests from its cache...
+    body = post(client, extensions=persisted(sha256))
+    assert body["data"] == {"me": None}
+
+    # ...and a cold one asks for the query again.
+    document_cache.clear()
+    body = post(client, extensions=persisted(sha256))
+    assert body["errors"][0]["message"] == "PersistedQueryNotFound"
+
+
+@pytest.mark.django_db
+def test_auto_register_stores_hashes_from_authenticated_users(client, settings):
+    settings.GRAPHQL_DOCUMENTS = {"AUTO_REGISTER": True}
+    sha256 = query_hash(QUERY)
+    post(client, query=QUERY, extensions=persisted(sha256))
+    assert not PersistedQuery.objects.exists()
+
+    document_cache.clear()
+    client.force_login(mixer.blend("auth.User"))
+    post(client, query=QUERY, extensions=persisted(sha256))
+    assert PersistedQuery.objects.filter(sha256=sha256).exists()
+
+    # A cold worker resolves the hash from the database.
+    document_cache.clear()
+    body = post(client, extensions=persisted(sha256))
+    assert body["data"]["me"] is not None
+
+
+@pytest.mark.django_db
+def test_auto_register_stops_at_max_registered(client, settings):
+    settings.GRAPHQL_DOCUMENTS = {"AUTO_REGISTER": True, "MAX_REGISTERED": 1}
+    client.force_login(mixer.blend("auth.User"))
+    other = "query GetName { me { username } }"
+    for query in (QUERY, other):
+        post(client, query=query, extensions=persisted(query_hash(query)))
+
+    assert list(PersistedQuery.objects.values_list("query", flat=True)) == [QUERY]
+
+
+@pytest.mark.django_db
+def test_mismatched_hash_is_rejected(client):
+    body = post(client, query=QUERY, extensions=persisted("0" * 64))
+
+    assert body["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_HASH_MISMATCH"
+
+
+@pytest.mark.django_db
+def test_allow_list_only_accepts_registered_queries(client, settings, tmp_path):
+    settings.GRAPHQL_DOCUMENTS = {"ALLOW_LIST_ONLY": True}
+    source = tmp_path / "queries.ts"
+    source.write_text(f"export const GET_ME = gql`{QUERY}`;")
+    call_command("register_persisted_queries", str(source))
+
+    allowed = post(client, extensions=persisted(query_hash(QUERY)))
+    rejected = post(client, query="query { me { username } }")
+
+    assert allowed["data"] == {"me": None}
+    assert rejected["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_ALLOWED"
+
+
+@pytest.mark.django_db
+def test_health_check_reports_cache_counters(client):
+    post(client, query=QUERY)
+    post(client, query=QUERY)
+
+    stats = client.get("/health/").json()["graphql"]["documentCache"]
+
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
@@ -0,0 +1,142 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from graphql_jwt.shortcuts import get_token
+from mixer.backend.django import mixer
+
+from core import compression
+from core.compression import CompressionMiddleware, choose_encoding
+from core.encoding import fast_dumps, standard_dumps
+
+BOARD = """
+    query ($id: ID!) {
+        project(id: $id) { name tasks { title description status } }
+    }
+"""
+
+
+def test_fast_dumps_matches_standard_dumps():
+    data = {
+        "data": {
+            "project": {"name": "Launch", "tasks": [{"title": "Écrire", "n": 3}]},
+            "price": Decimal("1.50"),
+            "at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        }
+    }
+    assert json.loads(fast_dumps(data)) == json.loads(standard_dumps(data))
+    assert json.loads(fast_dumps(data, pretty=True)) == json.loads(standard_dumps(data))
+
+
+def test_encoding_negotiation(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("gzip, deflate, br") == "gzip"
+    assert choose_encoding("gzip;q=0, br") is None
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding("") is None
+
+
+def respond(response, **headers):
+    request = RequestFactory().get("/graphql", **headers)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+def test_only_large_buffered_responses_are_compressed(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    body = json.dumps({"data": ["task"] * 1000})
+
+    large = respond(
+        HttpResponse(body, content_type="application/json"),
+        HTTP_ACCEPT_ENCODING="gzip",
+    )
+    assert large["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in large["Vary"]
+    assert gzip.decompress(large.content).decode() == body
+    # GZipMiddleware's random-length filename (BREACH mitigation).
+    assert large.content[3] & gzip.FNAME
+
+    small = respond(
+        HttpResponse("{}", content_type="application/json"),
+        HTTP_ACCEPT_ENCODING="gzip",
+    )
+    assert not small.has_header("Content-Encoding")
+    assert "Accept-Encoding" in small["Vary"]
+
+    stream = respond(
+        StreamingHttpResponse(iter([body]), content_type="text/event-stream"),
+        HTTP_ACCEPT_ENCODING="gzip",
+    )
+    assert not stream.has_header("Content-Encoding")
+
+
+def test_responses_with_credentials_are_not_compressed():
+    body = json.dumps({"data": {"token": "secret", "echo": ["x"] * 1000}})
+
+    response = HttpResponse(body, content_type="application/json")
+    compression.skip_compression(response)
+
+    response = respond(response, HTTP_ACCEPT_ENCODING="gzip, br")
+    assert not response.has_header("Content-Encoding")
+
+
+@pytest.mark.django_db
+def test_mutation_responses_are_not_compressed(client):
+    user = mixer.blend("auth.User", username="ada")
+    user.set_password("pw")
+    user.save()
+    # Enough tokens to pass MIN_SIZE.
+    fields = " ".join(
+        f't{i}: tokenAuth(username: "ada", password: "pw") {{ token }}'
+        for i in range(8)
+    )
+
+    response = client.post(
+        "/graphql",
+        json.dumps({"query": f"mutation {{ {fields} }}"}),
+        content_type="application/json",
+        HTTP_ACCEPT_ENCODING="gzip",
+    )
+
+    assert response.status_code == 200
+    assert len(response.content) > 1024
+    assert not response.has_header("Content-Encoding")
+    assert json.loads(response.content)["data"]["t0"]["token"]
+
+
+@pytest.mark.django_db
+def test_large_boards_are_sent_compressed(client):
+    user = mixer.blend("auth.User")
+    org = mixer.blend("core.Organization")
+    org.members.add(user)
+    project = mixer.blend("core.Project", organization=org)
+    mixer.cycle(40).blend(
+        "core.Task", project=project, organization=org, description="x" * 100
+    )
+
+    response = client.post(
+        "/graphql",
+        json.dumps({"query": BOARD, "variables": {"id": project.pk}}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"JWT {get_token(user)}",
+        HTTP_ACCEPT_ENCODING="gzip",
+    )
+    assert response.status_code == 200
+    assert response["Content-Encoding"] in ("gzip", "br")
+    if response["Content-Encoding"] == "gzip":
+        payload = json.loads(gzip.decompress(response.content))
+        assert len(payload["data"]["project"]["tasks"]) == 40
+
+
+@pytest.mark.django_db
+def test_benchmark_command_reports_each_step():
+    call_command("seed_data", orgs=1, tasks_per_project=5, stdout=StringIO())
+    out = StringIO()
+    call_command("benchmark_responses", iterations=2, stdout=out)
+    output = out.getvalue()
+    assert "encode orjson" in output and "compress gzip" in output
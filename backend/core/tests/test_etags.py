@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphql_jwt.shortcuts import get_token
+from mixer.backend.django import mixer
+
+from core.documents import document_cache, query_hash
+from core.models import PersistedQuery
+
+ORG_TEAM = """
+    query GetOrgTeam($slug: String!) {
+        organization(slug: $slug) { name members { email } }
+    }
+"""
+MY_ORGS = "query GetMyOrgs { me { email organizations { slug name } } }"
+
+
+@pytest.fixture(autouse=True)
+def registered_queries():
+    document_cache.clear()
+    for query in (ORG_TEAM, MY_ORGS):
+        PersistedQuery.objects.create(sha256=query_hash(query), query=query)
+    yield
+    document_cache.clear()
+
+
+@pytest.fixture
+def member():
+    user = mixer.blend("auth.User", email="owner@example.com")
+    org = mixer.blend("core.Organization", slug="acme", name="Acme")
+    org.members.add(user)
+    return user, org
+
+
+def get(client, user, query, variables=None, etag=None):
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+    headers = {"HTTP_AUTHORIZATION": f"JWT {get_token(user)}"}
+    if etag:
+        headers["HTTP_IF_NONE_MATCH"] = etag
+    return client.get(
+        "/graphql",
+        {
+            "extensions": json.dumps(extensions),
+            "variables": json.dumps(variables or {}),
+        },
+        **headers,
+    )
+
+
+@pytest.mark.django_db
+def test_unchanged_reads_are_answered_with_304(client, member):
+    user, _ = member
+    first = get(client, user, ORG_TEAM, {"slug": "acme"})
+    assert first.status_code == 200
+    assert first.json()["data"]["organization"]["name"] == "Acme"
+    etag = first["ETag"]
+    assert etag.startswith('W/"')
+    assert "private" in first["Cache-Control"]
+
+    with CaptureQueriesContext(connection) as queries:
+        second = get(client, user, ORG_TEAM, {"slug": "acme"}, etag=etag)
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second["ETag"] == etag
+    # Loading the user for the token, and the version lookup.
+    assert len(queries) <= 2
+
+
+@pytest.mark.django_db
+def test_writes_change_the_etag(client, member):
+    user, org = member
+    etag = get(client, user, ORG_TEAM, {"slug": "acme"})["ETag"]
+
+    mixer.blend("core.Project", organization=org)
+    assert get(client, user, ORG_TEAM, {"slug": "acme"}, etag=etag).status_code == 200
+
+    etag = get(client, user, ORG_TEAM, {"slug": "acme"})["ETag"]
+    org.members.add(mixer.blend("auth.User"))
+    changed = get(client, user, ORG_TEAM, {"slug": "acme"}, etag=etag)
+    assert changed.status_code == 200
+    assert len(changed.json()["data"]["organization"]["members"]) == 2
+
+
+@pytest.mark.django_db
+def test_user_scoped_reads_follow_the_users_organizations(client, member):
+    user, org = member
+    etag = get(client, user, MY_ORGS)["ETag"]
+    assert get(client, user, MY_ORGS, etag=etag).status_code == 304
+
+    org.name = "Acme Corp"
+    org.save()
+    renamed = get(client, user, MY_ORGS, etag=etag)
+    assert renamed.status_code == 200
+    assert renamed.json()["data"]["me"]["organizations"][0]["name"] == "Acme Corp"
+
+    other = mixer.blend("auth.User")
+    org.members.add(other)
+    assert get(client, user, MY_ORGS, etag=renamed["ETag"]).status_code == 200
+
+
+@pytest.mark.django_db
+def test_errors_and_posts_get_no_etag(client, member):
+    user, _ = member
+    outsider = mixer.blend("auth.User")
+    denied = get(client, outsider, ORG_TEAM, {"slug": "acme"})
+    assert "errors" in denied.json()
+    assert not denied.has_header("ETag")
+
+    posted = client.post(
+        "/graphql",
+        json.dumps({"query": ORG_TEAM, "variables": {"slug": "acme"}}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"JWT {get_token(user)}",
+    )
+    assert posted.status_code == 200
+    assert not posted.has_header("ETag")
@@ -0,0 +1,54 @@
+from unittest import mock
+
+import pytest
+from django.db import OperationalError
+
+from core.health import pool_stats
+
+
+@pytest.mark.django_db
+def test_readiness_reports_database_latency(client):
+    response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    default = body["databases"]["default"]
+    assert default["latencyMs"] >= 0
+    assert default["pool"]["pooled"] is False
+    assert "inUse" not in default["pool"]
+
+
+@pytest.mark.django_db
+def test_readiness_fails_when_the_database_is_unreachable(client):
+    with mock.patch(
+        "core.views.database_status", side_effect=OperationalError("connection refused")
+    ):
+        response = client.get("/health/ready")
+
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "unavailable"
+    assert body["databases"]["default"] == {"error": "connection refused"}
+
+
+def test_pool_stats_derive_in_use_and_wait_time():
+    pool = mock.Mock()
+    pool.get_stats.return_value = {
+        "pool_min": 2,
+        "pool_max": 10,
+        "pool_size": 6,
+        "pool_available": 2,
+        "requests_num": 40,
+        "requests_queued": 4,
+        "requests_wait_ms": 30,
+    }
+
+    stats = pool_stats(pool)
+
+    assert stats["size"] == 6
+    assert stats["inUse"] == 4
+    assert stats["idle"] == 2
+    assert stats["averageWaitMs"] == 7.5
+    assert stats["waiting"] == 0
+    assert stats["timeouts"] == 0
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+from mixer.backend.django import mixer
+from core.instrumentation import METRICS
+
+PROJECTS_QUERY = """
+    query GetProjects($orgSlug: String!) {
+        projects(orgSlug: $orgSlug) { id name tasks { id } }
+    }
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    for metric in METRICS:
+        metric.clear()
+
+
+@pytest.fixture
+def staff_member(client):
+    org = mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User", is_staff=True, is_superuser=False)
+    org.members.add(user)
+    mixer.cycle(2).blend("core.Project", organization=org)
+    client.force_login(user)
+    return user
+
+
+TRACE = {"X-GraphQL-Trace": "1"}
+
+
+def post(client, query, headers=None, **variables):
+    response = client.post(
+        "/graphql",
+        json.dumps({"query": query, "variables": variables}),
+        content_type="application/json",
+        headers=headers or {},
+    )
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_trace_header_adds_resolver_timings(client, staff_member):
+    body = post(client, PROJECTS_QUERY, headers=TRACE, orgSlug="acme")
+
+    tracing = body["extensions"]["tracing"]
+    assert tracing["operation"] == "GetProjects"
+    assert tracing["tenant"] == "acme"
+    assert tracing["sql"]["count"] >= 2
+    paths = [r["path"] for r in tracing["execution"]["resolvers"]]
+    assert ["projects"] in paths
+    assert ["projects", 1, "tasks"] in paths
+
+
+@pytest.mark.django_db
+def test_no_trace_without_header(client, staff_member):
+    body = post(client, PROJECTS_QUERY, orgSlug="acme")
+    assert "tracing" not in body["extensions"]
+
+
+@pytest.mark.django_db
+def test_trace_is_hidden_from_non_staff(client, staff_member):
+    staff_member.is_staff = False
+    staff_member.save()
+    body = post(client, PROJECTS_QUERY, headers=TRACE, orgSlug="acme")
+    assert "tracing" not in body["extensions"]
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_request_histograms(client, staff_member):
+    post(client, PROJECTS_QUERY, orgSlug="acme")
+    post(client, PROJECTS_QUERY, headers=TRACE, orgSlug="acme")
+
+    response = client.get("/metrics")
+
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.content.decode()
+    labels = 'operation="GetProjects",tenant="acme"'
+    assert f"graphql_request_duration_seconds_count{{{labels}}} 2" in text
+    assert f'graphql_request_sql_queries_bucket{{{labels},le="+Inf"}} 2' in text
+    # Only the traced request timed its resolvers.
+    resolver = 'graphql_resolver_duration_seconds_count{type="Query",field="projects"}'
+    assert f"{resolver} 1" in text
+
+
+@pytest.mark.django_db
+def test_labels_only_name_tenants_the_user_can_access(client, staff_member):
+    mixer.blend("core.Organization", slug="bigcorp")
+    post(client, PROJECTS_QUERY, orgSlug="bigcorp")
+    post(client, PROJECTS_QUERY, orgSlug="no-such-org")
+
+    text = client.get("/metrics").content.decode()
+    assert 'operation="GetProjects",tenant="none"} 2' in text
+    assert "bigcorp" not in text and "no-such-org" not in text
+
+
+@pytest.mark.django_db
+def test_label_sets_are_capped(client, staff_member, settings):
+    settings.GRAPHQL_TRACING = {"MAX_SERIES": 2}
+    for name in ("A", "B", "C", "D"):
+        post(client, f"query {name} {{ me {{ id }} }}")
+
+    text = client.get("/metrics").content.decode()
+    assert 'operation="A"' in text and 'operation="B"' in text
+    assert 'operation="C"' not in text
+    other = 'operation="other",tenant="other"'
+    assert f"graphql_request_duration_seconds_count{{{other}}} 2" in text
+
+
+@pytest.mark.django_db
+def test_metrics_are_restricted(client, settings):
+    settings.GRAPHQL_TRACING = {"METRICS_TOKEN": "s3cret"}
+    remote = {"REMOTE_ADDR": "203.0.113.9"}
+    assert client.get("/metrics", **remote).status_code == 403
+    bad = client.get("/metrics", HTTP_AUTHORIZATION="Bearer nope", **remote)
+    assert bad.status_code == 403
+    ok = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret", **remote)
+    assert ok.status_code == 200
+    assert client.get("/metrics").status_code == 200  # from localhost
+
+    client.force_login(mixer.blend("auth.User", is_staff=True))
+    assert client.get("/metrics", **remote).status_code == 200
@@ -0,0 +1,152 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from graphene.test import Client
+from core.schema import schema
+
+client = Client(schema)
+
+BOARD_QUERY = """
+    query GetProjectDetails($id: ID!) {
+        project(id: $id) {
+            id
+            name
+            tasks {
+                id
+                title
+                status
+                comments {
+                    id
+                    content
+                }
+            }
+        }
+    }
+"""
+
+
+def execute(query, context, **variables):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.execute(query, context_value=context, variables=variables)
+    assert "errors" not in response, response.get("errors")
+    return response["data"], ctx.captured_queries
+
+
+@pytest.mark.django_db
+def test_board_query_runs_in_fixed_number_of_queries(make_context):
+    """
+    Ensure project -> tasks -> comments loads one query per level.
+    """
+    user = mixer.blend("auth.User")
+    small = mixer.blend("core.Project")
+    task = mixer.blend("core.Task", project=small)
+    mixer.blend("core.TaskComment", task=task)
+
+    large = mixer.blend("core.Project")
+    for task in mixer.cycle(8).blend("core.Task", project=large):
+        mixer.cycle(3).blend("core.TaskComment", task=task)
+
+    _, small_queries = execute(BOARD_QUERY, make_context(user), id=small.id)
+    data, large_queries = execute(BOARD_QUERY, make_context(user), id=large.id)
+
+    assert len(small_queries) == len(large_queries) == 3
+    assert len(data["project"]["tasks"]) == 8
+    assert all(len(t["comments"]) == 3 for t in data["project"]["tasks"])
+
+
+@pytest.mark.django_db
+def test_board_query_loads_only_selected_columns(make_context):
+    """
+    Ensure unselected columns such as descriptions are not fetched.
+    """
+    user = mixer.blend("auth.User")
+    project = mixer.blend("core.Project")
+    task = mixer.blend("core.Task", project=project)
+    mixer.blend("core.TaskComment", task=task)
+
+    _, queries = execute(BOARD_QUERY, make_context(user), id=project.id)
+    project_sql, task_sql, comment_sql = (q["sql"] for q in queries)
+
+    assert '"description"' not in project_sql
+    assert '"description"' not in task_sql
+    assert '"assignee_email"' not in task_sql
+    assert '"author_email"' not in comment_sql
+
+
+@pytest.mark.django_db
+def test_my_tasks_joins_project(make_context):
+    """
+    Ensure myTasks { project { name } } doesn't query each project separately.
+    """
+    org = mixer.blend("core.Organization")
+    user = mixer.blend("auth.User", email="me@test.com")
+    org.members.add(user)
+    for project in mixer.cycle(4).blend("core.Project", organization=org, status="ACTIVE"):
+        mixer.blend("core.Task", project=project, assignee_email=user.email, status="TODO")
+
+    query = """
+        query {
+            myTasks {
+                id
+                title
+                project { id name }
+            }
+        }
+    """
+    data, queries = execute(query, make_context(user))
+
+    assert len(data["myTasks"]) == 4
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_organization_members_are_prefetched(make_context):
+    """
+    Ensure members { organizations } is prefetched rather than loaded per member.
+    """
+    org = mixer.blend("core.Organization", slug="acme")
+    members = mixer.cycle(5).blend("auth.User")
+    org.members.add(*members)
+
+    query = """
+        query {
+            organization(slug: "acme") {
+                name
+                members {
+                    username
+                    organizations { slug }
+                }
+            }
+        }
+    """
+    execute(query, make_context(members[0]))
+    data, queries = execute(query, make_context(members[0]))
+    prefetch_queries = len(queries)
+
+    org.members.add(*mixer.cycle(5).blend("auth.User"))
+    data, queries = execute(query, make_context(members[0]))
+
+    assert len(data["organization"]["members"]) == 10
+    assert len(queries) == prefetch_queries
+
+
+@pytest.mark.django_db
+def test_related_connection_does_not_refetch_parent_key(make_context):
+    """
+    Ensure a page from project.tasks.all() keeps project_id loaded instead of
+    fetching it again for every row.
+    """
+    user = mixer.blend("auth.User")
+    project = mixer.blend("core.Project")
+    mixer.cycle(5).blend("core.Task", project=project)
+    query = """
+        query ($id: ID!) {
+            project(id: $id) { tasksConnection(first: 10) { edges { node { id } } } }
+        }
+    """
+
+    data, queries = execute(query, make_context(user), id=project.id)
+
+    assert len(data["project"]["tasksConnection"]["edges"]) == 5
+    assert len(queries) == 2
@@ -0,0 +1,175 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from graphene.test import Client
+from core.schema import schema
+
+client = Client(schema)
+
+TASKS_QUERY = """
+    query Tasks($id: ID!, $first: Int, $after: String, $status: String) {
+        project(id: $id) {
+            tasksConnection(first: $first, after: $after, status: $status) {
+                edges { cursor node { id title } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    }
+"""
+
+
+def fetch_tasks(context, **variables):
+    response = client.execute(TASKS_QUERY, context_value=context, variables=variables)
+    assert "errors" not in response, response.get("errors")
+    return response["data"]["project"]["tasksConnection"]
+
+
+@pytest.mark.django_db
+def test_tasks_connection_walks_all_pages(make_context):
+    """
+    Ensure following endCursor visits every task exactly once, in order.
+    """
+    context = make_context(mixer.blend("auth.User"))
+    project = mixer.blend("core.Project")
+    tasks = mixer.cycle(7).blend("core.Task", project=project)
+
+    seen, after = [], None
+    while True:
+        page = fetch_tasks(context, id=project.id, first=3, after=after)
+        seen += [int(edge["node"]["id"]) for edge in page["edges"]]
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        after = page["pageInfo"]["endCursor"]
+
+    assert seen == [task.id for task in tasks]
+
+
+@pytest.mark.django_db
+def test_tasks_connection_filters_by_status(make_context):
+    context = make_context(mixer.blend("auth.User"))
+    project = mixer.blend("core.Project")
+    mixer.cycle(2).blend("core.Task", project=project, status="TODO")
+    mixer.cycle(3).blend("core.Task", project=project, status="DONE")
+
+    page = fetch_tasks(context, id=project.id, status="DONE")
+
+    assert len(page["edges"]) == 3
+    assert page["pageInfo"]["hasNextPage"] is False
+
+
+@pytest.mark.django_db
+def test_tasks_connection_rejects_invalid_cursor(make_context):
+    context = make_context(mixer.blend("auth.User"))
+    project = mixer.blend("core.Project")
+
+    response = client.execute(
+        TASKS_QUERY,
+        context_value=context,
+        variables={"id": project.id, "after": "not-a-cursor"},
+    )
+
+    assert response["errors"][0]["message"] == "invalid cursor"
+
+
+@pytest.mark.django_db
+def test_projects_connection_pages_newest_first(make_context):
+    """
+    Ensure projectsConnection keeps the dashboard's newest-first order and
+    later pages use a keyset filter instead of OFFSET.
+    """
+    org = mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User")
+    org.members.add(user)
+    projects = mixer.cycle(5).blend("core.Project", organization=org)
+    context = make_context(user)
+
+    query = """
+        query Projects($after: String) {
+            projectsConnection(orgSlug: "acme", first: 2, after: $after) {
+                edges { node { id taskCount } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    """
+    first_page = client.execute(query, context_value=context)
+    page = first_page["data"]["projectsConnection"]
+    with CaptureQueriesContext(connection) as ctx:
+        second_page = client.execute(
+            query,
+            context_value=context,
+            variables={"after": page["pageInfo"]["endCursor"]},
+        )
+
+    ids = [int(edge["node"]["id"]) for edge in page["edges"]]
+    ids += [
+        int(edge["node"]["id"])
+        for edge in second_page["data"]["projectsConnection"]["edges"]
+    ]
+    assert ids == [project.id for project in reversed(projects)][:4]
+    assert not any("OFFSET" in q["sql"] for q in ctx.captured_queries)
+
+
+NESTED_QUERY = """
+    query {
+        projectsConnection(orgSlug: "acme", first: 10) {
+            edges {
+                node {
+                    id
+                    tasksConnection(first: 2, status: "TODO") {
+                        edges { node { title commentsConnection(first: 1) {
+                            edges { node { content } }
+                            pageInfo { hasNextPage }
+                        } } }
+                        pageInfo { hasNextPage endCursor }
+                    }
+                }
+            }
+        }
+    }
+"""
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("projects", [1, 6])
+def test_nested_connections_load_first_pages_in_one_query_per_level(
+    projects, make_context, django_assert_num_queries
+):
+    org = mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User")
+    org.members.add(user)
+    for project in mixer.cycle(projects).blend("core.Project", organization=org):
+        for n in range(3):
+            task = mixer.blend(
+                "core.Task", project=project, title=f"t{n}", status="TODO"
+            )
+            mixer.cycle(2).blend("core.TaskComment", task=task, content=f"c{n}")
+        mixer.blend("core.Task", project=project, status="DONE")
+    context = make_context(user)
+    client.execute(NESTED_QUERY, context_value=context)  # warm the tenant caches
+
+    # projects, their tasks, and the tasks' comments.
+    with django_assert_num_queries(3):
+        response = client.execute(NESTED_QUERY, context_value=context)
+
+    assert "errors" not in response, response.get("errors")
+    for edge in response["data"]["projectsConnection"]["edges"]:
+        tasks = edge["node"]["tasksConnection"]
+        assert [task["node"]["title"] for task in tasks["edges"]] == ["t0", "t1"]
+        assert tasks["pageInfo"]["hasNextPage"] is True
+        comments = tasks["edges"][0]["node"]["commentsConnection"]
+        assert [c["node"]["content"] for c in comments["edges"]] == ["c0"]
+        assert comments["pageInfo"]["hasNextPage"] is True
+
+
+@pytest.mark.django_db
+def test_prefetched_page_cursor_continues_with_a_keyset_query(make_context):
+    context = make_context(mixer.blend("auth.User"))
+    project = mixer.blend("core.Project")
+    tasks = mixer.cycle(5).blend("core.Task", project=project)
+
+    first = fetch_tasks(context, id=project.id, first=2)
+    rest = fetch_tasks(context, id=project.id, after=first["pageInfo"]["endCursor"])
+
+    ids = [int(edge["node"]["id"]) for edge in first["edges"] + rest["edges"]]
+    assert ids == [task.id for task in tasks]
@@ -0,0 +1,96 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from graphene.test import Client
+from core.schema import schema
+
+client = Client(schema)
+
+# Every tenant read path the dashboard and board pages use.
+TENANT_QUERY = """
+    query ($slug: String!, $projectId: ID!) {
+        myTasks { id title }
+        projects(orgSlug: $slug) { id name }
+        projectsConnection(orgSlug: $slug, first: 5) {
+            edges { node { id } }
+        }
+        project(id: $projectId) {
+            tasksConnection(first: 5, status: "TODO") {
+                edges { node { id commentsConnection(first: 5) { edges { node { id } } } } }
+            }
+        }
+    }
+"""
+
+
+def sequential_scans(sql):
+    """Return the plan lines of `sql` that read a whole table or sort it."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Tiny test tables are always cheaper to scan; ask the planner
+            # whether an index path exists at all.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql)
+            return [row[0] for row in cursor.fetchall() if "Seq Scan" in row[0]]
+        if connection.vendor == "sqlite":
+            # SQLite always finds the single-column FK indexes, so a missing
+            # composite index shows up as a sort of every matching row.
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = [row[-1] for row in cursor.fetchall()]
+            if "ROW_NUMBER() OVER" in sql:
+                # Prefetched connection pages read the table through an
+                # index in a subquery; scanning and sorting that subquery
+                # only touches the (first + 1) rows kept per parent.
+                plan = [
+                    line
+                    for line in plan
+                    if line not in ("SCAN qualify", "USE TEMP B-TREE FOR ORDER BY")
+                    and not line.startswith("SCAN (subquery-")
+                ]
+            return [
+                line
+                for line in plan
+                if line.startswith("SCAN ") or "TEMP B-TREE" in line
+            ]
+    pytest.skip(f"no plan check for {connection.vendor}")
+
+
+@pytest.fixture
+def seeded(make_context):
+    user = mixer.blend("auth.User", email="member@example.com")
+    orgs = mixer.cycle(3).blend("core.Organization")
+    for org in orgs:
+        org.members.add(user)
+    for org in orgs:
+        for project in mixer.cycle(4).blend(
+            "core.Project", organization=org, status="ACTIVE"
+        ):
+            for task in mixer.cycle(6).blend(
+                "core.Task",
+                project=project,
+                status=mixer.RANDOM("TODO", "IN_PROGRESS", "DONE"),
+                assignee_email=mixer.RANDOM("member@example.com", "other@example.com"),
+            ):
+                mixer.cycle(2).blend("core.TaskComment", task=task)
+    project = orgs[0].projects.first()
+    return make_context(user), orgs[0].slug, project.id
+
+
+@pytest.mark.django_db
+def test_tenant_queries_use_indexes(seeded):
+    """
+    Fail if any resolver query falls back to a sequential scan (or, on
+    SQLite, to sorting rows an index should have returned in order).
+    """
+    context, slug, project_id = seeded
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.execute(
+            TENANT_QUERY,
+            context_value=context,
+            variables={"slug": slug, "projectId": project_id},
+        )
+    assert "errors" not in response, response.get("errors")
+
+    scans = {q["sql"]: sequential_scans(q["sql"]) for q in ctx.captured_queries}
+    assert not {sql: plan for sql, plan in scans.items() if plan}
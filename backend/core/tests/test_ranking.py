@@ -0,0 +1,204 @@
+import random
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from mixer.backend.django import mixer
+from graphene.test import Client
+from core.models import Task
+from core.ranking import MAX_RANK_LENGTH, rank_between, spread_ranks
+from core.schema import schema
+
+client = Client(schema)
+
+MOVE_TASK = """
+    mutation Move($taskId: ID!, $status: String!, $afterId: ID, $beforeId: ID) {
+        moveTask(taskId: $taskId, status: $status, afterId: $afterId, beforeId: $beforeId) {
+            task { id status rank }
+        }
+    }
+"""
+
+
+def test_rank_between_keeps_order_under_random_inserts():
+    ranks = []
+    for _ in range(2000):
+        i = random.randint(0, len(ranks))
+        before = ranks[i - 1] if i else None
+        after = ranks[i] if i < len(ranks) else None
+        rank = rank_between(before, after)
+        assert (before is None or before < rank) and (after is None or rank < after)
+        ranks.insert(i, rank)
+
+
+def test_spread_ranks_are_short_and_ordered():
+    ranks = spread_ranks(5000)
+    assert ranks == sorted(set(ranks))
+    assert max(len(rank) for rank in ranks) <= 4
+
+
+def column(project, status):
+    return list(
+        Task.objects.filter(project=project, status=status).values_list("title", flat=True)
+    )
+
+
+@pytest.fixture
+def context(make_context):
+    return make_context(mixer.blend("auth.User", is_superuser=True))
+
+
+def move(context, **variables):
+    response = client.execute(MOVE_TASK, variables=variables, context_value=context)
+    assert "errors" not in response, response.get("errors")
+    return response["data"]["moveTask"]["task"]
+
+
+@pytest.mark.django_db
+def test_new_tasks_are_appended_to_their_column():
+    project = mixer.blend("core.Project")
+    for title in "abc":
+        mixer.blend("core.Task", project=project, title=title, status="TODO", rank="")
+
+    assert column(project, "TODO") == ["a", "b", "c"]
+
+
+@pytest.mark.django_db
+def test_move_task_writes_only_the_moved_row(context, django_assert_max_num_queries):
+    project = mixer.blend("core.Project")
+    a, b, c = (
+        mixer.blend("core.Task", project=project, title=title, status="TODO", rank="")
+        for title in "abc"
+    )
+    done = mixer.blend("core.Task", project=project, title="d", status="DONE", rank="")
+
+    # Reorder within the column: c goes between a and b. One of the queries
+    # numbers the change for changesSince.
+    with django_assert_max_num_queries(6):
+        move(context, taskId=c.id, status="TODO", afterId=a.id, beforeId=b.id)
+    assert column(project, "TODO") == ["a", "c", "b"]
+
+    # Move across columns, to the top of DONE.
+    moved = move(context, taskId=a.id, status="DONE", beforeId=done.id)
+    assert moved["status"] == "DONE"
+    assert column(project, "DONE") == ["a", "d"]
+    assert column(project, "TODO") == ["c", "b"]
+
+    project.refresh_from_db()
+    assert (project.todo_task_count, project.done_task_count) == (2, 2)
+
+
+@pytest.mark.django_db
+def test_move_task_rejects_neighbours_from_other_columns(context):
+    project = mixer.blend("core.Project")
+    task = mixer.blend("core.Task", project=project, status="TODO", rank="")
+    other = mixer.blend("core.Task", project=project, status="DONE", rank="")
+
+    response = client.execute(
+        MOVE_TASK,
+        variables={"taskId": task.id, "status": "TODO", "afterId": other.id},
+        context_value=context,
+    )
+
+    assert response["errors"][0]["message"] == "neighbour task is not in the target column"
+
+
+@pytest.mark.django_db
+def test_move_task_requires_access_to_the_task(make_context):
+    org = mixer.blend("core.Organization")
+    task = mixer.blend("core.Task", project__organization=org, status="TODO", rank="")
+    outsider = mixer.blend("auth.User", is_superuser=False)
+    variables = {"taskId": task.id, "status": "DONE"}
+
+    for user, message in (
+        (AnonymousUser(), "authentication credentials were not provided"),
+        (outsider, "you do not have permission to access this project"),
+    ):
+        response = client.execute(
+            MOVE_TASK, variables=variables, context_value=make_context(user)
+        )
+        assert response["errors"][0]["message"] == message
+
+    task.refresh_from_db()
+    assert task.status == "TODO"
+
+
+@pytest.mark.django_db
+def test_tied_ranks_trigger_rebalance(context):
+    project = mixer.blend("core.Project")
+    a = mixer.blend("core.Task", project=project, title="a", status="TODO", rank="i")
+    b = mixer.blend("core.Task", project=project, title="b", status="TODO", rank="i")
+    c = mixer.blend("core.Task", project=project, title="c", status="TODO", rank="r")
+
+    move(context, taskId=c.id, status="TODO", afterId=a.id, beforeId=b.id)
+
+    assert column(project, "TODO") == ["a", "c", "b"]
+
+
+@pytest.mark.django_db
+def test_long_ranks_are_respread(context, django_capture_on_commit_callbacks):
+    project = mixer.blend("core.Project")
+    long_rank = "i" * MAX_RANK_LENGTH
+    a = mixer.blend("core.Task", project=project, title="a", status="TODO", rank=long_rank)
+    b = mixer.blend("core.Task", project=project, title="b", status="TODO", rank=long_rank + "i")
+    c = mixer.blend("core.Task", project=project, title="c", status="TODO", rank="")
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        move(context, taskId=c.id, status="TODO", afterId=a.id, beforeId=b.id)
+
+    # The respread and the taskChanged message.
+    assert len(callbacks) == 2
+    assert column(project, "TODO") == ["a", "c", "b"]
+    ranks = Task.objects.filter(project=project).values_list("rank", flat=True)
+    assert max(len(rank) for rank in ranks) <= 2
+
+
+@pytest.mark.django_db
+def test_rebalance_command_shortens_long_columns():
+    project = mixer.blend("core.Project")
+    mixer.blend("core.Task", project=project, title="a", status="TODO", rank="z" * 40)
+    mixer.blend("core.Task", project=project, title="b", status="TODO", rank="z" * 41)
+
+    call_command("rebalance_task_ranks")
+
+    assert column(project, "TODO") == ["a", "b"]
+    assert all(len(t.rank) <= 2 for t in Task.objects.all())
+
+
+def test_rank_after_stays_short():
+    ranks = [rank_between(None, None)]
+    for _ in range(1000):
+        ranks.append(rank_between(ranks[-1], None))
+    assert ranks == sorted(set(ranks))
+    assert max(len(rank) for rank in ranks) <= 30
+
+
+@pytest.mark.django_db
+def test_appending_thousands_of_tasks_keeps_ranks_bounded():
+    project = mixer.blend("core.Project")
+    for i in range(2000):
+        Task.objects.create(project=project, title=str(i), status="TODO")
+
+    ranks = list(Task.objects.filter(project=project).values_list("rank", flat=True))
+    assert max(len(rank) for rank in ranks) <= MAX_RANK_LENGTH + 1
+    assert column(project, "TODO") == [str(i) for i in range(2000)]
+
+
+@pytest.mark.django_db
+def test_status_changes_append_to_the_new_column():
+    project = mixer.blend("core.Project")
+    done = [
+        mixer.blend("core.Task", project=project, title=t, status="DONE", rank="")
+        for t in "ab"
+    ]
+    task = mixer.blend("core.Task", project=project, title="c", status="TODO", rank="")
+    # Without re-ranking, "0z" would sort before the existing DONE tasks.
+    Task.objects.filter(pk=task.pk).update(rank="0z")
+
+    response = client.execute(
+        'mutation { updateTaskStatus(taskId: "%s", status: "DONE") { task { rank } } }'
+        % task.pk
+    )
+    assert "errors" not in response
+    assert column(project, "DONE") == ["a", "b", "c"]
+    assert done[1].rank < response["data"]["updateTaskStatus"]["task"]["rank"]
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+from mixer.backend.django import mixer
+from core.response_cache import get_response_cache
+
+PROJECTS_QUERY = """
+    query GetProjects($orgSlug: String!) {
+        projects(orgSlug: $orgSlug) { id name taskCount }
+    }
+"""
+
+
+@pytest.fixture
+def enable_cache(settings):
+    settings.GRAPHQL_RESPONSE_CACHE = {"ENABLED": True}
+
+
+@pytest.fixture
+def tenant():
+    org = mixer.blend("core.Organization", slug="acme")
+    member = mixer.blend("auth.User", is_superuser=False)
+    org.members.add(member)
+    project = mixer.blend("core.Project", organization=org)
+    return org, member, project
+
+
+def post(client, query, **variables):
+    response = client.post(
+        "/graphql",
+        json.dumps({"query": query, "variables": variables}),
+        content_type="application/json",
+    )
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_repeated_read_is_served_from_cache(client, enable_cache, tenant):
+    _, member, _ = tenant
+    client.force_login(member)
+
+    first = post(client, PROJECTS_QUERY, orgSlug="acme")
+    second = post(client, PROJECTS_QUERY, orgSlug="acme")
+
+    assert first["data"] == second["data"]
+    assert get_response_cache().stats() == {"hits": 1, "misses": 1}
+    health = client.get("/health/").json()["graphql"]["responseCache"]
+    assert health["hitRate"] == 0.5
+
+
+@pytest.mark.django_db
+def test_mutation_bumps_tenant_generation(
+    client, enable_cache, tenant, django_capture_on_commit_callbacks
+):
+    _, member, project = tenant
+    client.force_login(member)
+    post(client, PROJECTS_QUERY, orgSlug="acme")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        post(
+            client,
+            "mutation($id: ID!) { createTask(projectId: $id, title: \"New\") { task { id } } }",
+            id=project.id,
+        )
+    after = post(client, PROJECTS_QUERY, orgSlug="acme")
+
+    assert after["data"]["projects"][0]["taskCount"] == 1
+    assert get_response_cache().stats()["hits"] == 0
+
+
+@pytest.mark.django_db
+def test_cached_response_is_not_served_to_non_members(client, enable_cache, tenant):
+    _, member, _ = tenant
+    client.force_login(member)
+    post(client, PROJECTS_QUERY, orgSlug="acme")
+
+    client.force_login(mixer.blend("auth.User", is_superuser=False))
+    body = post(client, PROJECTS_QUERY, orgSlug="acme")
+
+    assert body["data"]["projects"] is None
+    assert "permission" in body["errors"][0]["message"]
+
+
+@pytest.mark.django_db
+def test_operations_with_user_specific_fields_bypass_cache(
+    client, enable_cache, tenant
+):
+    _, member, _ = tenant
+    client.force_login(member)
+    query = 'query { projects(orgSlug: "acme") { id } me { username } }'
+
+    post(client, query)
+    post(client, query)
+
+    assert get_response_cache().stats() == {"hits": 0, "misses": 0}
+
+
+@pytest.mark.django_db
+def test_shared_backend_uses_django_cache(
+    client, settings, tenant, django_capture_on_commit_callbacks
+):
+    settings.GRAPHQL_RESPONSE_CACHE = {
+        "ENABLED": True,
+        "BACKEND": "core.response_cache.DjangoResponseCache",
+    }
+    org, member, _ = tenant
+    client.force_login(member)
+    backend = get_response_cache()
+    generation = backend.generation(org.pk)
+
+    post(client, PROJECTS_QUERY, orgSlug="acme")
+    post(client, PROJECTS_QUERY, orgSlug="acme")
+    with django_capture_on_commit_callbacks(execute=True):
+        org.save()
+
+    assert backend.stats() == {"hits": 1, "misses": 1}
+    assert backend.generation(org.pk) == generation + 1
+
+
+def test_cache_is_disabled_by_default():
+    assert get_response_cache() is None
@@ -0,0 +1,182 @@
+import json
+
+import pytest
+from django.db import connections
+from graphql_jwt.shortcuts import get_token
+from mixer.backend.django import mixer
+
+from core import routers
+from core.documents import document_cache, query_hash
+from core.models import Organization, PersistedQuery, Project
+from core.response_cache import get_response_cache
+
+PROJECTS_QUERY = "query ($slug: String!) { projects(orgSlug: $slug) { name } }"
+CREATE_PROJECT = """
+    mutation ($slug: String!) {
+        createProject(orgSlug: $slug, name: "Launch") { project { name } }
+    }
+"""
+
+REPLICA = "replica_test"
+uses_replica = pytest.mark.django_db(transaction=True, databases=["default", REPLICA])
+
+
+# Module scoped (and autouse) so the alias exists before test databases are
+# checked.
+@pytest.fixture(scope="module", autouse=True)
+def replica_database(django_db_setup, django_db_blocker):
+    """A second, unreplicated test database.
+
+    Rows only show up in it when written there explicitly, so a test can tell
+    which database answered a read.
+    """
+    alias = REPLICA
+    default = connections.settings["default"]
+    connections.settings[alias] = {
+        **default,
+        "TEST": {**default["TEST"], "NAME": None, "MIRROR": None},
+    }
+    connection = connections[alias]
+    with django_db_blocker.unblock():
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    yield alias
+    with django_db_blocker.unblock():
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    del connections[alias]
+    del connections.settings[alias]
+
+
+@pytest.fixture
+def replica(replica_database, settings):
+    settings.DATABASE_REPLICAS = {"ALIASES": [replica_database]}
+    return replica_database
+
+
+@pytest.fixture
+def tenant(replica):
+    # The same user, organization and membership on both databases.
+    user = mixer.blend("auth.User", is_staff=True)
+    org = mixer.blend("core.Organization", slug="acme")
+    org.members.add(user)
+    user.save(using=replica)
+    org.save(using=replica)
+    Organization.members.through.objects.using(replica).create(
+        organization_id=org.pk, user_id=user.pk
+    )
+    return org, user
+
+
+def graphql(client, query, user):
+    return client.post(
+        "/graphql",
+        json.dumps({"query": query, "variables": {"slug": "acme"}}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"JWT {get_token(user)}",
+    )
+
+
+def project_names(response):
+    assert response.status_code == 200, response.content
+    assert "errors" not in response.json(), response.json()
+    return [p["name"] for p in response.json()["data"]["projects"]]
+
+
+@uses_replica
+def test_queries_read_from_the_replica(client, tenant, replica):
+    org, user = tenant
+    Project.objects.create(organization_id=org.pk, name="On primary")
+    Project.objects.using(replica).create(organization_id=org.pk, name="On replica")
+
+    assert project_names(graphql(client, PROJECTS_QUERY, user)) == ["On replica"]
+
+
+@uses_replica
+def test_reads_stay_on_the_primary_after_a_mutation(client, tenant, replica):
+    _, user = tenant
+
+    response = graphql(client, CREATE_PROJECT, user)
+    assert response.json()["data"]["createProject"]["project"]["name"] == "Launch"
+    assert routers.get_config()["COOKIE"] in response.cookies
+    assert not Project.objects.using(replica).exists()
+
+    assert project_names(graphql(client, PROJECTS_QUERY, user)) == ["Launch"]
+
+    client.cookies.pop(routers.get_config()["COOKIE"])
+    assert project_names(graphql(client, PROJECTS_QUERY, user)) == []
+
+
+@uses_replica
+def test_lagging_or_unreachable_replicas_fall_back_to_the_primary(
+    tenant, replica, monkeypatch
+):
+    monkeypatch.setattr(routers, "replica_lag", lambda alias: 30.0)
+    with routers.read_from_replica() as alias:
+        assert alias is None
+
+    monkeypatch.setattr(routers, "replica_lag", lambda alias: None)
+    assert routers.choose_replica() is None
+
+    monkeypatch.setattr(routers, "replica_lag", lambda alias: 0.5)
+    with routers.read_from_replica() as alias:
+        assert alias == replica
+        assert Project.objects.all().db == replica
+    assert Project.objects.all().db == "default"
+
+
+def get(client, user, etag=None):
+    extensions = {
+        "persistedQuery": {"version": 1, "sha256Hash": query_hash(PROJECTS_QUERY)}
+    }
+    headers = {"HTTP_AUTHORIZATION": f"JWT {get_token(user)}"}
+    if etag:
+        headers["HTTP_IF_NONE_MATCH"] = etag
+    return client.get(
+        "/graphql",
+        {
+            "extensions": json.dumps(extensions),
+            "variables": json.dumps({"slug": "acme"}),
+        },
+        **headers,
+    )
+
+
+@uses_replica
+def test_etags_come_from_the_replica_that_serves_the_read(client, tenant, replica):
+    org, user = tenant
+    document_cache.clear()
+    PersistedQuery.objects.create(
+        sha256=query_hash(PROJECTS_QUERY), query=PROJECTS_QUERY
+    )
+    # A write the replica hasn't received yet.
+    project = Project.objects.create(organization_id=org.pk, name="Launch")
+
+    stale = get(client, user)
+    assert project_names(stale) == []
+
+    # Replication catches up; the ETag of the stale body must not match.
+    Project.objects.using(replica).bulk_create([project])
+    change_seq = Organization.objects.get(pk=org.pk).change_seq
+    Organization.objects.using(replica).filter(pk=org.pk).update(
+        change_seq=change_seq
+    )
+    fresh = get(client, user, etag=stale["ETag"])
+    assert fresh.status_code == 200
+    assert project_names(fresh) == ["Launch"]
+    document_cache.clear()
+
+
+@uses_replica
+def test_replica_reads_are_not_stored_in_the_response_cache(
+    client, tenant, replica, settings
+):
+    settings.GRAPHQL_RESPONSE_CACHE = {"ENABLED": True}
+    _, user = tenant
+    graphql(client, PROJECTS_QUERY, user)
+    graphql(client, PROJECTS_QUERY, user)
+    assert get_response_cache().stats() == {"hits": 0, "misses": 2}
+
+    # Reads on the primary, here after a write, are cached as before.
+    graphql(client, CREATE_PROJECT, user)
+    graphql(client, PROJECTS_QUERY, user)
+    assert project_names(graphql(client, PROJECTS_QUERY, user)) == ["Launch"]
+    assert get_response_cache().stats()["hits"] == 1
@@ -1,4 +1,6 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from mixer.backend.django import mixer
 from graphene.test import Client
 from core.schema import schema
@@ -74,3 +76,48 @@ def test_create_task_mutation():
     # 4. Verify Database
     assert Task.objects.count() == 1
     assert Task.objects.first().project == project
+
+
+@pytest.mark.django_db
+def test_dashboard_task_counts_use_constant_queries(make_context):
+    """
+    Ensure taskCount/completedTaskCount don't issue per-project COUNT queries.
+    """
+    org = mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User", is_superuser=False)
+    org.members.add(user)
+    context = make_context(user)
+
+    query = """
+        query {
+            projects(orgSlug: "acme") {
+                id
+                taskCount
+                completedTaskCount
+            }
+        }
+    """
+
+    def run():
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.execute(query, context_value=context)
+        assert "errors" not in response
+        return response["data"]["projects"], len(ctx)
+
+    # Warm the organization access cache so both runs are comparable.
+    run()
+
+    project = mixer.blend("core.Project", organization=org)
+    mixer.cycle(3).blend("core.Task", project=project, status="DONE")
+    mixer.cycle(2).blend("core.Task", project=project, status="TODO")
+    projects, small_count = run()
+    assert projects[0]["taskCount"] == 5
+    assert projects[0]["completedTaskCount"] == 3
+
+    for _ in range(10):
+        extra = mixer.blend("core.Project", organization=org)
+        mixer.cycle(2).blend("core.Task", project=extra, status="DONE")
+    projects, large_count = run()
+
+    assert len(projects) == 11
+    assert large_count == small_count
@@ -0,0 +1,158 @@
+import pytest
+from mixer.backend.django import mixer
+from graphene.test import Client
+from core.schema import schema
+from core.models import Task
+from core.search import START_SEL, STOP_SEL, mark, snippet
+
+client = Client(schema)
+
+SEARCH_QUERY = """
+    query ($slug: String!, $text: String!, $first: Int, $after: String) {
+        search(orgSlug: $slug, text: $text, first: $first, after: $after) {
+            edges {
+                cursor
+                node { kind rank snippet task { id title } comment { id } }
+            }
+            pageInfo { hasNextPage endCursor }
+        }
+    }
+"""
+
+
+@pytest.fixture
+def member(make_context):
+    user = mixer.blend("auth.User", is_superuser=False)
+    org = mixer.blend("core.Organization", slug="acme")
+    org.members.add(user)
+    return org, make_context(user)
+
+
+def run(context, text, **variables):
+    response = client.execute(
+        SEARCH_QUERY,
+        context_value=context,
+        variables={"slug": "acme", "text": text, **variables},
+    )
+    assert "errors" not in response, response.get("errors")
+    return response["data"]["search"]
+
+
+@pytest.mark.django_db
+def test_search_ranks_titles_then_descriptions_then_comments(member):
+    org, context = member
+    project = mixer.blend("core.Project", organization=org)
+    in_description = mixer.blend(
+        "core.Task", project=project, title="Chores", description="fix the invoice"
+    )
+    in_title = mixer.blend(
+        "core.Task", project=project, title="Invoice export", description=""
+    )
+    other = mixer.blend("core.Task", project=project, title="Other", description="")
+    comment = mixer.blend("core.TaskComment", task=other, content="see the invoice")
+
+    edges = run(context, "invoice")["edges"]
+
+    nodes = [edge["node"] for edge in edges]
+    assert [n["kind"] for n in nodes] == ["task", "task", "comment"]
+    assert nodes[0]["task"]["id"] == str(in_title.id)
+    assert nodes[1]["task"]["id"] == str(in_description.id)
+    assert nodes[2]["comment"]["id"] == str(comment.id)
+    assert nodes[2]["task"]["id"] == str(other.id)
+    assert nodes[0]["rank"] > nodes[1]["rank"] > nodes[2]["rank"]
+    assert "<mark>Invoice</mark>" in nodes[0]["snippet"]
+
+
+@pytest.mark.django_db
+def test_search_is_scoped_to_the_tenant(member):
+    org, context = member
+    mixer.blend("core.Task", project__organization=org, title="Budget review")
+    mixer.blend("core.Task", title="Budget review")  # another organization
+
+    assert len(run(context, "budget")["edges"]) == 1
+
+
+@pytest.mark.django_db
+def test_search_pages_with_cursors(member):
+    org, context = member
+    project = mixer.blend("core.Project", organization=org)
+    mixer.cycle(5).blend("core.Task", project=project, title="Release notes")
+
+    first_page = run(context, "release", first=3)
+    assert len(first_page["edges"]) == 3
+    assert first_page["pageInfo"]["hasNextPage"]
+
+    second_page = run(
+        context, "release", first=3, after=first_page["pageInfo"]["endCursor"]
+    )
+    assert len(second_page["edges"]) == 2
+    assert not second_page["pageInfo"]["hasNextPage"]
+    ids = {e["node"]["task"]["id"] for e in first_page["edges"] + second_page["edges"]}
+    assert len(ids) == 5
+
+
+@pytest.mark.django_db
+def test_blank_search_returns_nothing(member):
+    _, context = member
+    assert run(context, "   ")["edges"] == []
+
+
+@pytest.mark.django_db
+def test_search_requires_membership(make_context):
+    mixer.blend("core.Organization", slug="acme")
+    outsider = mixer.blend("auth.User", is_superuser=False)
+
+    response = client.execute(
+        SEARCH_QUERY,
+        context_value=make_context(outsider),
+        variables={"slug": "acme", "text": "anything"},
+    )
+    message = response["errors"][0]["message"]
+    assert message == "you do not have permission to access this organization"
+
+
+@pytest.mark.django_db
+def test_snippets_escape_the_matched_text(member):
+    org, context = member
+    project = mixer.blend("core.Project", organization=org)
+    mixer.blend(
+        "core.Task",
+        project=project,
+        title="Invoice <script>alert(1)</script>",
+        description="",
+    )
+    mixer.blend(
+        "core.TaskComment",
+        task__project=project,
+        content='<img src=x onerror="x()"> invoice',
+    )
+
+    snippets = [edge["node"]["snippet"] for edge in run(context, "invoice")["edges"]]
+    assert len(snippets) == 2
+    assert "<mark>Invoice</mark> &lt;script&gt;alert(1)&lt;/script&gt;" in snippets[0]
+    assert snippets[1].startswith("&lt;img src=x onerror=&quot;x()&quot;&gt;")
+    assert all("<script>" not in s and "<img" not in s for s in snippets)
+
+
+def test_headline_delimiters_become_marks_after_escaping():
+    # ts_headline output on PostgreSQL.
+    headline = f"{START_SEL}Invoice{STOP_SEL} <b>due</b>"
+    assert mark(headline) == "<mark>Invoice</mark> &lt;b&gt;due&lt;/b&gt;"
+
+
+def test_snippets_keep_the_tags_ts_headline_drops():
+    # On PostgreSQL only the words ts_headline marked come from the database;
+    # the snippet itself is cut from the stored text.
+    text = "Invoice <script>alert(1)</script>\nsend the invoices"
+    assert snippet(text, {"Invoice", "invoices"}) == (
+        "<mark>Invoice</mark> &lt;script&gt;alert(1)&lt;/script&gt; send the "
+        "<mark>invoices</mark>"
+    )
+    assert snippet("plain <b>text</b>", set()) == "plain &lt;b&gt;text&lt;/b&gt;"
+
+
+@pytest.mark.django_db
+def test_task_reads_skip_the_search_vector():
+    mixer.blend("core.Task")
+
+    assert Task.objects.get().get_deferred_fields() == {"search_vector"}
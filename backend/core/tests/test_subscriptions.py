@@ -0,0 +1,189 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from graphene.test import Client
+from mixer.backend.django import mixer
+
+from core import broker
+from core.schema import schema
+from core.views import graphql_stream
+
+TASK_CHANGED = """
+    subscription ($projectId: ID!) {
+        taskChanged(projectId: $projectId) { action taskId changes }
+    }
+"""
+
+# Messages are published once the writing transaction commits.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def member():
+    user = mixer.blend("auth.User", is_staff=True, email="owner@example.com")
+    org = mixer.blend("core.Organization", slug="acme")
+    org.members.add(user)
+    project = mixer.blend("core.Project", organization=org, name="Launch")
+    return user, project
+
+
+@pytest.fixture(autouse=True)
+def fresh_broker(settings):
+    settings.GRAPHQL_SUBSCRIPTIONS = {"QUEUE_SIZE": 2, "KEEPALIVE": 5}
+
+
+def create_task(make_context, user, project, title="Ship"):
+    result = Client(schema).execute(
+        f'mutation {{ createTask(projectId: "{project.pk}", title: "{title}") '
+        "{ task { id } } }",
+        context_value=make_context(user),
+    )
+    assert "errors" not in result, result["errors"]
+    return result["data"]["createTask"]["task"]["id"]
+
+
+def test_subscribers_that_fall_behind_are_dropped():
+    async def run():
+        subscription = broker.get_broker().subscribe("tasks.1")
+        for n in range(3):
+            broker.get_broker().publish("tasks.1", n)
+        await asyncio.sleep(0)
+        with pytest.raises(broker.SubscriberOverflow):
+            await subscription.__anext__()
+        assert not broker.get_broker().subscribers
+
+    async_to_sync(run)()
+
+
+def test_mutations_publish_after_commit(member, make_context):
+    user, project = member
+
+    async def run():
+        subscription = broker.get_broker().subscribe(f"tasks.{project.pk}")
+        task_id = await sync_to_async(create_task)(make_context, user, project)
+        message = await asyncio.wait_for(subscription.__anext__(), 1)
+        await subscription.aclose()
+        return task_id, message
+
+    task_id, message = async_to_sync(run)()
+
+    assert message["action"] == "CREATED"
+    assert str(message["task_id"]) == task_id
+    assert message["changes"]["title"] == "Ship"
+
+
+def test_writes_nobody_subscribed_to_are_not_published(
+    member, make_context, monkeypatch
+):
+    user, project = member
+    published = []
+    monkeypatch.setattr(broker.get_broker(), "publish_many", published.append)
+
+    with CaptureQueriesContext(connection) as ctx:
+        create_task(make_context, user, project)
+
+    assert published == []
+    # The task counts are only loaded for projectChanged subscribers.
+    assert not any(
+        '"core_project"."id" IN' in q["sql"] for q in ctx.captured_queries
+    )
+
+
+def test_bulk_writes_publish_one_batch_per_event(member, make_context, settings):
+    settings.GRAPHQL_SUBSCRIPTIONS = {"QUEUE_SIZE": 10}
+    user, project = member
+    tasks = [{"projectId": project.pk, "title": f"t{n}"} for n in range(3)]
+
+    async def run():
+        subscription = broker.get_broker().subscribe(f"tasks.{project.pk}")
+        batches = []
+        publish_many = broker.get_broker().publish_many
+
+        def record(messages):
+            batches.append(len(messages))
+            publish_many(messages)
+
+        broker.get_broker().publish_many = record
+        result = await sync_to_async(Client(schema).execute)(
+            "mutation ($tasks: [BulkTaskInput!]!) "
+            "{ bulkCreateTasks(tasks: $tasks) { results { ok } } }",
+            variables={"tasks": tasks},
+            context_value=make_context(user),
+        )
+        assert "errors" not in result, result["errors"]
+        messages = [
+            await asyncio.wait_for(subscription.__anext__(), 1) for _ in tasks
+        ]
+        await subscription.aclose()
+        return batches, messages
+
+    batches, messages = async_to_sync(run)()
+
+    # Only the task messages: nobody subscribed to the project counts.
+    assert batches == [3]
+    assert [m["changes"]["title"] for m in messages] == ["t0", "t1", "t2"]
+
+
+def test_postgres_payloads_pack_messages_below_the_notify_limit(monkeypatch):
+    monkeypatch.setattr(broker.PostgresBroker, "MAX_PAYLOAD", 200)
+    messages = [("tasks.1", {"n": n}) for n in range(10)]
+    messages.append(("tasks.2", {"text": "x" * 200}))
+
+    payloads = broker.PostgresBroker(10).payloads(messages)
+
+    decoded = [json.loads(payload) for payload in payloads]
+    assert all(len(payload.encode()) <= 200 for payload in payloads)
+    assert len(payloads) == 3
+    delivered = [m for data in decoded for m in data.get("messages", ())]
+    assert delivered == [["tasks.1", {"n": n}] for n in range(10)]
+    assert decoded[-1] == {"overflow": ["tasks.2"]}
+
+
+def test_subscribing_checks_project_access(member, make_context):
+    _, project = member
+    outsider = mixer.blend("auth.User")
+
+    async def run():
+        return await schema.subscribe(
+            TASK_CHANGED,
+            variable_values={"projectId": str(project.pk)},
+            context_value=make_context(outsider),
+        )
+
+    result = async_to_sync(run)()
+
+    assert result.errors
+    assert not broker.get_broker().subscribers
+
+
+def test_stream_sends_task_changes_as_server_sent_events(member, make_context):
+    user, project = member
+    request = AsyncRequestFactory().post(
+        "/graphql/stream",
+        json.dumps({"query": TASK_CHANGED, "variables": {"projectId": project.pk}}),
+        content_type="application/json",
+    )
+    request.user = user
+
+    async def run():
+        response = await graphql_stream(request)
+        assert response["Content-Type"] == "text/event-stream"
+        events = aiter(response.streaming_content)
+        await sync_to_async(create_task)(make_context, user, project)
+        chunk = await asyncio.wait_for(anext(events), 1)
+        await events.aclose()
+        return chunk
+
+    chunk = async_to_sync(run)().decode()
+
+    event, data = chunk.strip().split("\n")
+    assert event == "event: next"
+    payload = json.loads(data.removeprefix("data: "))["data"]["taskChanged"]
+    assert payload["action"] == "CREATED"
+    assert payload["changes"]["title"] == "Ship"
+    assert not broker.get_broker().subscribers
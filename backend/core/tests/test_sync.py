@@ -0,0 +1,170 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from graphene.test import Client
+from mixer.backend.django import mixer
+
+from core.models import Organization, Task, TaskComment, Tombstone
+from core.schema import schema
+
+client = Client(schema)
+
+CHANGES_SINCE = """
+    query ($slug: String!, $cursor: String, $first: Int) {
+        changesSince(orgSlug: $slug, cursor: $cursor, first: $first) {
+            cursor
+            hasMore
+            projects { id taskCount }
+            tasks { id status }
+            comments { id }
+            deleted { kind objectId }
+        }
+    }
+"""
+
+
+@pytest.fixture
+def tenant():
+    user = mixer.blend("auth.User", is_staff=True)
+    org = mixer.blend("core.Organization", slug="acme")
+    org.members.add(user)
+    project = mixer.blend("core.Project", organization=org)
+    task = mixer.blend("core.Task", project=project, status="TODO")
+    mixer.blend("core.TaskComment", task=task)
+    return user, project, task
+
+
+def sync(make_context, user, cursor=None, first=None, slug="acme"):
+    result = client.execute(
+        CHANGES_SINCE,
+        variables={"slug": slug, "cursor": cursor, "first": first},
+        context_value=make_context(user),
+    )
+    assert "errors" not in result, result["errors"]
+    return result["data"]["changesSince"]
+
+
+def ids(rows):
+    return [int(row["id"]) for row in rows]
+
+
+@pytest.mark.django_db
+def test_sync_returns_only_rows_changed_after_the_cursor(tenant, make_context):
+    user, project, task = tenant
+    everything = sync(make_context, user)
+    assert ids(everything["projects"]) == [project.pk]
+    assert ids(everything["tasks"]) == [task.pk]
+    assert len(everything["comments"]) == 1
+    assert not everything["hasMore"]
+
+    assert sync(make_context, user, everything["cursor"]) == {
+        "cursor": everything["cursor"],
+        "hasMore": False,
+        "projects": [],
+        "tasks": [],
+        "comments": [],
+        "deleted": [],
+    }
+
+    task.status = "DONE"
+    task.save()
+    changes = sync(make_context, user, everything["cursor"])
+    assert changes["tasks"] == [{"id": str(task.pk), "status": "DONE"}]
+    # The project's counters moved with it.
+    assert ids(changes["projects"]) == [project.pk]
+    assert changes["comments"] == []
+    assert int(changes["cursor"]) > int(everything["cursor"])
+
+
+@pytest.mark.django_db
+def test_deletes_are_synced_as_tombstones(tenant, make_context):
+    user, project, task = tenant
+    cursor = sync(make_context, user)["cursor"]
+
+    result = client.execute(
+        f'mutation {{ deleteTask(taskId: "{task.pk}") {{ id }} }}',
+        context_value=make_context(user),
+    )
+    assert "errors" not in result, result["errors"]
+
+    changes = sync(make_context, user, cursor)
+    # The task's tombstone covers its comments.
+    assert changes["deleted"] == [{"kind": "TASK", "objectId": task.pk}]
+    assert changes["projects"] == [{"id": str(project.pk), "taskCount": 0}]
+
+
+@pytest.mark.django_db
+def test_bulk_writes_are_numbered(tenant, make_context):
+    user, project, task = tenant
+    cursor = sync(make_context, user)["cursor"]
+
+    result = client.execute(
+        """mutation ($projectId: ID!, $taskId: ID!) {
+            bulkCreateTasks(tasks: [{projectId: $projectId, title: "A"}]) {
+                results { ok }
+            }
+            bulkDeleteTasks(taskIds: [$taskId]) { results { ok } }
+        }""",
+        variables={"projectId": project.pk, "taskId": task.pk},
+        context_value=make_context(user),
+    )
+    assert "errors" not in result, result["errors"]
+
+    changes = sync(make_context, user, cursor)
+    assert [t["id"] for t in changes["tasks"]] == [
+        str(Task.objects.get(title="A").pk)
+    ]
+    assert changes["deleted"] == [{"kind": "TASK", "objectId": task.pk}]
+
+
+@pytest.mark.django_db
+def test_large_syncs_are_paged(tenant, make_context):
+    user, project, _ = tenant
+    mixer.cycle(4).blend("core.Task", project=project)
+
+    seen, cursor = [], None
+    while True:
+        page = sync(make_context, user, cursor, first=2)
+        rows = page["projects"] + page["tasks"] + page["comments"]
+        assert 0 < len(rows) <= 2
+        seen += rows
+        cursor = page["cursor"]
+        if not page["hasMore"]:
+            break
+
+    # Five tasks, a comment, and the project (once per task counter change).
+    assert len({row["id"] for row in seen if "status" in row}) == 5
+    assert sync(make_context, user, cursor)["tasks"] == []
+
+
+@pytest.mark.django_db
+def test_sync_checks_organization_access(tenant, make_context):
+    outsider = mixer.blend("auth.User")
+    result = client.execute(
+        CHANGES_SINCE, variables={"slug": "acme"}, context_value=make_context(outsider)
+    )
+    assert "permission" in result["errors"][0]["message"]
+
+
+@pytest.mark.django_db
+def test_cursors_older_than_pruned_tombstones_are_rejected(tenant, make_context):
+    user, _, task = tenant
+    cursor = sync(make_context, user)["cursor"]
+    TaskComment.objects.all().delete()
+    Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=60))
+
+    call_command("prune_tombstones", "--days", "30", stdout=StringIO())
+
+    assert not Tombstone.objects.exists()
+    assert Organization.objects.get(slug="acme").pruned_change_seq > int(cursor)
+    result = client.execute(
+        CHANGES_SINCE,
+        variables={"slug": "acme", "cursor": cursor},
+        context_value=make_context(user),
+    )
+    assert "too old" in result["errors"][0]["message"]
+    # A full sync still works.
+    assert ids(sync(make_context, user, "0")["tasks"]) == [task.pk]
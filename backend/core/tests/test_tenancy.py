@@ -0,0 +1,94 @@
+import pytest
+from mixer.backend.django import mixer
+from core.models import Task, TaskComment
+from core.schema import check_organization_access
+
+
+@pytest.mark.django_db
+def test_access_check_costs_one_query_cold_and_none_warm(django_assert_num_queries):
+    org = mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User", is_superuser=False)
+    org.members.add(user)
+
+    with django_assert_num_queries(1):
+        assert check_organization_access(user, "acme") == org
+    with django_assert_num_queries(0):
+        assert check_organization_access(user, "acme") == org
+
+
+@pytest.mark.django_db
+def test_non_member_is_rejected():
+    mixer.blend("core.Organization", slug="acme")
+    outsider = mixer.blend("auth.User", is_superuser=False)
+
+    for _ in range(2):
+        with pytest.raises(Exception, match="you do not have permission"):
+            check_organization_access(outsider, "acme")
+
+
+@pytest.mark.django_db
+def test_membership_changes_invalidate_cache():
+    org = mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User", is_superuser=False)
+    org.members.add(user)
+    check_organization_access(user, "acme")
+
+    org.members.remove(user)
+    with pytest.raises(Exception, match="you do not have permission"):
+        check_organization_access(user, "acme")
+
+    user.organizations.add(org)
+    assert check_organization_access(user, "acme") == org
+
+    org.members.clear()
+    with pytest.raises(Exception, match="you do not have permission"):
+        check_organization_access(user, "acme")
+
+
+@pytest.mark.django_db
+def test_slug_rename_invalidates_cache():
+    org = mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User", is_superuser=True)
+    check_organization_access(user, "acme")
+
+    org.slug = "acme-corp"
+    org.save()
+
+    with pytest.raises(Exception, match="Organization not found"):
+        check_organization_access(user, "acme")
+    assert check_organization_access(user, "acme-corp") == org
+
+
+@pytest.mark.django_db
+def test_cached_organization_is_not_shared():
+    mixer.blend("core.Organization", slug="acme")
+    user = mixer.blend("auth.User", is_superuser=True)
+
+    first = check_organization_access(user, "acme")
+    first.name = "changed"
+
+    assert check_organization_access(user, "acme").name != "changed"
+
+
+@pytest.mark.django_db
+def test_tasks_and_comments_copy_the_project_organization():
+    org, other = mixer.cycle(2).blend("core.Organization")
+    project = mixer.blend("core.Project", organization=org)
+
+    # Any organization passed in is replaced by the project's.
+    task = Task.objects.create(project=project, title="A", organization=other)
+    comment = TaskComment.objects.create(task=task, content="hi", author_email="a@b.c")
+
+    assert task.organization_id == org.pk
+    assert comment.organization_id == org.pk
+
+
+@pytest.mark.django_db
+def test_for_org_filters_on_the_task_row():
+    org, other = mixer.cycle(2).blend("core.Organization")
+    mine = mixer.blend("core.Task", project__organization=org)
+    mixer.blend("core.Task", project__organization=other)
+
+    assert list(Task.objects.for_org(org)) == [mine]
+    assert list(Task.objects.for_org(org.pk)) == [mine]
+    assert "core_project" not in str(Task.objects.for_org(org).query)
@@ -1,10 +1,663 @@
-from django.http import JsonResponse
-from django.http.response import time
+import asyncio
+import json
+from contextlib import suppress
+from inspect import isawaitable
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, transaction
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.http.response import HttpResponseBadRequest, time
+from django.utils.decorators import method_decorator
+from django.utils.functional import classproperty
+from django.views.decorators.csrf import ensure_csrf_cookie
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult,
+    OperationType,
+    execute,
+    get_operation_ast,
+    subscribe,
+    validate_schema,
+)
+
+from .async_execution import ThreadedExecutionContext, run_sync
+from .batching import batch_error, start_operation
+from .broker import SubscriberOverflow
+from .broker import get_config as subscription_config
+from .compression import skip_compression
+from .cost import analyze
+from .documents import PersistedQueryError, document_cache, resolve_document
+from .encoding import get_encoder
+from .etags import add_validators, etag_matches, operation_etag
+from .etags import get_config as etag_config
+from .health import database_status
+from .instrumentation import RequestTrace, can_read_metrics, render_metrics
+from .response_cache import cache_key, get_response_cache
+from .response_cache import stats as response_cache_stats
+from .routers import (
+    choose_replica,
+    pin_to_primary,
+    pinned_to_primary,
+    read_from,
+)
+from .tenancy import operation_tenant_slug, operation_tenant_slugs
 
 
 def health_check(request):
     res = {
         "status": "ok",
         "time": time.time(),
+        "graphql": {
+            "documentCache": document_cache.stats(),
+            "responseCache": response_cache_stats(),
+        },
     }
     return JsonResponse(res)
+
+
+def readiness_check(request):
+    ready = True
+    databases = {}
+    for alias in settings.DATABASES:
+        try:
+            databases[alias] = database_status(alias)
+        except DatabaseError as e:
+            # Reads fall back to the primary while a replica is down.
+            if alias == DEFAULT_DB_ALIAS:
+                ready = False
+            databases[alias] = {"error": str(e)}
+    res = {"status": "ok" if ready else "unavailable", "databases": databases}
+    return JsonResponse(res, status=200 if ready else 503)
+
+
+def metrics(request):
+    if not can_read_metrics(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+class PreparedOperation:
+    """An operation that passed validation and the cost checks, and missed the cache."""
+
+    def __init__(
+        self, schema, document, operation_ast, extensions, cache, key, replica=None
+    ):
+        self.schema = schema
+        self.document = document
+        self.operation_ast = operation_ast
+        self.extensions = extensions
+        self.cache = cache
+        self.key = key
+        # The alias a query reads from, picked before the ETag and cache
+        # lookups so they see the same data (None for the primary).
+        self.replica = replica
+
+    def finish(self, result):
+        if self.key and not result.errors and result.data is not None:
+            self.cache.set(self.key, result.data)
+        if self.extensions:
+            result.extensions = {**(result.extensions or {}), **self.extensions}
+        return result
+
+
+class TenantGraphQLView(GraphQLView):
+    """
+    GraphQLView that serves cached and persisted documents, runs a static
+    cost analysis between validation and execution, answers cacheable reads
+    from the response cache, revalidates GET reads by ETag, runs batches of
+    operations posted as a JSON array, records request metrics, and reports
+    `extensions` in the response.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        return self.finish_response(request, response)
+
+    def finish_response(self, request, response):
+        etag = getattr(request, "graphql_etag", None)
+        if etag:
+            if getattr(request, "graphql_not_modified", False):
+                response = HttpResponseNotModified()
+            if response.status_code in (200, 304):
+                add_validators(response, etag)
+        if getattr(request, "wrote_to_primary", False):
+            pin_to_primary(response)
+            # Mutations return tokens next to client input (see compression).
+            skip_compression(response)
+        return response
+
+    def parse_body(self, request):
+        # A JSON array is a batch of operations (see core/batching.py). The
+        # view is instantiated per request, so this only affects this one.
+        if (
+            self.get_content_type(request) == "application/json"
+            and request.body.lstrip()[:1] == b"["
+        ):
+            self.batch = True
+            operations = super().parse_body(request)
+            error = batch_error(operations)
+            if error:
+                raise HttpError(HttpResponseBadRequest(error))
+            return operations
+        return super().parse_body(request)
+
+    def get_response(self, request, data, show_graphiql=False):
+        if self.batch:
+            start_operation(request)
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        trace = RequestTrace.start(request)
+        if trace is None:
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        else:
+            with trace.instrument_sql():
+                execution_result = self.execute_graphql_request(
+                    request, data, query, variables, operation_name, show_graphiql
+                )
+        return self.format_response(request, execution_result, trace, id, show_graphiql)
+
+    def format_response(
+        self, request, execution_result, trace, id, show_graphiql=False
+    ):
+        if trace is not None:
+            trace.finish(getattr(request, "user", None))
+            if execution_result and trace.requested and self.can_see_trace(request):
+                execution_result.extensions = {
+                    **(execution_result.extensions or {}),
+                    "tracing": trace.as_extension(),
+                }
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                set_rollback()
+                # Errors may be transient; don't let clients revalidate them.
+                request.graphql_etag = None
+                response["errors"] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.errors and any(
+                not getattr(e, "path", None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        prepared = self.prepare_operation(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+        result = self.execute_document(
+            request,
+            prepared.schema,
+            prepared.document,
+            prepared.operation_ast,
+            variables,
+            operation_name,
+            replica=prepared.replica,
+        )
+        return prepared.finish(result)
+
+    def prepare_operation(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """
+        Resolve, validate and cost the document. Returns a PreparedOperation,
+        or the ExecutionResult (None for GraphiQL) to respond with instead.
+        """
+        request_extensions = self.get_request_extensions(request, data)
+        if not query and not request_extensions.get("persistedQuery"):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            document_hash, document, validation_errors = resolve_document(
+                schema,
+                query,
+                request_extensions,
+                self.validation_rules,
+                user=request.user,
+            )
+        except PersistedQueryError as e:
+            return ExecutionResult(errors=[e])
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        extensions = {}
+        if operation_ast is not None:
+            tenant_slug = operation_tenant_slug(operation_ast, variables)
+            trace = getattr(request, "graphql_trace", None)
+            if trace is not None:
+                trace.operation = operation_ast.name.value if operation_ast.name else ""
+                trace.tenant_slug = tenant_slug
+            cost = analyze(
+                schema,
+                document,
+                operation_ast,
+                variables,
+                operation_tenant_slugs(operation_ast, variables),
+            )
+            extensions["cost"] = cost.as_extension()
+            if cost.errors:
+                return ExecutionResult(errors=cost.errors, extensions=extensions)
+
+        replica = None
+        if (
+            operation_ast is not None
+            and operation_ast.operation == OperationType.QUERY
+            and not reads_from_primary(request)
+        ):
+            replica = choose_replica()
+
+        if self.can_revalidate(request):
+            # Versions come from the alias the query runs on, before it
+            # runs, so a lagging replica never gets a newer ETag than its
+            # data.
+            with read_from(replica):
+                etag = operation_etag(
+                    request, document_hash, operation_ast, variables, operation_name
+                )
+            if etag:
+                request.graphql_etag = etag
+                if etag_matches(request, etag):
+                    # finish_response answers 304 Not Modified instead.
+                    request.graphql_not_modified = True
+                    return ExecutionResult(data=None)
+
+        key = None
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            key = cache_key(
+                response_cache,
+                request,
+                document_hash,
+                operation_ast,
+                variables,
+                operation_name,
+            )
+        if key:
+            data = response_cache.get(key)
+            if data is not None:
+                return ExecutionResult(data=data, extensions=extensions or None)
+            if replica is not None:
+                # The key has the tenant generation bumped on the primary,
+                # which the replica may not have caught up with yet. Only
+                # results read from the primary are stored.
+                key = None
+
+        return PreparedOperation(
+            schema, document, operation_ast, extensions, response_cache, key, replica
+        )
+
+    def can_revalidate(self, request):
+        trace = getattr(request, "graphql_trace", None)
+        return (
+            request.method == "GET"
+            and not self.batch
+            and etag_config()["ENABLED"]
+            and not (trace is not None and trace.requested)
+        )
+
+    @staticmethod
+    def can_see_trace(request):
+        # request.user is the JWT user once the schema middleware has run.
+        user = getattr(request, "user", None)
+        return settings.DEBUG or bool(user and user.is_staff)
+
+    def json_encode(self, request, d, pretty=False):
+        pretty = self.pretty or pretty or bool(request.GET.get("pretty"))
+        return get_encoder()(d, pretty=pretty)
+
+    @staticmethod
+    def get_request_extensions(request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions") or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        if not isinstance(extensions, dict):
+            raise HttpError(HttpResponseBadRequest("Extensions must be an object."))
+        return extensions
+
+    def execute_options(self, request, variables, operation_name):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def execute_document(
+        self,
+        request,
+        schema,
+        document,
+        operation_ast,
+        variables,
+        operation_name,
+        replica=None,
+    ):
+        try:
+            execute_options = self.execute_options(request, variables, operation_name)
+
+            operation_type = operation_ast.operation if operation_ast else None
+            if operation_type == OperationType.MUTATION:
+                # Keep this client's next reads on the primary.
+                request.wrote_to_primary = True
+            elif operation_type == OperationType.QUERY:
+                with read_from(replica):
+                    return execute(schema, document, **execute_options)
+
+            if (
+                operation_type == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class AsyncTenantGraphQLView(TenantGraphQLView):
+    """
+    TenantGraphQLView for the ASGI server. Query root fields resolve
+    concurrently on the worker pool of core.async_execution, mutations run
+    serially in one worker, and the synchronous steps around execution
+    (persisted documents, cost limits, the response cache) run there too.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return True
+
+    @method_decorator(ensure_csrf_cookie)
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return await run_sync(
+                    request, super().dispatch, request, *args, **kwargs
+                )
+
+            if self.batch:
+                responses = []
+                for entry in data:
+                    responses.append(await self.get_response_async(request, entry))
+                result = "[{}]".format(",".join(response[0] for response in responses))
+                status_code = max((response[1] for response in responses), default=200)
+            else:
+                result, status_code = await self.get_response_async(request, data)
+
+            response = HttpResponse(
+                status=status_code, content=result, content_type="application/json"
+            )
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(
+                request, {"errors": [self.format_error(e)]}
+            )
+        return self.finish_response(request, response)
+
+    async def get_response_async(self, request, data):
+        if self.batch:
+            start_operation(request)
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        trace = RequestTrace.start(request)
+        prepared = await run_sync(
+            request,
+            self.prepare_operation,
+            request,
+            data,
+            query,
+            variables,
+            operation_name,
+        )
+        if isinstance(prepared, PreparedOperation):
+            result = await self.execute_document_async(
+                request, prepared, variables, operation_name
+            )
+            execution_result = await run_sync(request, prepared.finish, result)
+        else:
+            execution_result = prepared
+        return await run_sync(
+            request, self.format_response, request, execution_result, trace, id
+        )
+
+    async def execute_document_async(
+        self, request, prepared, variables, operation_name
+    ):
+        operation_ast = prepared.operation_ast
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return await run_sync(
+                request,
+                self.execute_document,
+                request,
+                prepared.schema,
+                prepared.document,
+                operation_ast,
+                variables,
+                operation_name,
+            )
+
+        try:
+            execute_options = self.execute_options(request, variables, operation_name)
+            execute_options["execution_context_class"] = ThreadedExecutionContext
+            with read_from(prepared.replica):
+                result = execute(prepared.schema, prepared.document, **execute_options)
+                if isawaitable(result):
+                    result = await result
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def reads_from_primary(request):
+    # Reads later in a batch see the writes of its mutations.
+    return getattr(request, "wrote_to_primary", False) or pinned_to_primary(request)
+
+
+def authenticate_request(request):
+    # The JWT backend reads the Authorization header (or the JWT cookie).
+    user = authenticate(request=request) or request.user
+    user.is_authenticated  # load a lazy session user while on a worker thread
+    return user
+
+
+def sse_event(event, data=None):
+    payload = "" if data is None else get_encoder()(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def format_result(result):
+    response = {"data": result.data}
+    if result.errors:
+        response["errors"] = [GraphQLView.format_error(e) for e in result.errors]
+    return response
+
+
+async def subscription_events(stream, keepalive):
+    """SSE `next` events for each result of `stream`, then `complete`."""
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(stream.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=keepalive)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            finished, pending = pending, None
+            try:
+                result = finished.result()
+            except StopAsyncIteration:
+                break
+            except SubscriberOverflow as e:
+                yield sse_event("next", {"errors": [{"message": str(e)}]})
+                break
+            yield sse_event("next", format_result(result))
+        yield sse_event("complete")
+    finally:
+        # Runs on client disconnect too; closing the stream unsubscribes.
+        if pending is not None:
+            pending.cancel()
+            with suppress(BaseException):
+                await pending
+        await stream.aclose()
+
+
+async def graphql_stream(request):
+    """
+    Serve a GraphQL subscription as server-sent events (graphql-sse style):
+    one `next` event per result, then `complete`. Needs the ASGI server, as
+    every open stream is an idle coroutine rather than a worker thread.
+    """
+    if request.method not in ("GET", "POST"):
+        return HttpResponseNotAllowed(["GET", "POST"])
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"errors": [{"message": "subscriptions need the ASGI server"}]},
+            status=501,
+        )
+
+    try:
+        data = json.loads(request.body or b"{}") if request.method == "POST" else {}
+        if not isinstance(data, dict):
+            raise ValueError
+    except ValueError:
+        return HttpResponseBadRequest("POST body must be a JSON object.")
+    try:
+        query, variables, operation_name, _ = GraphQLView.get_graphql_params(
+            request, data
+        )
+        extensions = TenantGraphQLView.get_request_extensions(request, data)
+    except HttpError as e:
+        return e.response
+
+    from .schema import schema
+
+    graphql_schema = schema.graphql_schema
+    try:
+        _, document, errors = await run_sync(
+            request, resolve_document, graphql_schema, query, extensions
+        )
+    except PersistedQueryError as e:
+        errors = [e]
+    if not errors:
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is None or operation_ast.operation != (
+            OperationType.SUBSCRIPTION
+        ):
+            return HttpResponseBadRequest(
+                "Only subscriptions can be streamed; send other operations to /graphql."
+            )
+        request.user = await run_sync(request, authenticate_request, request)
+        result = await subscribe(
+            graphql_schema,
+            document,
+            context_value=request,
+            variable_values=variables,
+            operation_name=operation_name,
+        )
+    else:
+        result = ExecutionResult(errors=errors)
+
+    if isinstance(result, ExecutionResult):
+        content = sse_event("next", format_result(result)) + sse_event("complete")
+        return HttpResponse(content, content_type="text/event-stream")
+
+    response = StreamingHttpResponse(
+        subscription_events(result, subscription_config()["KEEPALIVE"]),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
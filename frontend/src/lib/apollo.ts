@@ -4,14 +4,44 @@ import {
     InMemoryCache,
     ApolloLink,
 } from "@apollo/client";
+import { BatchHttpLink } from "@apollo/client/link/batch-http";
+import { getMainDefinition } from "@apollo/client/utilities";
 
 const cache = new InMemoryCache();
 const uri = import.meta.env.VITE_GRAPHQL_URL;
 
 const httpLink = new HttpLink({
     uri: uri,
+    // Sends the cookie that keeps reads on the primary right after a write.
+    credentials: "include",
+    // Queries go over GET so the browser cache revalidates them by ETag and
+    // unchanged data comes back as an empty 304.
+    useGETForQueries: true,
 });
 
+// With VITE_GRAPHQL_BATCH=true, the queries a page fires together go out as
+// one POST (a JSON array, see backend/core/batching.py). That saves round
+// trips but gives up the ETag revalidation of GET queries.
+const batchLink = new BatchHttpLink({
+    uri: uri,
+    credentials: "include",
+    batchMax: 10,
+    batchInterval: 10,
+});
+
+const isQuery = (operation: ApolloLink.Operation) => {
+    const definition = getMainDefinition(operation.query);
+    return (
+        definition.kind === "OperationDefinition" &&
+        definition.operation === "query"
+    );
+};
+
+const transportLink =
+    import.meta.env.VITE_GRAPHQL_BATCH === "true"
+        ? ApolloLink.split(isQuery, batchLink, httpLink)
+        : httpLink;
+
 const authLink = new ApolloLink((operation, forward) => {
     // Get the token from local storage
     const token = localStorage.getItem("token");
@@ -29,7 +59,7 @@ const authLink = new ApolloLink((operation, forward) => {
 
 const options: ApolloClient.Options = {
     cache: cache,
-    link: authLink.concat(httpLink),
+    link: authLink.concat(transportLink),
 };
 
 export const client = new ApolloClient(options);